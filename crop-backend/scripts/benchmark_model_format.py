@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script to compare the binary model format with the pickled model in size and load time
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import joblib
+import numpy as np
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.inference import CompiledForest
+from src.model_format import load_binary, save_binary
+from src.utils import setup_logging
+from src.config import settings
+
+def median_seconds(fn, repeats):
+    """Median wall-clock seconds of repeated calls"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+def main():
+    """Main function to benchmark model artifact formats"""
+    parser = argparse.ArgumentParser(description="Benchmark binary model artifacts against the pickle")
+    parser.add_argument("--model-path", default=settings.MODEL_PATH, help="Pickled model to compare against")
+    parser.add_argument("--repeats", type=int, default=5, help="Loads timed per format (default: 5)")
+    parser.add_argument("--rows", type=int, default=1000, help="Random rows used to check predictions agree")
+
+    args = parser.parse_args()
+
+    # Setup logging
+    setup_logging()
+    logger.info(f"Benchmarking model formats for {args.model_path}")
+
+    try:
+        model_data = joblib.load(args.model_path)
+        estimator = model_data['model']
+        engine = CompiledForest.from_estimator(estimator)
+        classes = model_data['label_encoder'].classes_
+        feature_columns = model_data['feature_columns']
+
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 300, size=(args.rows, len(feature_columns)))
+        expected_labels, expected_proba = engine.predict(X)
+
+        # Serving from the pickle means unpickling and then compiling the node tables
+        pickle_size = Path(args.model_path).stat().st_size
+        results = [
+            ('pickle', pickle_size, median_seconds(lambda: joblib.load(args.model_path), args.repeats)),
+            ('pickle + compile', pickle_size, median_seconds(
+                lambda: CompiledForest.from_estimator(joblib.load(args.model_path)['model']), args.repeats
+            ))
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for compression, value_dtype in (('none', np.float64), ('zlib', np.float64), ('none', np.float32)):
+                path = Path(tmp_dir) / f"model-{compression}-{np.dtype(value_dtype).name}.bin"
+                save_binary(path, engine, classes, feature_columns, type(estimator).__name__,
+                            compression=compression, value_dtype=value_dtype)
+
+                for mmap in ((True, False) if compression == 'none' else (False,)):
+                    loaded, _ = load_binary(path, mmap=mmap)
+                    labels, proba = loaded.predict(X)
+                    agreement = float(np.mean(labels == expected_labels))
+                    max_error = float(np.abs(proba - expected_proba).max())
+                    name = f"binary {compression}, {np.dtype(value_dtype).name} values{', mmap' if mmap else ''}"
+                    results.append((
+                        name, path.stat().st_size,
+                        median_seconds(lambda: load_binary(path, mmap=mmap), args.repeats)
+                    ))
+                    logger.info(f"{name}: label agreement {agreement:.4f}, max probability error {max_error:.2e}")
+
+        logger.info(f"{'format':<40}{'bytes':>14}{'load ms':>12}")
+        for name, size, seconds in results:
+            logger.info(f"{name:<40}{size:>14}{seconds * 1000:>12.2f}")
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+
+    logger.info("Model format benchmark completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
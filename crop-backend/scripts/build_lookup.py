@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Script to precompute the active model's predictions over a quantized input grid
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.model import CropModel
+from src.cache import parse_rounding
+from src.utils import setup_logging
+from src.config import settings
+
+def main():
+    """Main function to build the lookup table"""
+    parser = argparse.ArgumentParser(description="Build a lookup table for the active crop recommendation model")
+    parser.add_argument("--bins", default=settings.LOOKUP_BINS,
+                        help="Bins per feature as feature:bins,... (unlisted features get one bin)")
+    parser.add_argument("--top-k", type=int, default=settings.LOOKUP_TOP_K, help="Crops stored per cell")
+    parser.add_argument("--min-margin", type=float, default=settings.LOOKUP_MIN_MARGIN,
+                        help="Cells with a smaller top-two probability gap fall back to the forest")
+    parser.add_argument("--workers", type=int, default=settings.LOOKUP_WORKERS or None,
+                        help="Worker processes (default: one per core)")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out split used in training (default: 0.2)")
+    parser.add_argument("--random-state", type=int, default=42, help="Random state used in training")
+    
+    args = parser.parse_args()
+    
+    # Setup logging
+    setup_logging()
+    logger.info("Starting lookup table build")
+    
+    try:
+        model = CropModel()
+        result = model.build_lookup(
+            bins=parse_rounding(args.bins),
+            top_k=args.top_k,
+            min_margin=args.min_margin,
+            workers=args.workers,
+            test_size=args.test_size,
+            random_state=args.random_state
+        )
+        
+        holdout = result['holdout']
+        logger.info(f"Lookup table for version {result['version']}:")
+        logger.info(f"  cells: {result['n_cells']} ({result['nbytes']} bytes, "
+                    f"{result['cells_per_second']:.0f} cells/s on {result['workers']} workers)")
+        logger.info(f"  cells falling back to the forest: {result['fallback_fraction']:.1%}")
+        logger.info(f"  held-out coverage {holdout['coverage']:.1%}, answered by lookup {holdout['lookup_rate']:.1%}")
+        logger.info(f"  held-out agreement with the forest: {holdout['agreement_in_grid']} in grid, "
+                    f"{holdout['agreement_served']} where served")
+        logger.info(f"  held-out accuracy: forest {holdout['forest_accuracy']:.4f}, "
+                    f"lookup with fallback {holdout['served_accuracy']:.4f}")
+        logger.info(f"Saved to {result['path']}; set LOOKUP_ENABLED=True to serve it")
+        
+    except Exception as e:
+        logger.error(f"Lookup table build failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+    
+    logger.info("Lookup table build completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
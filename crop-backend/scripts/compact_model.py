@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script to compact the active model into a smaller, faster forest
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.model import CropModel
+from src.utils import setup_logging
+from src.config import settings
+
+def main():
+    """Main function to compact the model"""
+    parser = argparse.ArgumentParser(description="Compact the active crop recommendation model")
+    parser.add_argument("--max-accuracy-loss", type=float, default=settings.COMPACTION_MAX_ACCURACY_LOSS,
+                        help="Accuracy the compact forest may lose on the held-out split")
+    parser.add_argument("--target-latency-ms", type=float, default=settings.COMPACTION_TARGET_LATENCY_MS or None,
+                        help="Single-row latency budget; trees are dropped until it is met")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Held-out split used in training (default: 0.2)")
+    parser.add_argument("--random-state", type=int, default=42, help="Random state used in training")
+    
+    args = parser.parse_args()
+    
+    # Setup logging
+    setup_logging()
+    logger.info("Starting model compaction")
+    
+    try:
+        model = CropModel()
+        result = model.compact(
+            max_accuracy_loss=args.max_accuracy_loss,
+            target_latency_ms=args.target_latency_ms,
+            test_size=args.test_size,
+            random_state=args.random_state
+        )
+        
+        logger.info(f"Compaction of version {result['version']} (stopped by {result['stopped_by']}):")
+        for metric in ('n_trees', 'n_nodes', 'nbytes', 'latency_ms', 'accuracy'):
+            logger.info(f"  {metric}: {result['before'][metric]:.4g} -> {result['after'][metric]:.4g}")
+        logger.info(f"Saved to {result['path']}; set MODEL_SERVE_COMPACT=True to serve it")
+        
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+    
+    logger.info("Model compaction completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
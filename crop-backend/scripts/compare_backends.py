@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Script to compare estimator backends in training time, latency, size and accuracy
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.backends import BACKENDS
+from src.model import CropModel
+from src.utils import setup_logging
+
+def main():
+    """Main function to compare backends"""
+    parser = argparse.ArgumentParser(description="Compare the crop model's estimator backends")
+    parser.add_argument("--backends", default=",".join(BACKENDS),
+                        help=f"Comma-separated backends to compare (default: {','.join(BACKENDS)})")
+    parser.add_argument("--test-size", type=float, default=0.2, help="Test set size (default: 0.2)")
+    parser.add_argument("--random-state", type=int, default=42, help="Random state (default: 42)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+
+    args = parser.parse_args()
+
+    # Setup logging
+    setup_logging()
+    logger.info("Starting backend comparison")
+
+    try:
+        report = CropModel().compare_backends(
+            backends=[name for name in args.backends.split(",") if name],
+            test_size=args.test_size,
+            random_state=args.random_state
+        )
+
+        logger.info(f"{'backend':<24}{'train s':>9}{'1-row ms':>10}{'batch ms/row':>14}"
+                    f"{'pickle B':>12}{'model.bin B':>13}{'accuracy':>10}")
+        for row in report:
+            logger.info(f"{row['backend']:<24}{row['train_seconds']:>9.2f}{row['latency_ms']:>10.3f}"
+                        f"{row['batch_latency_ms_per_row']:>14.4f}{row['pickle_bytes']:>12}"
+                        f"{row['binary_bytes']:>13}{row['test_accuracy']:>10.4f}")
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2, default=float)
+            logger.info(f"Report written to {args.output}")
+
+    except Exception as e:
+        logger.error(f"Backend comparison failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+
+    logger.info("Backend comparison completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
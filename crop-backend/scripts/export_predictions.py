@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script to export new prediction history to a date-partitioned Parquet dataset
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config import settings
+from src.database import db_manager
+from src.export import PredictionExporter
+from src.prediction_store import prediction_store
+from src.utils import setup_logging
+
+def main():
+    """Main function to export predictions"""
+    parser = argparse.ArgumentParser(description="Export prediction history to Parquet")
+    parser.add_argument("--output-dir", default=settings.EXPORT_DIR, help=f"Dataset directory (default: {settings.EXPORT_DIR})")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE, help="Documents per cursor batch and row group")
+    parser.add_argument("--lag-seconds", type=float, default=settings.EXPORT_LAG_SECONDS, help="Leave predictions newer than this for the next run")
+    
+    args = parser.parse_args()
+    
+    # Setup logging
+    setup_logging()
+    logger.info("Starting prediction export")
+    
+    if not db_manager.connect(wait=True):
+        logger.error("Cannot export without a database connection")
+        return 1
+    
+    try:
+        exporter = PredictionExporter(
+            prediction_store,
+            output_dir=args.output_dir,
+            batch_size=args.batch_size,
+            lag_seconds=args.lag_seconds
+        )
+        result = exporter.export()
+        
+        logger.info("Export completed successfully!")
+        logger.info(f"Rows exported: {result['rows']} ({result['rows_per_second']:.0f} rows/s)")
+        logger.info(f"Files written: {result['partitions']}")
+        logger.info(f"High-water mark: {result['high_water_mark']}")
+        return 0
+        
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        return 1
+    finally:
+        db_manager.disconnect()
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Script to stream crop CSV exports into the cleaned Parquet training store
+"""
+
+import sys
+import glob
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.ingestion import ingest
+from src.preprocessing import source_paths
+from src.utils import setup_logging
+from src.config import settings
+
+def default_sources():
+    """The dataset CSVs training reads when no store exists"""
+    crop_data_path, indian_crops_path, _, _ = source_paths()
+    return [str(path) for path in (crop_data_path, indian_crops_path) if path.exists()]
+
+def main():
+    """Main function to ingest crop datasets"""
+    parser = argparse.ArgumentParser(description="Stream crop CSVs into the Parquet training store")
+    parser.add_argument("--source", action="append", default=[],
+                        help="CSV file or glob to ingest; repeatable (default: the dataset CSVs in DATA_PATH)")
+    parser.add_argument("--output", default=settings.INGESTED_DATA_PATH,
+                        help=f"Parquet store to write (default: {settings.INGESTED_DATA_PATH})")
+    parser.add_argument("--chunk-size", type=int, default=settings.INGEST_CHUNK_SIZE,
+                        help=f"Rows read per chunk (default: {settings.INGEST_CHUNK_SIZE})")
+    parser.add_argument("--columns", default="",
+                        help="Comma-separated feature columns to keep (default: the training features, "
+                             "with ndvi if every source has it)")
+
+    args = parser.parse_args()
+
+    # Setup logging
+    setup_logging()
+
+    try:
+        sources = sorted(path for pattern in args.source for path in glob.glob(pattern)) or default_sources()
+        if not sources:
+            logger.error("No source files found")
+            return 1
+        logger.info(f"Ingesting {len(sources)} sources into {args.output}")
+
+        result = ingest(
+            sources, args.output,
+            columns=[column for column in args.columns.split(",") if column],
+            chunk_size=args.chunk_size,
+            sentinel_path=source_paths()[2],
+            labelled_path=settings.LABELLED_DATA_PATH
+        )
+
+        logger.info(f"Rows: {result['rows_read']} read, {result['rows_written']} written, "
+                    f"{result['dropped_invalid']} invalid, {result['dropped_duplicates']} duplicates")
+        for stage, totals in result['stages'].items():
+            logger.info(f"  {stage}: {totals['rows_per_second']:,.0f} rows/s ({totals['seconds']:.2f}s)")
+        logger.info(f"Duplicate tracking used {result['digest_bytes']} bytes")
+
+    except Exception as e:
+        logger.error(f"Ingestion failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+
+    logger.info("Data ingestion completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
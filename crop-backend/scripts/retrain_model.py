@@ -23,6 +23,12 @@ def main():
     parser.add_argument("--test-size", type=float, default=0.2, help="Test set size (default: 0.2)")
     parser.add_argument("--random-state", type=int, default=42, help="Random state for reproducibility")
     parser.add_argument("--force", action="store_true", help="Force retrain even if model exists")
+    parser.add_argument("--evaluation", choices=["cv", "oob", "none"], default=None,
+                        help=f"Parallel cross-validation, out-of-bag estimate or none (default: {settings.TRAINING_EVALUATION})")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Only add trees for rows appended to {settings.LABELLED_DATA_PATH} since the last run")
+    parser.add_argument("--trees", type=int, default=settings.INCREMENTAL_TREES,
+                        help=f"Trees replaced by an incremental run (default: {settings.INCREMENTAL_TREES})")
     
     args = parser.parse_args()
     
@@ -30,9 +36,9 @@ def main():
     setup_logging()
     logger.info("Starting model retraining")
     
-    # Check if model already exists
+    # Check if model already exists (incremental runs always build on it)
     model_path = Path(settings.MODEL_PATH)
-    if model_path.exists() and not args.force:
+    if model_path.exists() and not args.force and not args.incremental:
         logger.warning(f"Model already exists at {model_path}")
         logger.info("Use --force flag to retrain anyway")
         response = input("Do you want to retrain anyway? (y/N): ")
@@ -52,11 +58,31 @@ def main():
         logger.info("Initializing crop model")
         model = CropModel()
         
+        if args.incremental:
+            logger.info("Starting incremental training...")
+            results = model.train_incremental(
+                test_size=args.test_size, random_state=args.random_state, n_trees=args.trees
+            )
+            if results is None:
+                logger.info("No new labelled data; the active model is unchanged")
+                return 0
+            
+            logger.info("Incremental Training Results:")
+            logger.info(f"  New rows: {results['new_rows']} ({results['train_rows']} used for new trees)")
+            logger.info(f"  Trees replaced: {results['trees_replaced']} of {results['n_estimators']}")
+            logger.info(f"  Rolling holdout accuracy: {results['previous_holdout_accuracy']:.4f} -> "
+                        f"{results['holdout_accuracy']:.4f} ({results['holdout_rows']} rows)")
+            for stage, seconds in results['timings'].items():
+                logger.info(f"  {stage}: {seconds:.2f}s")
+            logger.info(f"Model version {model.version} registered and active at: {settings.MODEL_PATH}")
+            return 0
+        
         # Train model
         logger.info("Starting model training...")
         training_results = model.train(
             test_size=args.test_size,
-            random_state=args.random_state
+            random_state=args.random_state,
+            evaluation=args.evaluation
         )
         
         # Display training results
@@ -64,8 +90,15 @@ def main():
         logger.info("Training Results:")
         logger.info(f"  Training Accuracy: {training_results['train_accuracy']:.4f}")
         logger.info(f"  Test Accuracy: {training_results['test_accuracy']:.4f}")
-        logger.info(f"  Cross-validation Mean: {training_results['cv_mean']:.4f}")
-        logger.info(f"  Cross-validation Std: {training_results['cv_std']:.4f}")
+        if 'cv_mean' in training_results:
+            logger.info(f"  Cross-validation Mean: {training_results['cv_mean']:.4f}")
+            logger.info(f"  Cross-validation Std: {training_results['cv_std']:.4f}")
+        if 'oob_score' in training_results:
+            logger.info(f"  Out-of-bag Score: {training_results['oob_score']:.4f}")
+        
+        logger.info("Stage Timings:")
+        for stage, seconds in training_results['timings'].items():
+            logger.info(f"  {stage}: {seconds:.2f}s")
         
         logger.info("Feature Importance:")
         for feature_info in training_results['feature_importance'][:5]:  # Top 5 features
@@ -82,7 +115,7 @@ def main():
         prediction = model.predict(sample_data)
         logger.info(f"Sample prediction: {prediction['crop']} (confidence: {prediction['confidence']:.3f})")
         
-        logger.info(f"Model saved to: {settings.MODEL_PATH}")
+        logger.info(f"Model version {model.version} registered and active at: {settings.MODEL_PATH}")
         
     except Exception as e:
         logger.error(f"Training failed: {e}")
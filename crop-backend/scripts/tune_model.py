@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Script to tune the forest hyperparameters for accuracy, latency and memory
+"""
+
+import sys
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.model import CropModel
+from src.utils import setup_logging
+from src.config import settings
+
+def main():
+    """Main function to tune the model"""
+    parser = argparse.ArgumentParser(description="Tune crop recommendation model hyperparameters")
+    parser.add_argument("--budget", type=float, default=settings.TUNING_BUDGET_SECONDS, help="Wall-clock budget in seconds")
+    parser.add_argument("--accuracy-floor", type=float, default=settings.TUNING_ACCURACY_FLOOR, help="Minimum validation accuracy")
+    parser.add_argument("--candidates", type=int, default=settings.TUNING_CANDIDATES, help="Parameter sets to try")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--random-state", type=int, default=42, help="Random state for reproducibility")
+    parser.add_argument("--dry-run", action="store_true", help="Report results without writing the config file")
+    
+    args = parser.parse_args()
+    
+    # Setup logging
+    setup_logging()
+    logger.info("Starting hyperparameter tuning")
+    
+    try:
+        model = CropModel()
+        results = model.tune(
+            budget_seconds=args.budget,
+            accuracy_floor=args.accuracy_floor,
+            n_candidates=args.candidates,
+            workers=args.workers,
+            random_state=args.random_state,
+            write_config=not args.dry_run
+        )
+        
+        logger.info("Successive halving rounds:")
+        for round_info in results['rounds']:
+            logger.info(f"  Round {round_info['round']}: {round_info['completed']}/{round_info['candidates']} "
+                        f"candidates on {round_info['resource']} rows"
+                        f"{'' if round_info['complete'] else ' (cut short by the budget)'}")
+        
+        logger.info("Pareto front (accuracy vs. latency vs. memory):")
+        for candidate in results['pareto_front']:
+            logger.info(f"  accuracy {candidate['accuracy']:.4f}  {candidate['latency_ms']:.3f} ms  "
+                        f"{candidate['nbytes'] / 1024:.0f} KiB  {candidate['params']}")
+        
+        chosen = results['chosen']
+        logger.info(f"Chosen: {chosen['params']}")
+        if results['config_path']:
+            logger.info(f"Saved to {results['config_path']}; run scripts/retrain_model.py to train with it")
+        
+    except Exception as e:
+        logger.error(f"Tuning failed: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 1
+    
+    logger.info("Hyperparameter tuning completed successfully")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+import time
+from loguru import logger
+
+# Upper bounds of the batch-size histogram buckets; larger batches land in the last bucket
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one batched inference call"""
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+        # Moving average of recent batch sizes, used to decide whether waiting pays off
+        self._avg_batch_size = 1.0
+
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self.histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + ['inf']}
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self.total_inference = 0.0
+
+    async def submit(self, row):
+        """Queue a single input row and wait for its prediction"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    def _ensure_worker(self):
+        """Bind the queue and worker task to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+
+        # Let requests scheduled in the same loop iteration enqueue themselves
+        await asyncio.sleep(0)
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        # Under light load a lone request would only pay the window as extra latency
+        if self._avg_batch_size < 2 and len(batch) == 1:
+            return batch
+
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Worker loop that executes batched predictions"""
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            rows = [row for row, _, _ in batch]
+
+            try:
+                results = self.predict_fn(rows)
+                if inspect.isawaitable(results):
+                    results = await results
+            except Exception as e:
+                self.failures += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._record(batch, started)
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _record(self, batch, started):
+        """Update batch size and wait time statistics"""
+        finished = time.perf_counter()
+        size = len(batch)
+
+        self.batches += 1
+        self.rows += size
+        self._avg_batch_size = 0.9 * self._avg_batch_size + 0.1 * size
+        self.histogram[next((b for b in BATCH_SIZE_BUCKETS if size <= b), 'inf')] += 1
+
+        for _, _, enqueued in batch:
+            wait = started - enqueued
+            self.total_wait += wait
+            self.max_observed_wait = max(self.max_observed_wait, wait)
+        self.total_inference += finished - started
+
+    def stats(self):
+        """Return queue depth, batch size histogram and added wait time"""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'rows': self.rows,
+            'failures': self.failures,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'batch_size_histogram': {str(bucket): count for bucket, count in self.histogram.items()},
+            'mean_wait_ms': self.total_wait / self.rows * 1000 if self.rows else 0.0,
+            'max_wait_observed_ms': self.max_observed_wait * 1000,
+            'mean_inference_ms': self.total_inference / self.batches * 1000 if self.batches else 0.0
+        }
+
+    async def close(self):
+        """Stop the worker task"""
+        if (self._worker is not None and not self._worker.done()
+                and self._loop is asyncio.get_running_loop()):
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            logger.info("Micro-batcher stopped")
+        self._worker = None
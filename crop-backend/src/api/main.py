@@ -1,18 +1,34 @@
+import asyncio
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from datetime import datetime
 from loguru import logger
 
-from .routes import router
+from .routes import (
+    router, batcher, early_exit_batcher, preload_model, serving_state, training_jobs, watch_model_registry
+)
 from .schemas import HealthResponse
 from ..config import settings
 from ..utils import setup_logging, create_directory_structure
 from ..database import db_manager
+from ..executors import executors
+from ..persistence import prediction_writer
+from ..prediction_store import prediction_store
 
 # Setup logging
 setup_logging()
 
+async def prepare_prediction_store():
+    """Create the prediction collections and indexes on the I/O pool"""
+    if db_manager.database is None:
+        return
+    try:
+        await executors.io.run(prediction_store.initialize)
+    except Exception as e:
+        logger.warning(f"Prediction store not initialized at startup: {e}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -22,19 +38,49 @@ async def lifespan(app: FastAPI):
     # Create directory structure
     create_directory_structure()
     
-    # Connect to database (optional)
+    # Connect to database (optional); the first ping runs in the background
     try:
         db_manager.connect()
     except Exception as e:
         logger.warning(f"Database connection failed: {e}")
         logger.info("API will continue without database functionality")
     
+    # Create prediction history collections and indexes without holding up startup
+    store_task = asyncio.create_task(prepare_prediction_store())
+    
+    # Start background persistence of predictions
+    prediction_writer.start()
+    
+    # Load and warm up the model in the background; /ready reports when it is done
+    preload_task = None
+    if settings.PRELOAD_MODEL:
+        preload_task = asyncio.create_task(preload_model())
+    else:
+        serving_state.update(status="ready", ready=True)
+    
+    # Follow versions activated by retraining in other processes
+    watch_task = None
+    if settings.MODEL_RELOAD_INTERVAL > 0:
+        watch_task = asyncio.create_task(watch_model_registry())
+    
     logger.info("API startup completed")
     
     yield
     
+    for task in (store_task, preload_task, watch_task):
+        if task is not None and not task.done():
+            task.cancel()
+    
     # Shutdown
     logger.info("Shutting down Crop Recommendation API")
+    await batcher.close()
+    await early_exit_batcher.close()
+    training_jobs.shutdown()
+    executors.shutdown()
+    
+    # Flush queued predictions before the database connection goes away
+    prediction_writer.stop(timeout=settings.WRITER_FLUSH_INTERVAL + 10)
+    
     try:
         db_manager.disconnect()
     except Exception as e:
@@ -91,6 +137,14 @@ async def api_health_check():
         version="1.0.0"
     )
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint; reports ready only once the model is loaded and warmed up"""
+    return JSONResponse(
+        status_code=200 if serving_state["ready"] else 503,
+        content={**serving_state, "timestamp": datetime.now().isoformat()}
+    )
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
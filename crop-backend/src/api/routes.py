@@ -1,21 +1,124 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from itertools import chain
+from typing import Optional
 from loguru import logger
+import asyncio
+import json
+import time
 import traceback
 
-from .schemas import CropInput, CropPrediction, ModelInfo, ErrorResponse
+import pandas as pd
+
+from .schemas import (
+    CropInput, CropPrediction, ModelInfo, ErrorResponse,
+    BatchCropInput, BatchPredictionItem, BatchPredictionResponse, PredictionHistoryPage
+)
 from ..model import CropModel
-from ..utils import validate_input_data, get_crop_info
+from ..jobs import TrainingJobManager, TrainingJobRejected
+from ..training import EVALUATION_MODES
+from ..config import settings
+from ..utils import (
+    validate_input_data, get_crop_info, input_batch_to_matrix, validate_input_batch, INPUT_FEATURES
+)
+from ..persistence import prediction_writer
 from ..database import db_manager
+from ..prediction_store import prediction_store, encode_cursor, decode_cursor
+from ..rollups import prediction_rollups
+from ..export import prediction_exporter
+from ..executors import executors, ExecutorSaturatedError
+from .batching import MicroBatcher
 
 router = APIRouter()
 model = CropModel()
+batcher = MicroBatcher(
+    lambda rows: executors.inference.run(model.predict_batch, rows, early_exit=False),
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS
+)
+# Requests opting into early exit are coalesced separately
+early_exit_batcher = MicroBatcher(
+    lambda rows: executors.inference.run(model.predict_batch, rows, early_exit=True),
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS
+)
+# Training runs in separate processes; a registered version is swapped in when a job succeeds
+training_jobs = TrainingJobManager(on_success=lambda job: model.reload())
+
+# Startup preload progress, reported by the readiness endpoint
+serving_state = {
+    "status": "starting",
+    "ready": False,
+    "load_ms": None,
+    "warmup_ms": None,
+    "warmup_latency_ms": {},
+    "error": None
+}
+
+async def preload_model():
+    """Load the model and run warm-up predictions before reporting ready"""
+    serving_state.update(status="loading", ready=False, error=None)
+    try:
+        started = time.perf_counter()
+        success = await executors.io.run(model.load_model)
+        serving_state["load_ms"] = (time.perf_counter() - started) * 1000
+        if not success:
+            serving_state.update(status="model_unavailable", error="Model not found. Please train the model first.")
+            logger.warning("Model preload failed; predictions unavailable until a model is trained")
+            return
+        
+        serving_state["status"] = "warming_up"
+        started = time.perf_counter()
+        latencies = await executors.inference.run(
+            model.warm_up, settings.WARMUP_ROUNDS, settings.WARMUP_BATCH_SIZES
+        )
+        serving_state["warmup_ms"] = (time.perf_counter() - started) * 1000
+        serving_state["warmup_latency_ms"] = {str(size): ms for size, ms in latencies.items()}
+        
+        serving_state.update(status="ready", ready=True)
+        logger.info(
+            f"Model ready: load {serving_state['load_ms']:.1f} ms, "
+            f"warm-up {serving_state['warmup_ms']:.1f} ms"
+        )
+    except Exception as e:
+        serving_state.update(status="failed", error=str(e))
+        logger.error(f"Model preload failed: {e}")
+
+async def watch_model_registry():
+    """Periodically pick up model versions activated by other processes"""
+    while True:
+        await asyncio.sleep(settings.MODEL_RELOAD_INTERVAL)
+        try:
+            if await executors.io.run(model.reload):
+                logger.info(f"Now serving model version {model.version}")
+        except Exception as e:
+            logger.warning(f"Model reload check failed: {e}")
+
+def resolve_early_exit(early_exit: Optional[bool]):
+    """A request's early-exit choice, defaulting to EARLY_EXIT_ENABLED"""
+    return settings.EARLY_EXIT_ENABLED if early_exit is None else early_exit
+
+async def predict_single(input_row: dict, early_exit=False):
+    """Predict one row, coalescing with concurrent requests when micro-batching is enabled"""
+    if settings.MICRO_BATCHING_ENABLED:
+        return await (early_exit_batcher if early_exit else batcher).submit(input_row)
+    return await executors.inference.run(model.predict, input_row, early_exit=early_exit)
+
+def busy_error(e: ExecutorSaturatedError):
+    """Map a saturated executor pool to a retryable HTTP error"""
+    logger.warning(f"Rejecting request: {e}")
+    return HTTPException(status_code=503, detail="Server busy, please retry shortly")
 
 @router.post("/predict", response_model=CropPrediction)
-async def predict_crop(input_data: CropInput):
+async def predict_crop(
+    input_data: CropInput,
+    early_exit: Optional[bool] = Query(None, description="Stop evaluating trees once the crop is settled")
+):
     """
     Predict the most suitable crop based on soil and environmental conditions
     """
+    early_exit = resolve_early_exit(early_exit)
     try:
         logger.info(f"Received prediction request: {input_data.dict()}")
         
@@ -26,39 +129,41 @@ async def predict_crop(input_data: CropInput):
         
         # Make prediction
         try:
-            prediction_result = model.predict(input_data.dict())
+            prediction_result = await predict_single(input_data.dict(), early_exit)
         except ValueError as e:
             # Try to load model if not already loaded
             if "Model not trained or loaded" in str(e):
-                success = model.load_model()
+                success = await executors.io.run(model.load_model)
                 if not success:
                     raise HTTPException(
                         status_code=503, 
                         detail="Model not available. Please train the model first using the /train endpoint or scripts/retrain_model.py"
                     )
-                prediction_result = model.predict(input_data.dict())
+                prediction_result = await predict_single(input_data.dict(), early_exit)
             else:
                 raise
         
         # Get additional crop information
         crop_info = get_crop_info(prediction_result['crop'])
         
-        # Save prediction to database (optional)
-        try:
-            db_manager.save_prediction(
-                input_data.dict(), 
-                prediction_result['crop'], 
-                prediction_result['confidence']
-            )
-        except Exception as db_error:
-            logger.warning(f"Failed to save prediction to database: {db_error}")
+        # Queue prediction for background persistence (optional)
+        if not await prediction_writer.submit_async({
+            "input_data": input_data.dict(),
+            "prediction": prediction_result['crop'],
+            "confidence": prediction_result['confidence'],
+            "model_version": model.version
+        }):
+            logger.warning("Prediction writer queue full; prediction not persisted")
         
         # Prepare response
         response = CropPrediction(
             crop=prediction_result['crop'],
             confidence=prediction_result['confidence'],
             all_probabilities=prediction_result['all_probabilities'],
-            crop_info=crop_info
+            crop_info=crop_info,
+            trees_used=prediction_result.get('trees_used'),
+            exit_reason=prediction_result.get('exit_reason'),
+            source=prediction_result.get('source')
         )
         
         logger.info(f"Prediction successful: {prediction_result['crop']} (confidence: {prediction_result['confidence']:.3f})")
@@ -66,11 +171,198 @@ async def predict_crop(input_data: CropInput):
         
     except HTTPException:
         raise
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_crop_batch(
+    batch: BatchCropInput,
+    early_exit: Optional[bool] = Query(None, description="Stop evaluating trees once each crop is settled")
+):
+    """
+    Predict suitable crops for many inputs in one request
+    
+    Invalid rows are reported individually and do not fail the rest of the batch.
+    """
+    early_exit = resolve_early_exit(early_exit)
+    if (batch.rows is None) == (batch.columns is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of 'rows' or 'columns'")
+    
+    try:
+        matrix = input_batch_to_matrix(rows=batch.rows, columns=batch.columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(matrix) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(matrix)} rows exceeds the limit of {settings.MAX_BATCH_SIZE}"
+        )
+    
+    try:
+        logger.info(f"Received batch prediction request with {len(matrix)} rows")
+        
+        # Validate every row in one vectorized pass
+        invalid_rows = validate_input_batch(matrix)
+        valid_index = [i for i in range(len(matrix)) if i not in invalid_rows]
+        
+        # Run a single inference over all valid rows
+        predictions = []
+        if valid_index:
+            valid_df = pd.DataFrame(matrix[valid_index], columns=INPUT_FEATURES)
+            try:
+                predictions = await executors.inference.run(model.predict_batch, valid_df, early_exit=early_exit)
+            except ValueError as e:
+                if "Model not trained or loaded" in str(e):
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Model not available. Please train the model first using the /train endpoint or scripts/retrain_model.py"
+                    )
+                raise
+        
+        results = [
+            BatchPredictionItem(index=i, errors=errors)
+            for i, errors in invalid_rows.items()
+        ]
+        records = []
+        input_rows = valid_df.to_dict('records') if valid_index else []
+        for i, input_row, prediction_result in zip(valid_index, input_rows, predictions):
+            results.append(BatchPredictionItem(
+                index=i,
+                prediction=CropPrediction(
+                    crop=prediction_result['crop'],
+                    confidence=prediction_result['confidence'],
+                    all_probabilities=prediction_result['all_probabilities'],
+                    crop_info=get_crop_info(prediction_result['crop']),
+                    trees_used=prediction_result.get('trees_used'),
+                    exit_reason=prediction_result.get('exit_reason'),
+                    source=prediction_result.get('source')
+                )
+            ))
+            records.append({
+                "input_data": {field: value for field, value in input_row.items() if pd.notna(value)},
+                "prediction": prediction_result['crop'],
+                "confidence": prediction_result['confidence'],
+                "model_version": model.version
+            })
+        results.sort(key=lambda item: item.index)
+        
+        # Queue predictions for background persistence (optional)
+        accepted = await prediction_writer.submit_many_async(records)
+        if accepted < len(records):
+            logger.warning(f"Prediction writer queue full; {len(records) - accepted} predictions not persisted")
+        
+        logger.info(f"Batch prediction completed: {len(predictions)} succeeded, {len(invalid_rows)} failed")
+        return BatchPredictionResponse(
+            results=results,
+            total=len(matrix),
+            succeeded=len(predictions),
+            failed=len(invalid_rows)
+        )
+        
+    except HTTPException:
+        raise
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def json_default(value):
+    """Serialize datetimes in history rows as ISO 8601"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def stream_history_page(rows, limit):
+    """Write a history page as JSON item by item, ending with the next page cursor"""
+    yield '{"items":['
+    count = 0
+    last = None
+    has_more = False
+    for row in rows:
+        if count == limit:
+            has_more = True
+            break
+        yield ("," if count else "") + json.dumps(row, default=json_default)
+        last = row
+        count += 1
+    next_cursor = encode_cursor(last) if has_more else None
+    yield f'],"count":{count},"next_cursor":{json.dumps(next_cursor)}}}'
+
+@router.get("/predictions", responses={200: {"model": PredictionHistoryPage}})
+async def get_prediction_history(
+    limit: int = Query(settings.HISTORY_DEFAULT_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    crop: Optional[str] = None,
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+    start: Optional[datetime] = Query(None, description="Earliest timestamp (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Latest timestamp (exclusive)"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. prediction,confidence")
+):
+    """
+    Page through stored predictions, newest first
+    
+    Pages are keyed on (timestamp, id) rather than skipped over, so every page
+    costs one index range scan regardless of how deep it is.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        prediction_store.projection(field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def first_rows():
+        # Run the query up front so connection errors surface before streaming starts
+        rows = prediction_store.iter_history(
+            limit + 1, fields=field_list, crop=crop, min_confidence=min_confidence,
+            max_confidence=max_confidence, start=start, end=end, after=after
+        )
+        first = next(rows, None)
+        return rows if first is None else chain([first], rows)
+    
+    try:
+        rows = await executors.io.run(first_rows)
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
+    except Exception as e:
+        logger.error(f"Prediction history error: {e}")
+        raise HTTPException(status_code=503, detail="Prediction history is not available")
+    
+    return StreamingResponse(stream_history_page(rows, limit), media_type="application/json")
+
+@router.get("/stats")
+async def get_prediction_stats(
+    granularity: str = Query("day", description="hour, day or month"),
+    start: Optional[datetime] = Query(None, description="Earliest bucket (defaults to 24 hours, 30 days or 12 months back)"),
+    end: Optional[datetime] = Query(None, description="End of the window (exclusive, defaults to now)"),
+    crop: Optional[str] = None
+):
+    """
+    Prediction counts, mean confidence and input averages per crop and time bucket
+    
+    Served from pre-aggregated rollups, so the cost depends on the number of
+    buckets in the window rather than the number of predictions.
+    """
+    try:
+        return await executors.io.run(
+            prediction_rollups.query, granularity=granularity, start=start, end=end, crop=crop
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
+    except Exception as e:
+        logger.error(f"Prediction stats error: {e}")
+        raise HTTPException(status_code=503, detail="Prediction statistics are not available")
+
 @router.get("/model/info", response_model=ModelInfo)
 async def get_model_info():
     """
@@ -78,8 +370,8 @@ async def get_model_info():
     """
     try:
         # Try to load model if not already loaded
-        if model.model is None:
-            success = model.load_model()
+        if not model.is_loaded:
+            success = await executors.io.run(model.load_model)
             if not success:
                 raise HTTPException(
                     status_code=404, 
@@ -98,28 +390,126 @@ async def get_model_info():
         logger.error(f"Error getting model info: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.post("/model/train")
-async def train_model():
+@router.post("/model/train", status_code=202)
+async def train_model(
+    evaluation: Optional[str] = Query(None, description="cv, oob or none"),
+    incremental: bool = Query(False, description="Only add trees for labelled rows collected since the last run")
+):
     """
-    Train the crop recommendation model
+    Start training the crop recommendation model in a background job
     """
+    if evaluation is not None and evaluation not in EVALUATION_MODES:
+        raise HTTPException(status_code=400, detail=f"evaluation must be one of {', '.join(EVALUATION_MODES)}")
     try:
-        logger.info("Starting model training via API")
-        
-        # Train the model
-        training_results = model.train()
-        
-        logger.info("Model training completed successfully")
-        return {
-            "message": "Model trained successfully",
-            "results": training_results,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"Training error: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Training failed: {str(e)}")
+        if incremental:
+            job = training_jobs.submit('incremental')
+        else:
+            job = training_jobs.submit('full', evaluation=evaluation)
+    except TrainingJobRejected as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    logger.info(f"Training job {job.id} submitted via API")
+    return {
+        "message": "Training job submitted",
+        "job_id": job.id,
+        "status": job.status,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/model/train")
+async def list_training_jobs():
+    """
+    List recent training jobs, newest first
+    """
+    return {"jobs": [job.to_dict() for job in training_jobs.list_jobs()], **training_jobs.stats()}
+
+@router.get("/model/train/{job_id}")
+async def get_training_job(job_id: str):
+    """
+    Status and per-stage progress of a training job
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job: {job_id}")
+    return job.to_dict()
+
+@router.delete("/model/train/{job_id}")
+async def cancel_training_job(job_id: str):
+    """
+    Cancel a queued or running training job
+    """
+    if training_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown training job: {job_id}")
+    if not training_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Training job has already finished")
+    return training_jobs.get(job_id).to_dict()
+
+def log_reload_failure(future):
+    """Log errors from a background model reload"""
+    if future.exception() is not None:
+        logger.error(f"Model reload failed: {future.exception()}")
+
+@router.post("/model/reload", status_code=202)
+async def reload_model():
+    """
+    Switch to the registry's active model version in the background
+    """
+    try:
+        future = executors.io.submit(model.reload)
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
+    
+    future.add_done_callback(log_reload_failure)
+    return {
+        "message": "Reload scheduled",
+        "active_version": model.registry.active_version(),
+        "serving_version": model.version,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def log_export_failure(future):
+    """Log errors from a background prediction export"""
+    if future.exception() is not None:
+        logger.error(f"Prediction export failed: {future.exception()}")
+
+@router.post("/admin/export", status_code=202)
+async def export_predictions():
+    """
+    Append predictions made since the last export to the Parquet dataset in the background
+    """
+    if prediction_exporter.running:
+        raise HTTPException(status_code=409, detail="An export is already running")
+    try:
+        future = executors.io.submit(prediction_exporter.export)
+    except ExecutorSaturatedError as e:
+        raise busy_error(e)
+    
+    future.add_done_callback(log_export_failure)
+    return {
+        "message": "Export scheduled",
+        **prediction_exporter.status(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/admin/export")
+async def get_export_status():
+    """
+    Status of the prediction export: running flag, high-water mark and last run summary
+    """
+    return prediction_exporter.status()
+
+@router.get("/model/versions")
+async def list_model_versions():
+    """
+    List registered model versions with their metadata
+    """
+    registry = model.registry
+    versions = [registry.metadata(version) for version in registry.list_versions()]
+    return {
+        "active_version": registry.active_version(),
+        "serving_version": model.version,
+        "versions": versions
+    }
 
 @router.get("/crops")
 async def get_supported_crops():
@@ -128,11 +518,12 @@ async def get_supported_crops():
     """
     try:
         # Try to load model if not already loaded
-        if model.model is None:
-            success = model.load_model()
+        if not model.is_loaded:
+            success = await executors.io.run(model.load_model)
             if not success:
                 return {
                     "crops": [],
+                    "total": 0,
                     "message": "Model not available. Please train the model first."
                 }
         
@@ -140,6 +531,7 @@ async def get_supported_crops():
         if model_info is None:
             return {
                 "crops": [],
+                "total": 0,
                 "message": "Model information not available"
             }
         
@@ -160,6 +552,27 @@ async def get_supported_crops():
         logger.error(f"Error getting crops: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Get serving metrics for tuning the inference pipeline
+    """
+    return {
+        "micro_batching": {
+            "enabled": settings.MICRO_BATCHING_ENABLED,
+            **batcher.stats()
+        },
+        "early_exit_batching": early_exit_batcher.stats(),
+        "prediction_cache": model.cache.stats() if model.cache else {"enabled": False},
+        "executors": executors.stats(),
+        "training_jobs": training_jobs.stats(),
+        "prediction_writer": prediction_writer.stats(),
+        "database": db_manager.stats(),
+        "prediction_store": prediction_store.stats(),
+        "rollups": prediction_rollups.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
 @router.get("/predict/sample")
 async def get_sample_prediction():
     """
@@ -178,8 +591,8 @@ async def get_sample_prediction():
             ndvi=0.65
         )
         
-        # Make prediction
-        prediction_result = await predict_crop(sample_input)
+        # Make prediction; called directly, so the query default must be passed explicitly
+        prediction_result = await predict_crop(sample_input, early_exit=None)
         
         return {
             "input": sample_input.dict(),
@@ -187,6 +600,8 @@ async def get_sample_prediction():
             "message": "Sample prediction for testing purposes"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Sample prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 class CropInput(BaseModel):
     """Input schema for crop prediction"""
@@ -30,8 +30,47 @@ class CropPrediction(BaseModel):
     """Output schema for crop prediction"""
     crop: str = Field(..., description="Recommended crop")
     confidence: float = Field(..., description="Prediction confidence", ge=0, le=1)
-    all_probabilities: dict = Field(..., description="Probabilities for all crops")
+    all_probabilities: dict = Field(..., description="Probabilities for all crops; lookup answers keep only the top k and report the rest as 0")
     crop_info: Optional[dict] = Field(None, description="Additional crop information")
+    trees_used: Optional[int] = Field(None, description="Trees evaluated for this prediction")
+    exit_reason: Optional[str] = Field(
+        None, description="Why early-exit evaluation stopped: exact, confidence or full"
+    )
+    source: Optional[str] = Field(None, description="lookup or forest, when a lookup table is served")
+
+class BatchCropInput(BaseModel):
+    """Input schema for batch crop prediction, given as rows or as column arrays"""
+    rows: Optional[List[Dict[str, Optional[float]]]] = Field(
+        None, description="Inputs as a list of CropInput-shaped objects"
+    )
+    columns: Optional[Dict[str, List[Optional[float]]]] = Field(
+        None, description="Inputs as one array per feature, all of the same length"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "rows": [
+                    {"N": 90, "P": 42, "K": 43, "temperature": 20.87, "humidity": 82.00,
+                     "ph": 6.50, "rainfall": 202.93, "ndvi": 0.65},
+                    {"N": 120, "P": 60, "K": 80, "temperature": 25.5, "humidity": 70.0,
+                     "ph": 7.0, "rainfall": 150.0}
+                ]
+            }
+        }
+
+class BatchPredictionItem(BaseModel):
+    """Result for a single row of a batch prediction"""
+    index: int = Field(..., description="Position of the row in the request")
+    prediction: Optional[CropPrediction] = Field(None, description="Prediction for a valid row")
+    errors: Optional[List[str]] = Field(None, description="Validation errors for an invalid row")
+
+class BatchPredictionResponse(BaseModel):
+    """Output schema for batch crop prediction"""
+    results: List[BatchPredictionItem] = Field(..., description="Per-row results in request order")
+    total: int = Field(..., description="Number of rows received")
+    succeeded: int = Field(..., description="Number of rows predicted")
+    failed: int = Field(..., description="Number of rows rejected by validation")
 
 class HealthResponse(BaseModel):
     """Health check response"""
@@ -52,12 +91,20 @@ class ModelInfo(BaseModel):
     feature_columns: list
     n_classes: int
     classes: list
+    version: Optional[str] = None
     last_trained: Optional[str] = None
 
 class PredictionHistory(BaseModel):
-    """Prediction history schema"""
+    """Prediction history schema; fields left out of a projection are omitted"""
     id: str
-    input_data: CropInput
-    prediction: str
-    confidence: float
-    timestamp: str
\ No newline at end of file
+    input_data: Optional[CropInput] = None
+    prediction: Optional[str] = None
+    confidence: Optional[float] = None
+    model_version: Optional[str] = None
+    timestamp: str
+
+class PredictionHistoryPage(BaseModel):
+    """One page of prediction history"""
+    items: List[PredictionHistory]
+    count: int
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor for the next page; null on the last page")
\ No newline at end of file
@@ -0,0 +1,117 @@
+import tempfile
+import time
+from pathlib import Path
+import joblib
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
+from loguru import logger
+from .config import settings
+from .inference import CompiledForest
+from .model_format import save_binary
+from .training import FOREST_PARAMS, build_forest
+from .tuning import SEARCH_SPACE, measure_latency
+from .compaction import accuracy
+
+class RandomForestBackend:
+    """Bagged random forest: leaf class distributions averaged over the trees"""
+
+    name = "random_forest"
+    default_params = FOREST_PARAMS
+    search_space = SEARCH_SPACE
+    supports_oob = True
+
+    def build(self, random_state=42, n_jobs=-1, oob_score=False, **overrides):
+        """Create an unfitted forest, building trees on n_jobs cores"""
+        return build_forest(random_state=random_state, n_jobs=n_jobs, oob_score=oob_score, **overrides)
+
+    def feature_importance(self, estimator, X, y, random_state=42):
+        """Impurity-based importances recorded while fitting"""
+        return estimator.feature_importances_
+
+class HistGradientBoostingBackend:
+    """Histogram gradient boosting: one shallow tree per class per iteration, softmax of summed scores
+
+    Boosting is sequential, so n_jobs has no effect; sklearn parallelises
+    histogram building with OpenMP threads instead.
+    """
+
+    name = "hist_gradient_boosting"
+    default_params = {
+        'max_iter': 100,
+        'learning_rate': 0.1,
+        'max_leaf_nodes': 31,
+        'max_depth': 8,
+        'min_samples_leaf': 20,
+        'l2_regularization': 0.0,
+        'early_stopping': False
+    }
+    search_space = {
+        'max_iter': [25, 50, 100, 200],
+        'learning_rate': [0.05, 0.1, 0.2],
+        'max_leaf_nodes': [15, 31, 63],
+        'max_depth': [4, 6, 8, None],
+        'min_samples_leaf': [10, 20, 40],
+        'l2_regularization': [0.0, 1.0]
+    }
+    supports_oob = False
+
+    def build(self, random_state=42, n_jobs=-1, oob_score=False, **overrides):
+        """Create an unfitted boosted ensemble"""
+        if oob_score:
+            raise ValueError(f"The {self.name} backend has no out-of-bag estimate; use cv or none")
+        return HistGradientBoostingClassifier(**{**self.default_params, **overrides}, random_state=random_state)
+
+    def feature_importance(self, estimator, X, y, random_state=42):
+        """Permutation importances on (X, y); boosted trees record no impurity importances"""
+        return permutation_importance(estimator, X, y, n_repeats=5, random_state=random_state).importances_mean
+
+BACKENDS = {backend.name: backend for backend in (RandomForestBackend(), HistGradientBoostingBackend())}
+
+def get_backend(name=None):
+    """The backend called name, or the MODEL_BACKEND setting"""
+    name = name or settings.MODEL_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model backend {name!r}; choose one of {', '.join(BACKENDS)}") from None
+
+def compare_backends(X_train, y_train, X_test, y_test, names=None, random_state=42, n_jobs=-1):
+    """Train every backend on the same split and report time, latency, size and accuracy
+
+    Latency is measured on the compiled engine that serves predictions;
+    sizes are the pickled estimator and the binary model.bin artifact.
+    """
+    report = []
+    for name in names or BACKENDS:
+        backend = get_backend(name)
+        estimator = backend.build(random_state=random_state, n_jobs=n_jobs)
+        started = time.perf_counter()
+        estimator.fit(X_train, y_train)
+        train_seconds = time.perf_counter() - started
+        engine = CompiledForest.from_estimator(estimator)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pickle_path = Path(tmp_dir) / "model.pkl"
+            binary_path = Path(tmp_dir) / "model.bin"
+            joblib.dump(estimator, pickle_path)
+            save_binary(binary_path, engine, estimator.classes_, [str(i) for i in range(X_train.shape[1])],
+                        type(estimator).__name__)
+            pickle_bytes = pickle_path.stat().st_size
+            binary_bytes = binary_path.stat().st_size
+
+        row = {
+            'backend': name,
+            'params': backend.default_params,
+            'train_seconds': train_seconds,
+            'n_trees': engine.n_estimators,
+            'n_nodes': engine.n_nodes,
+            'nbytes': engine.nbytes,
+            'pickle_bytes': pickle_bytes,
+            'binary_bytes': binary_bytes,
+            'test_accuracy': accuracy(engine, X_test, y_test),
+            **measure_latency(engine, X_test)
+        }
+        logger.info(f"Backend {name}: {row['train_seconds']:.2f}s to train, {row['latency_ms']:.3f} ms per row, "
+                    f"{row['binary_bytes']} bytes, accuracy {row['test_accuracy']:.4f}")
+        report.append(row)
+    return report
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+def parse_rounding(spec: str):
+    """Parse a "feature:decimals,..." string into a dict"""
+    rounding = {}
+    for item in spec.split(","):
+        if item.strip():
+            feature, decimals = item.split(":")
+            rounding[feature.strip()] = int(decimals)
+    return rounding
+
+class PredictionCache:
+    """Size-bounded LRU cache of predictions keyed on quantized input vectors
+
+    The cache is bound to one model snapshot at a time; seeing a different
+    snapshot clears it, so a model swap can never serve stale predictions.
+    """
+
+    def __init__(self, max_size=10000, ttl=None, rounding=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.rounding = rounding or {}
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._owner = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def quantize(self, X, feature_columns):
+        """Round each feature column to its configured number of decimals"""
+        X = X.copy()
+        for j, feature in enumerate(feature_columns):
+            if feature in self.rounding:
+                X[:, j] = np.round(X[:, j], self.rounding[feature])
+        return X
+
+    def _bind(self, owner):
+        """Drop all entries if they were produced by a different model"""
+        if self._owner is not owner:
+            if self._owner is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._owner = owner
+
+    def get_many(self, owner, keys):
+        """Look up keys, returning the cached value or None for each"""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._bind(owner)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    results.append(entry[0])
+        return results
+
+    def put_many(self, owner, keys, values):
+        """Insert values, evicting least recently used entries beyond max_size"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            # Results computed by a model that has since been replaced are not cached
+            if self._owner is not owner:
+                return
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'rounding': self.rounding,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,175 @@
+import numpy as np
+from loguru import logger
+from .inference import CompiledForest
+
+def tree_node_ranges(engine):
+    """(start, end) node index range of every tree in the flat tables"""
+    ends = np.append(engine.roots[1:], engine.n_nodes)
+    return list(zip(engine.roots.tolist(), ends.tolist()))
+
+def greedy_tree_order(engine, X, y, max_elements=1 << 22):
+    """Order trees by greedy forward selection on validation accuracy
+
+    At each step the tree whose addition gives the most accurate soft-voting
+    ensemble is appended (ties go to the smaller tree). Returns the order and
+    the validation accuracy after each step. Candidate votes are gathered
+    from the leaf indices a block of rows at a time, so at most max_elements
+    probabilities are held at once.
+    """
+    leaves = engine.apply(X)  # (rows, trees)
+    sizes = np.diff(np.append(engine.roots, engine.n_nodes))
+    y_index = np.searchsorted(engine.classes, y)
+    block = max(1, max_elements // (engine.n_estimators * len(engine.classes)))
+
+    remaining = list(range(engine.n_estimators))
+    running = np.zeros((len(X), len(engine.classes)))
+    order, accuracies = [], []
+    while remaining:
+        correct = np.zeros(len(remaining), dtype=np.int64)
+        for start in range(0, len(X), block):
+            rows = slice(start, start + block)
+            candidates = running[rows, None, :] + engine.value[leaves[rows][:, remaining]]
+            correct += (np.argmax(candidates, axis=2) == y_index[rows, None]).sum(axis=0)
+        accuracy = correct / len(X)
+        best = max(range(len(remaining)), key=lambda i: (accuracy[i], -sizes[remaining[i]]))
+        tree = remaining.pop(best)
+        running += engine.value[leaves[:, tree]]
+        order.append(tree)
+        accuracies.append(float(accuracy[best]))
+    return order, accuracies
+
+def compact_forest(engine, trees, collapse=True):
+    """Copy the given trees into new flat tables, collapsing subtrees whose leaves agree
+
+    A subtree whose leaves all predict the same class is replaced by a single
+    leaf holding the subtree root's class distribution. That distribution is
+    a weighted mix of the leaves' distributions, so each tree's top class is
+    the same, but the probabilities it adds to the soft vote change, so the
+    ensemble's prediction can. collapse=False only copies the trees.
+    """
+    predicted = np.argmax(engine.value, axis=1)
+    ranges = tree_node_ranges(engine)
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    max_depth = 0
+    for tree in trees:
+        start, end = ranges[tree]
+
+        # Post-order pass: the class every leaf below a node agrees on, or -1
+        agreed = {}
+        stack = [(start, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if engine.left[node] == node:
+                agreed[node] = predicted[node]
+            elif children_done:
+                left_class = agreed[int(engine.left[node])]
+                agreed[node] = left_class if collapse and left_class == agreed[int(engine.right[node])] else -1
+            else:
+                stack.append((node, True))
+                stack.append((int(engine.left[node]), False))
+                stack.append((int(engine.right[node]), False))
+
+        # Pre-order pass: copy nodes, stopping at collapsed subtrees
+        offset = len(features)
+        roots.append(offset)
+        new_index = {}
+        order = []
+        stack = [(start, 0)]
+        while stack:
+            node, depth = stack.pop()
+            new_index[node] = offset + len(order)
+            order.append(node)
+            max_depth = max(max_depth, depth)
+            if engine.left[node] != node and agreed[node] == -1:
+                stack.append((int(engine.right[node]), depth + 1))
+                stack.append((int(engine.left[node]), depth + 1))
+
+        for node in order:
+            index = new_index[node]
+            if engine.left[node] == node or agreed[node] != -1:
+                features.append(0)
+                thresholds.append(np.inf)
+                lefts.append(index)
+                rights.append(index)
+            else:
+                features.append(int(engine.feature[node]))
+                thresholds.append(float(engine.threshold[node]))
+                lefts.append(new_index[int(engine.left[node])])
+                rights.append(new_index[int(engine.right[node])])
+            values.append(engine.value[node])
+
+    return CompiledForest(
+        feature=np.array(features, dtype=engine.feature.dtype),
+        threshold=np.array(thresholds, dtype=engine.threshold.dtype),
+        left=np.array(lefts, dtype=engine.left.dtype),
+        right=np.array(rights, dtype=engine.right.dtype),
+        value=np.array(values, dtype=engine.value.dtype),
+        roots=np.array(roots, dtype=engine.roots.dtype),
+        classes=np.array(engine.classes),
+        max_depth=max_depth
+    )
+
+def accuracy(engine, X, y):
+    labels, _ = engine.predict(X)
+    return float(np.mean(labels == y))
+
+def compact(engine, X, y, max_accuracy_loss=0.005, target_latency_ms=None, measure=None):
+    """Select and collapse trees until the accuracy target or latency budget is met
+
+    Trees are added in greedy order until validation accuracy is within
+    max_accuracy_loss of the full forest. Collapsing can move the soft vote,
+    so the bound is checked again on the collapsed forest and trees are added
+    until it holds; if no collapsed prefix meets it, the greedy prefix is kept
+    uncollapsed. If target_latency_ms is given, the selection is then cut back
+    to the most trees whose compacted forest predicts a single row within
+    that budget, even if that costs more accuracy. measure(engine) returns
+    the single-row latency in milliseconds.
+    """
+    baseline = accuracy(engine, X, y)
+    target = baseline - max_accuracy_loss
+    order, curve = greedy_tree_order(engine, X, y)
+
+    # Smallest prefix of the greedy order within the allowed accuracy loss
+    greedy_trees = next((k for k, acc in enumerate(curve, start=1) if acc >= target), len(order))
+    n_trees = greedy_trees
+    compacted = compact_forest(engine, order[:n_trees])
+    while accuracy(compacted, X, y) < target and n_trees < len(order):
+        n_trees += 1
+        compacted = compact_forest(engine, order[:n_trees])
+    collapsed = accuracy(compacted, X, y) >= target
+    if not collapsed:
+        logger.warning("Collapsed forests miss the accuracy bound; keeping the selected trees uncollapsed")
+        n_trees = greedy_trees
+        compacted = compact_forest(engine, order[:n_trees], collapse=False)
+    stopped_by = 'accuracy'
+
+    if target_latency_ms is not None and measure(compacted) > target_latency_ms:
+        # Latency grows with the tree count: binary search the largest count within budget
+        low, high = 1, n_trees - 1
+        best = compact_forest(engine, order[:1], collapse=collapsed)
+        while low <= high:
+            middle = (low + high) // 2
+            candidate = compact_forest(engine, order[:middle], collapse=collapsed)
+            if measure(candidate) <= target_latency_ms:
+                best, low = candidate, middle + 1
+            else:
+                high = middle - 1
+        compacted = best
+        n_trees = compacted.n_estimators
+        stopped_by = 'latency'
+
+    compacted_accuracy = accuracy(compacted, X, y)
+    logger.info(
+        f"Compacted forest to {n_trees}/{engine.n_estimators} trees and "
+        f"{compacted.n_nodes}/{engine.n_nodes} nodes (stopped by {stopped_by}, "
+        f"accuracy {baseline:.4f} -> {compacted_accuracy:.4f})"
+    )
+    return compacted, {
+        'stopped_by': stopped_by,
+        'trees_selected': n_trees,
+        'collapsed': collapsed,
+        'greedy_accuracy_curve': curve,
+        'baseline_accuracy': baseline,
+        'compacted_accuracy': compacted_accuracy
+    }
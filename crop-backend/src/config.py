@@ -14,6 +14,38 @@ class Settings:
     # Database Configuration
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017/crop_recommendation")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "crop_recommendation")
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "1000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "5000"))
+    MONGO_WRITE_CONCERN_W: str = os.getenv("MONGO_WRITE_CONCERN_W", "1")
+    MONGO_WRITE_TIMEOUT_MS: int = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "2000"))
+    # Consecutive failures before writes are suspended, and for how many seconds
+    MONGO_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("MONGO_BREAKER_FAILURE_THRESHOLD", "5"))
+    MONGO_BREAKER_COOLDOWN: float = float(os.getenv("MONGO_BREAKER_COOLDOWN", "30"))
+    
+    # Prediction history: time-series collection, retention in days (0 keeps everything)
+    PREDICTION_COLLECTION: str = os.getenv("PREDICTION_COLLECTION", "prediction_history")
+    PREDICTION_TTL_DAYS: float = float(os.getenv("PREDICTION_TTL_DAYS", "90"))
+    PREDICTION_TIMESERIES_GRANULARITY: str = os.getenv("PREDICTION_TIMESERIES_GRANULARITY", "seconds")
+    HISTORY_DEFAULT_PAGE_SIZE: int = int(os.getenv("HISTORY_DEFAULT_PAGE_SIZE", "100"))
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "1000"))
+    ROLLUP_COLLECTION: str = os.getenv("ROLLUP_COLLECTION", "prediction_rollups")
+    # Parquet export of prediction history; the newest EXPORT_LAG_SECONDS are left for the next run
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", "data/exports/predictions")
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+    EXPORT_LAG_SECONDS: float = float(os.getenv("EXPORT_LAG_SECONDS", "60"))
+    
+    # Background prediction writer
+    WRITER_MAX_QUEUE: int = int(os.getenv("WRITER_MAX_QUEUE", "10000"))
+    WRITER_BATCH_SIZE: int = int(os.getenv("WRITER_BATCH_SIZE", "500"))
+    WRITER_FLUSH_INTERVAL: float = float(os.getenv("WRITER_FLUSH_INTERVAL", "1.0"))
+    # "drop" discards records when the queue is full; "block" waits up to WRITER_BLOCK_TIMEOUT seconds
+    WRITER_OVERFLOW: str = os.getenv("WRITER_OVERFLOW", "drop")
+    WRITER_BLOCK_TIMEOUT: float = float(os.getenv("WRITER_BLOCK_TIMEOUT", "0.5"))
     
     # Kaggle Configuration
     KAGGLE_USERNAME: str = os.getenv("KAGGLE_USERNAME", "")
@@ -24,9 +56,101 @@ class Settings:
     
     # Model Configuration
     MODEL_PATH: str = os.getenv("MODEL_PATH", "models/model.pkl")
+    # Estimator trained by CropModel: "random_forest" or "hist_gradient_boosting"
+    MODEL_BACKEND: str = os.getenv("MODEL_BACKEND", "random_forest")
+    # "pickle" loads the full sklearn model per process; "shared" maps compiled node tables read-only
+    MODEL_SERVING_MODE: str = os.getenv("MODEL_SERVING_MODE", "pickle")
+    # Seconds between checks for a newly activated registry version (0 disables)
+    MODEL_RELOAD_INTERVAL: float = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+    # Serve the compacted forest of a version when one has been built
+    MODEL_SERVE_COMPACT: bool = os.getenv("MODEL_SERVE_COMPACT", "False").lower() == "true"
+    # "binary" serves from model.bin without unpickling when a version has one; "pickle" always unpickles
+    MODEL_ARTIFACT_FORMAT: str = os.getenv("MODEL_ARTIFACT_FORMAT", "binary")
+    # Compression of model.bin: "none" (memory-mappable) or "zlib" (smaller, decompressed on load)
+    MODEL_BINARY_COMPRESSION: str = os.getenv("MODEL_BINARY_COMPRESSION", "none")
     DATA_PATH: str = os.getenv("DATA_PATH", "data/")
+    # Cleaned training data cached as .npy, keyed on source contents; entries kept
+    DATASET_CACHE_ENABLED: bool = os.getenv("DATASET_CACHE_ENABLED", "True").lower() == "true"
+    DATASET_CACHE_DIR: str = os.getenv("DATASET_CACHE_DIR", "data/cache")
+    DATASET_CACHE_ENTRIES: int = int(os.getenv("DATASET_CACHE_ENTRIES", "3"))
+    # Parquet store written by scripts/ingest_data.py; training reads it instead of the CSVs when present
+    INGESTED_DATA_PATH: str = os.getenv("INGESTED_DATA_PATH", "data/ingested/crops.parquet")
+    INGEST_CHUNK_SIZE: int = int(os.getenv("INGEST_CHUNK_SIZE", "100000"))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
+    # Startup preload and warm-up
+    PRELOAD_MODEL: bool = os.getenv("PRELOAD_MODEL", "True").lower() == "true"
+    WARMUP_ROUNDS: int = int(os.getenv("WARMUP_ROUNDS", "3"))
+    WARMUP_BATCH_SIZES: list = [int(size) for size in os.getenv("WARMUP_BATCH_SIZES", "1,16,64").split(",") if size]
+    
+    # Prediction Configuration
+    MAX_BATCH_SIZE: int = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+    
+    # Prediction cache keyed on inputs rounded per feature ("feature:decimals,..."); size 0 disables
+    PREDICTION_CACHE_SIZE: int = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+    PREDICTION_CACHE_TTL: float = float(os.getenv("PREDICTION_CACHE_TTL", "0"))
+    PREDICTION_CACHE_ROUNDING: str = os.getenv(
+        "PREDICTION_CACHE_ROUNDING", "N:0,P:0,K:0,temperature:2,humidity:2,ph:1,rainfall:2,ndvi:3"
+    )
+    
+    # Micro-batching of concurrent /predict requests
+    MICRO_BATCHING_ENABLED: bool = os.getenv("MICRO_BATCHING_ENABLED", "True").lower() == "true"
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+    MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "5"))
+    
+    # Anytime inference: stop evaluating trees once the label is settled (opt-in per request or here)
+    EARLY_EXIT_ENABLED: bool = os.getenv("EARLY_EXIT_ENABLED", "False").lower() == "true"
+    EARLY_EXIT_CHECK_EVERY: int = int(os.getenv("EARLY_EXIT_CHECK_EVERY", "10"))
+    # Also stop once the leader's mean probability reaches this after MIN_TREES trees (0 = exact bound only)
+    EARLY_EXIT_CONFIDENCE: float = float(os.getenv("EARLY_EXIT_CONFIDENCE", "0"))
+    EARLY_EXIT_MIN_TREES: int = int(os.getenv("EARLY_EXIT_MIN_TREES", "20"))
+    
+    # Precomputed lookup table over the quantized input space ("feature:bins,..."), served when enabled
+    LOOKUP_ENABLED: bool = os.getenv("LOOKUP_ENABLED", "False").lower() == "true"
+    LOOKUP_BINS: str = os.getenv("LOOKUP_BINS", "N:8,P:8,K:8,temperature:6,humidity:6,ph:6,rainfall:6,ndvi:3")
+    LOOKUP_TOP_K: int = int(os.getenv("LOOKUP_TOP_K", "3"))
+    # Cells whose top two probabilities are closer than this are answered by the forest
+    LOOKUP_MIN_MARGIN: float = float(os.getenv("LOOKUP_MIN_MARGIN", "0.2"))
+    LOOKUP_CHUNK_SIZE: int = int(os.getenv("LOOKUP_CHUNK_SIZE", "65536"))
+    LOOKUP_WORKERS: int = int(os.getenv("LOOKUP_WORKERS", "0"))
+    
+    # Executor pools for blocking work (workers, and queued tasks allowed beyond them)
+    INFERENCE_WORKERS: int = int(os.getenv("INFERENCE_WORKERS", "4"))
+    INFERENCE_QUEUE_SIZE: int = int(os.getenv("INFERENCE_QUEUE_SIZE", "256"))
+    IO_WORKERS: int = int(os.getenv("IO_WORKERS", "4"))
+    IO_QUEUE_SIZE: int = int(os.getenv("IO_QUEUE_SIZE", "1024"))
+    
+    # Model training: cores for building trees (-1 = all); "cv", "oob" or "none" evaluation;
+    # CV fold processes (0 = one per core)
+    TRAINING_N_JOBS: int = int(os.getenv("TRAINING_N_JOBS", "-1"))
+    TRAINING_EVALUATION: str = os.getenv("TRAINING_EVALUATION", "cv")
+    TRAINING_CV_FOLDS: int = int(os.getenv("TRAINING_CV_FOLDS", "5"))
+    TRAINING_CV_WORKERS: int = int(os.getenv("TRAINING_CV_WORKERS", "0"))
+    
+    # Training jobs run one at a time in a niced process: submissions queued behind it (0 = refuse),
+    # wall-clock limit in seconds (0 = none), address-space cap in MB (0 = none), finished jobs remembered
+    TRAINING_JOB_QUEUE_SIZE: int = int(os.getenv("TRAINING_JOB_QUEUE_SIZE", "0"))
+    TRAINING_JOB_TIMEOUT: float = float(os.getenv("TRAINING_JOB_TIMEOUT", "3600"))
+    TRAINING_JOB_MEMORY_MB: int = int(os.getenv("TRAINING_JOB_MEMORY_MB", "0"))
+    TRAINING_JOB_NICE: int = int(os.getenv("TRAINING_JOB_NICE", "10"))
+    TRAINING_JOB_HISTORY: int = int(os.getenv("TRAINING_JOB_HISTORY", "20"))
+    
+    # Hyperparameter search: wall-clock budget, minimum validation accuracy, parameter sets tried
+    TUNING_BUDGET_SECONDS: float = float(os.getenv("TUNING_BUDGET_SECONDS", "300"))
+    TUNING_ACCURACY_FLOOR: float = float(os.getenv("TUNING_ACCURACY_FLOOR", "0.97"))
+    TUNING_CANDIDATES: int = int(os.getenv("TUNING_CANDIDATES", "27"))
+    
+    # Compaction stops once accuracy is within this loss of the full forest (or at the latency budget)
+    COMPACTION_MAX_ACCURACY_LOSS: float = float(os.getenv("COMPACTION_MAX_ACCURACY_LOSS", "0.005"))
+    COMPACTION_TARGET_LATENCY_MS: float = float(os.getenv("COMPACTION_TARGET_LATENCY_MS", "0"))
+    
+    # Incremental retraining from an append-only labelled CSV (feature columns, label, ISO collected_at):
+    # trees replaced per run, replay sample of past training rows kept, rolling holdout size
+    LABELLED_DATA_PATH: str = os.getenv("LABELLED_DATA_PATH", "data/labelled_rows.csv")
+    INCREMENTAL_TREES: int = int(os.getenv("INCREMENTAL_TREES", "10"))
+    INCREMENTAL_REPLAY_ROWS: int = int(os.getenv("INCREMENTAL_REPLAY_ROWS", "2000"))
+    INCREMENTAL_HOLDOUT_ROWS: int = int(os.getenv("INCREMENTAL_HOLDOUT_ROWS", "1000"))
+    
     # Project paths
     BASE_DIR: Path = Path(__file__).parent.parent
     DATA_DIR: Path = BASE_DIR / "data"
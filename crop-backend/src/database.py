@@ -1,54 +1,232 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+import threading
+import time
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from pymongo.write_concern import WriteConcern
 from loguru import logger
 from .config import settings
 
+class CircuitBreaker:
+    """Stop calling a failing dependency for a cool-off period
+    
+    closed: calls go through. After failure_threshold consecutive failures
+    the breaker opens and rejects calls until cooldown seconds pass; then a
+    single trial call is let through (half-open) which closes or re-opens it.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        
+        self.rejected = 0
+        self.times_opened = 0
+        
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+            
+    def allow(self):
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+            
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Database circuit breaker closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(f"Database circuit breaker open for {self.cooldown}s")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown_seconds': self.cooldown,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Count connection pool events for monitoring"""
+    
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.checkout_failed = 0
+        self.pools_cleared = 0
+        
+    def pool_created(self, event):
+        pass
+        
+    def pool_ready(self, event):
+        pass
+        
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+        
+    def pool_closed(self, event):
+        pass
+        
+    def connection_created(self, event):
+        self.created += 1
+        
+    def connection_ready(self, event):
+        pass
+        
+    def connection_closed(self, event):
+        self.closed += 1
+        
+    def connection_check_out_started(self, event):
+        pass
+        
+    def connection_check_out_failed(self, event):
+        self.checkout_failed += 1
+        
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+        
+    def connection_checked_in(self, event):
+        self.checked_in += 1
+        
+    def stats(self):
+        return {
+            'open_connections': self.created - self.closed,
+            'in_use': self.checked_out - self.checked_in,
+            'connections_created': self.created,
+            'connections_closed': self.closed,
+            'checkout_failed': self.checkout_failed,
+            'pools_cleared': self.pools_cleared
+        }
+
+def parse_write_concern_w(value: str):
+    """Write concern "w" is a node count or a tag such as "majority\""""
+    return int(value) if value.isdigit() else value
+
 class DatabaseManager:
     def __init__(self):
         self.client = None
         self.database = None
+        self.connected = False
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.MONGO_BREAKER_FAILURE_THRESHOLD,
+            cooldown=settings.MONGO_BREAKER_COOLDOWN
+        )
+        self.pool_listener = PoolStatsListener()
+        self._ping_thread = None
+        
+    def connect(self, wait: bool = False):
+        """Connect to MongoDB database
         
-    def connect(self):
-        """Connect to MongoDB database"""
+        The client connects lazily; the initial ping runs in a background
+        thread unless wait is True, so an unreachable server never delays startup.
+        """
+        try:
+            self.client = MongoClient(
+                settings.MONGODB_URI,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+                event_listeners=[self.pool_listener],
+                connect=False
+            )
+            self.database = self.client.get_database(
+                settings.DATABASE_NAME,
+                write_concern=WriteConcern(
+                    w=parse_write_concern_w(settings.MONGO_WRITE_CONCERN_W),
+                    wtimeout=settings.MONGO_WRITE_TIMEOUT_MS
+                )
+            )
+        except PyMongoError as e:
+            logger.error(f"Failed to configure MongoDB client: {e}")
+            return False
+            
+        if wait:
+            return self.ping()
+            
+        self._ping_thread = threading.Thread(target=self.ping, name="mongo-connect", daemon=True)
+        self._ping_thread.start()
+        return True
+        
+    def ping(self):
+        """Check the server is reachable, feeding the result to the circuit breaker"""
         try:
-            self.client = MongoClient(settings.MONGODB_URI)
-            self.database = self.client[settings.DATABASE_NAME]
-            # Test connection
             self.client.admin.command('ping')
+            self.connected = True
+            self.breaker.record_success()
             logger.info("Successfully connected to MongoDB")
             return True
-        except ConnectionFailure as e:
+        except PyMongoError as e:
+            self.connected = False
+            self.breaker.record_failure()
             logger.error(f"Failed to connect to MongoDB: {e}")
             return False
-    
+            
     def disconnect(self):
         """Disconnect from MongoDB"""
         if self.client:
             self.client.close()
+            self.connected = False
             logger.info("Disconnected from MongoDB")
-    
+            
     def get_collection(self, collection_name: str):
         """Get a collection from the database"""
         if self.database is None:
             raise RuntimeError("Database not connected")
         return self.database[collection_name]
-    
-    def save_prediction(self, input_data: dict, prediction: str, confidence: float = None):
-        """Save prediction to database"""
-        try:
-            collection = self.get_collection("predictions")
-            document = {
-                "input_data": input_data,
-                "prediction": prediction,
-                "confidence": confidence,
-                "timestamp": pd.Timestamp.now()
+        
+    def stats(self):
+        """Return connection, circuit breaker and pool statistics"""
+        return {
+            'connected': self.connected,
+            'circuit_breaker': self.breaker.stats(),
+            'pool': {
+                'max_pool_size': settings.MONGO_MAX_POOL_SIZE,
+                'min_pool_size': settings.MONGO_MIN_POOL_SIZE,
+                **self.pool_listener.stats()
             }
-            result = collection.insert_one(document)
-            logger.info(f"Saved prediction with ID: {result.inserted_id}")
-            return result.inserted_id
-        except Exception as e:
-            logger.error(f"Failed to save prediction: {e}")
-            return None
+        }
 
 # Global database instance
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = DatabaseManager()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from loguru import logger
+from .config import settings
+from .preprocessing import CLEANING_VERSION, load_and_clean_data, prepare_features_target, source_paths
+from .registry import file_sha256
+from .ingestion import labelled_tail, store_metadata, store_to_arrays
+
+class DatasetCache:
+    """Cleaned feature matrix and label codes cached as memory-mappable .npy files
+
+    Layout::
+
+        <root>/<key>/X.npy          float64 feature matrix, one column per feature
+        <root>/<key>/labels.npy     label codes into meta.json's classes
+        <root>/<key>/meta.json      feature columns, classes, source hashes
+        <root>/hashes.json          content hashes memoised by file size and mtime
+
+    The key hashes the contents of every source file and CLEANING_VERSION,
+    so editing any input or the cleaning code selects a new entry. When an
+    ingested Parquet store exists at INGESTED_DATA_PATH it replaces the
+    CSVs, copied in batches without loading it whole, and is followed by
+    the labelled data log rows appended since it was ingested. A store
+    ingested under another CLEANING_VERSION is ignored until it is
+    re-ingested.
+    """
+
+    HASHES_NAME = "hashes.json"
+
+    def __init__(self, root=None, max_entries=None):
+        self.root = Path(root or settings.DATASET_CACHE_DIR)
+        self.max_entries = settings.DATASET_CACHE_ENTRIES if max_entries is None else max_entries
+
+    def current_store(self):
+        """The ingested store if it exists and was cleaned by the current rules, else None"""
+        store = Path(settings.INGESTED_DATA_PATH)
+        if not store.exists():
+            return None
+        if store_metadata(store).get('cleaning_version') != CLEANING_VERSION:
+            logger.warning(f"{store} was ingested with other cleaning rules; "
+                           f"reading the CSVs until it is re-ingested")
+            return None
+        return store
+
+    def source_paths(self):
+        store = self.current_store()
+        if store is not None:
+            return [store, Path(settings.LABELLED_DATA_PATH)]
+        return source_paths()
+
+    def source_hashes(self):
+        """Content hash of every source file (None if absent), rehashing only changed files"""
+        memo_path = self.root / self.HASHES_NAME
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (FileNotFoundError, ValueError):
+            memo = {}
+
+        hashes, changed = {}, False
+        for path in self.source_paths():
+            if not path.exists():
+                hashes[str(path)] = None
+                continue
+            stat = path.stat()
+            entry = memo.get(str(path.resolve()))
+            if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(path)}
+                memo[str(path.resolve())] = entry
+                changed = True
+            hashes[str(path)] = entry['sha256']
+
+        if changed:
+            self.root.mkdir(parents=True, exist_ok=True)
+            _write_json(memo_path, memo)
+        return hashes
+
+    def key(self, hashes=None):
+        """Cache key for the current sources and cleaning code"""
+        hashes = self.source_hashes() if hashes is None else hashes
+        sources = [[Path(path).name, digest] for path, digest in hashes.items()]
+        payload = json.dumps({'cleaning_version': CLEANING_VERSION, 'sources': sources})
+        return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+    def load(self, mmap=True):
+        """Features and labels of the current sources, building the entry on a miss"""
+        started = time.perf_counter()
+        hashes = self.source_hashes()
+        entry_dir = self.root / self.key(hashes)
+        if not (entry_dir / "meta.json").exists():
+            self.build(entry_dir, hashes)
+
+        with open(entry_dir / "meta.json") as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        X = np.load(entry_dir / "X.npy", mmap_mode=mmap_mode)
+        codes = np.load(entry_dir / "labels.npy", mmap_mode=mmap_mode)
+        os.utime(entry_dir)
+        logger.info(f"Loaded {meta['rows']} cached training rows from {entry_dir} "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return (
+            pd.DataFrame(X, columns=meta['feature_columns'], copy=False),
+            pd.Series(np.asarray(meta['classes'], dtype=object)[codes], name='label')
+        )
+
+    def build(self, entry_dir, hashes):
+        """Clean and combine the sources, or copy the ingested store, into a new entry"""
+        started = time.perf_counter()
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging-"))
+
+        store = self.current_store()
+        if store is not None:
+            feature_columns, classes, rows = store_to_arrays(
+                store, staging_dir / "X.npy", staging_dir / "labels.npy",
+                extra=labelled_tail(store, settings.LABELLED_DATA_PATH)
+            )
+        else:
+            X, y = prepare_features_target(load_and_clean_data())
+            classes, codes = np.unique(y.astype(str), return_inverse=True)
+            np.save(staging_dir / "X.npy", np.ascontiguousarray(X.values, dtype=np.float64))
+            np.save(staging_dir / "labels.npy", codes.astype(np.min_scalar_type(max(len(classes) - 1, 0))))
+            feature_columns, classes, rows = list(X.columns), classes.tolist(), len(X)
+        _write_json(staging_dir / "meta.json", {
+            'key': entry_dir.name,
+            'cleaning_version': CLEANING_VERSION,
+            'sources': hashes,
+            'feature_columns': feature_columns,
+            'classes': classes,
+            'rows': rows,
+            'built_at': datetime.now(timezone.utc).isoformat(),
+            'build_seconds': time.perf_counter() - started
+        })
+        try:
+            os.rename(staging_dir, entry_dir)
+        except OSError:
+            # Another process built the same entry first
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        logger.info(f"Built training data cache {entry_dir} in {time.perf_counter() - started:.2f}s")
+        self.prune(keep=entry_dir.name)
+
+    def entries(self):
+        """Cache entry directories, most recently used first"""
+        if not self.root.exists():
+            return []
+        entries = [path for path in self.root.iterdir() if path.is_dir() and not path.name.startswith(".")]
+        return sorted(entries, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def prune(self, keep=None):
+        """Delete all but the max_entries most recently used entries"""
+        for path in self.entries()[self.max_entries:]:
+            if path.name != keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self):
+        """Delete every cache entry"""
+        for path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=Path(path).parent, prefix=f".{Path(path).name}-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2, default=float)
+    os.replace(tmp_path, path)
+
+def load_training_data():
+    """Training features and labels, from the dataset cache when DATASET_CACHE_ENABLED"""
+    if settings.DATASET_CACHE_ENABLED:
+        return DatasetCache().load()
+    return prepare_features_target(load_and_clean_data())
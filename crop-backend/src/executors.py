@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from loguru import logger
+from .config import settings
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a pool already has as much work queued as it is allowed"""
+
+def _timed_call(fn, args, kwargs):
+    """Run fn and return its result with wall-clock start and end times"""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time()
+
+class BoundedExecutor:
+    """Executor with a bounded backlog and per-pool metrics"""
+
+    def __init__(self, name, max_workers, max_queue, use_processes=False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_queue_wait = 0.0
+        self.total_run_time = 0.0
+        self.max_run_time = 0.0
+
+    def _get_executor(self):
+        """Create the underlying pool on first use"""
+        if self._executor is None:
+            if self.use_processes:
+                # Forking a process that already runs threads is unsafe, so always spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-pool"
+                )
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn without waiting for it, returning a concurrent.futures.Future"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturatedError(f"{self.name} pool is saturated")
+            self._pending += 1
+            self.submitted += 1
+
+        submitted_at = time.time()
+        try:
+            future = self._get_executor().submit(_timed_call, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self.failed += 1
+            raise
+        future.add_done_callback(partial(self._on_done, submitted_at))
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool and await its result without blocking the event loop"""
+        future = self.submit(fn, *args, **kwargs)
+        result, _, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _on_done(self, submitted_at, future):
+        """Record completion metrics"""
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+
+            _, started, finished = future.result()
+            self.completed += 1
+            self.total_queue_wait += max(0.0, started - submitted_at)
+            run_time = finished - started
+            self.total_run_time += run_time
+            self.max_run_time = max(self.max_run_time, run_time)
+
+    def stats(self):
+        """Return pool occupancy and timing metrics"""
+        with self._lock:
+            return {
+                'type': 'process' if self.use_processes else 'thread',
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'active': min(self._pending, self.max_workers),
+                'queued': max(0, self._pending - self.max_workers),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'mean_queue_wait_ms': self.total_queue_wait / self.completed * 1000 if self.completed else 0.0,
+                'mean_run_time_ms': self.total_run_time / self.completed * 1000 if self.completed else 0.0,
+                'max_run_time_ms': self.max_run_time * 1000
+            }
+
+    def shutdown(self, wait=True):
+        """Shut down the underlying pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info(f"Shut down {self.name} pool")
+
+class ExecutorPools:
+    """Separate pools for inference and database I/O; training runs in TrainingJobManager processes"""
+
+    def __init__(self):
+        self.inference = BoundedExecutor(
+            "inference", settings.INFERENCE_WORKERS, settings.INFERENCE_QUEUE_SIZE
+        )
+        self.io = BoundedExecutor(
+            "io", settings.IO_WORKERS, settings.IO_QUEUE_SIZE
+        )
+
+    def stats(self):
+        """Return metrics for every pool"""
+        return {
+            'inference': self.inference.stats(),
+            'io': self.io.stats()
+        }
+
+    def shutdown(self, wait=True):
+        """Shut down all pools"""
+        for pool in (self.inference, self.io):
+            pool.shutdown(wait=wait)
+
+# Global executor pools
+executors = ExecutorPools()
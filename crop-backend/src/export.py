@@ -0,0 +1,202 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+from pymongo import ASCENDING
+from loguru import logger
+from .config import settings
+from .prediction_store import prediction_store
+
+class PredictionExporter:
+    """Incremental export of prediction history to a date-partitioned Parquet dataset
+
+    Documents newer than the checkpoint's (timestamp, _id) high-water mark are
+    streamed in cursor batches; each batch becomes one row group appended to
+    <output_dir>/date=YYYY-MM-DD/part-<run>.parquet. Files are written under a
+    temporary name and the checkpoint only advances once every file of the run
+    is complete, so an interrupted run is simply repeated.
+    """
+
+    CHECKPOINT_NAME = "_checkpoint.json"
+
+    def __init__(self, store, output_dir, batch_size=10000, lag_seconds=60, compression="snappy"):
+        self.store = store
+        self.output_dir = Path(output_dir)
+        self.batch_size = batch_size
+        self.lag_seconds = lag_seconds
+        self.compression = compression
+
+        self._lock = threading.Lock()
+        self.running = False
+        self.last_result = None
+
+    @property
+    def checkpoint_path(self):
+        return self.output_dir / self.CHECKPOINT_NAME
+
+    def read_checkpoint(self):
+        """Return the (timestamp, _id) high-water mark, or None before the first export"""
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+        return datetime.fromisoformat(checkpoint['timestamp']), ObjectId(checkpoint['id'])
+
+    def _write_checkpoint(self, timestamp, _id, rows):
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix=".checkpoint-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                'timestamp': timestamp.isoformat(),
+                'id': str(_id),
+                'rows': rows,
+                'exported_at': datetime.now().isoformat()
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def schema(self):
+        """Arrow schema of the exported dataset"""
+        return pa.schema([
+            ('timestamp', pa.timestamp('ms')),
+            ('crop', pa.string()),
+            ('confidence', pa.float64()),
+            ('model_version', pa.string()),
+            *[(feature, pa.float64()) for feature in self.store.features]
+        ])
+
+    def _to_table(self, documents):
+        """Convert one cursor batch into a columnar table"""
+        x = np.array(
+            [[np.nan if value is None else value for value in doc['x']] for doc in documents],
+            dtype=np.float64
+        ).reshape(len(documents), len(self.store.features))
+        columns = {
+            'timestamp': pa.array([doc['ts'] for doc in documents], type=pa.timestamp('ms')),
+            'crop': pa.array([self.store.label_for(doc['m']['c']) for doc in documents], type=pa.string()),
+            'confidence': pa.array([doc.get('p') for doc in documents], type=pa.float64()),
+            'model_version': pa.array([doc['m'].get('v') for doc in documents], type=pa.string()),
+        }
+        for j, feature in enumerate(self.store.features):
+            columns[feature] = pa.array(x[:, j], type=pa.float64(), from_pandas=True)
+        return pa.table(columns, schema=self.schema())
+
+    def _batches(self, query):
+        """Yield lists of up to batch_size documents from one streaming cursor"""
+        cursor = (
+            self.store.db_manager.database[self.store.collection_name]
+            .find(query, {'ts': 1, 'm': 1, 'x': 1, 'p': 1})
+            .sort([('ts', ASCENDING), ('_id', ASCENDING)])
+            .batch_size(self.batch_size)
+        )
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def export(self):
+        """Export everything after the checkpoint and advance it; returns a summary"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("An export is already running")
+            self.running = True
+        try:
+            result = self._export()
+            self.last_result = result
+            return result
+        except Exception as e:
+            self.last_result = {'status': 'failed', 'error': str(e), 'finished_at': datetime.now().isoformat()}
+            raise
+        finally:
+            self.running = False
+
+    def _export(self):
+        started = time.perf_counter()
+        self.store.initialize()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Stop short of now so predictions still queued in the writer are not skipped
+        cutoff = datetime.now() - timedelta(seconds=self.lag_seconds)
+        after = self.read_checkpoint()
+        query = {'ts': {'$lt': cutoff}}
+        if after is not None:
+            ts, _id = after
+            query = {'$and': [query, {'$or': [{'ts': {'$gt': ts}}, {'ts': ts, '_id': {'$gt': _id}}]}]}
+
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        writers = {}
+        rows = 0
+        last = None
+        try:
+            for documents in self._batches(query):
+                table = self._to_table(documents)
+                dates = np.array([doc['ts'].date() for doc in documents])
+                for date in np.unique(dates):
+                    if date not in writers:
+                        partition = self.output_dir / f"date={date.isoformat()}"
+                        partition.mkdir(exist_ok=True)
+                        tmp_path = partition / f".part-{run_id}.parquet.tmp"
+                        writers[date] = (
+                            pq.ParquetWriter(tmp_path, self.schema(), compression=self.compression),
+                            tmp_path
+                        )
+                    rows_for_date = np.flatnonzero(dates == date)
+                    writers[date][0].write_table(table.take(pa.array(rows_for_date)))
+                rows += len(documents)
+                last = documents[-1]
+        except Exception:
+            for writer, tmp_path in writers.values():
+                writer.close()
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+        files = []
+        for writer, tmp_path in writers.values():
+            writer.close()
+            final_path = tmp_path.with_name(f"part-{run_id}.parquet")
+            os.replace(tmp_path, final_path)
+            files.append(str(final_path))
+
+        if last is not None:
+            self._write_checkpoint(last['ts'], last['_id'], rows)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Exported {rows} predictions to {len(files)} Parquet files in {elapsed:.1f}s")
+        return {
+            'status': 'completed',
+            'rows': rows,
+            'files': files,
+            'partitions': len(files),
+            'high_water_mark': last['ts'].isoformat() if last is not None else None,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+            'finished_at': datetime.now().isoformat()
+        }
+
+    def status(self):
+        """Whether an export is running, the checkpoint and the last run's summary"""
+        checkpoint = self.read_checkpoint()
+        return {
+            'running': self.running,
+            'output_dir': str(self.output_dir),
+            'high_water_mark': checkpoint[0].isoformat() if checkpoint else None,
+            'last_result': self.last_result
+        }
+
+# Global exporter
+prediction_exporter = PredictionExporter(
+    prediction_store,
+    output_dir=settings.EXPORT_DIR,
+    batch_size=settings.EXPORT_BATCH_SIZE,
+    lag_seconds=settings.EXPORT_LAG_SECONDS
+)
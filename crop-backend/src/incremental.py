@@ -0,0 +1,136 @@
+import copy
+import hashlib
+import io
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# Incremental training state stored with every version: a class-balanced
+# replay sample of past training rows and the rolling holdout
+STATE_ARTIFACT_NAME = "incremental.npz"
+STATE_ARRAYS = ('replay_X', 'replay_y', 'holdout_X', 'holdout_y')
+
+TIMESTAMP_COLUMN = 'collected_at'
+
+# Bytes at the start of the log hashed into a watermark to notice a rewrite
+HEAD_BYTES = 1 << 16
+
+def _read_complete_lines(path, offset):
+    """Bytes from offset up to the last complete line, and the offset just after them"""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]
+    return header, data, max(offset, len(header)) + len(data)
+
+def _parse(header, data):
+    if not header:
+        return pd.DataFrame(columns=[TIMESTAMP_COLUMN])
+    if not data:
+        return pd.read_csv(io.BytesIO(header))
+    return pd.read_csv(io.BytesIO(header + data))
+
+def _head_hash(path, offset):
+    """Digest of the log's first bytes, up to offset"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(min(offset, HEAD_BYTES))).hexdigest()
+
+def _watermark(path, df, offset, since=None):
+    last = df[TIMESTAMP_COLUMN].astype(str).max() if len(df) else since
+    return {'offset': offset, 'collected_at': last, 'head_sha256': _head_hash(path, offset)}
+
+def log_watermark(path):
+    """Watermark at the current end of the append-only labelled data log"""
+    path = Path(path)
+    if not path.exists():
+        return {'offset': 0, 'collected_at': None}
+    header, data, offset = _read_complete_lines(path, 0)
+    return _watermark(path, _parse(header, data), offset)
+
+def read_since(path, watermark):
+    """Rows appended to the labelled data log after watermark, and the new watermark
+
+    Only the bytes after the watermark's offset are parsed, so the cost
+    follows the new data rather than the whole log; a partly written last
+    line is left for the next run. If the log is shorter than the offset,
+    or its first bytes no longer match the watermark's head hash (it was
+    rotated or rewritten), it is read in full and filtered on collected_at
+    instead.
+    """
+    path = Path(path)
+    if not path.exists():
+        return pd.DataFrame(), watermark
+
+    offset = watermark.get('offset', 0)
+    since = watermark.get('collected_at')
+    head = watermark.get('head_sha256')
+    rewritten = None
+    if offset > os.path.getsize(path):
+        rewritten = "is shorter than the last watermark"
+    elif head is not None and _head_hash(path, offset) != head:
+        rewritten = "no longer starts with the rows the last watermark saw"
+    if rewritten:
+        logger.warning(f"{path} {rewritten}; reading it in full")
+        offset = 0
+    header, data, offset = _read_complete_lines(path, offset)
+    df = _parse(header, data)
+
+    if rewritten and since is not None and len(df):
+        df = df[df[TIMESTAMP_COLUMN].astype(str) > since]
+    return df, _watermark(path, df, offset, since)
+
+def sample_replay(X, y, max_rows, random_state=42):
+    """Class-balanced sample of at most max_rows rows, keeping every class present"""
+    if len(X) <= max_rows:
+        return X, y
+    rng = np.random.default_rng(random_state)
+    classes = np.unique(y)
+    per_class = max(1, max_rows // len(classes))
+    keep = np.concatenate([
+        rng.permutation(np.flatnonzero(y == label))[:per_class] for label in classes
+    ])
+    keep.sort()
+    return X[keep], y[keep]
+
+def roll_holdout(holdout_X, holdout_y, X, y, max_rows):
+    """Append new holdout rows and keep the most recent max_rows"""
+    holdout_X = np.concatenate([holdout_X, X])[-max_rows:]
+    holdout_y = np.concatenate([holdout_y, y])[-max_rows:]
+    return holdout_X, holdout_y
+
+def save_state(path, **arrays):
+    """Write the replay sample and holdout as one .npz file"""
+    with open(path, "wb") as f:
+        np.savez(f, **{name: arrays[name] for name in STATE_ARRAYS})
+
+def load_state(path):
+    """Read the replay sample and holdout written by save_state"""
+    with np.load(path) as state:
+        return {name: state[name] for name in STATE_ARRAYS}
+
+def grow_forest(estimator, X, y, n_new, random_state, n_jobs=-1):
+    """A copy of a fitted forest with n_new trees fitted on (X, y) and the n_new oldest retired
+
+    warm_start fits only the added trees. The trees are shared with the
+    original forest, which is left untouched so it can keep serving.
+    """
+    n_trees = len(estimator.estimators_)
+    if not 0 < n_new <= n_trees:
+        raise ValueError(f"Trees to replace must be between 1 and {n_trees}")
+    missing = np.setdiff1d(estimator.classes_, y)
+    if len(missing):
+        raise ValueError(f"New trees would not see classes {missing.tolist()}; retrain from scratch")
+
+    grown = copy.copy(estimator)
+    grown.estimators_ = list(estimator.estimators_)
+    grown.set_params(warm_start=True, n_estimators=n_trees + n_new, random_state=random_state,
+                     n_jobs=n_jobs, oob_score=False)
+    grown.fit(X, y)
+
+    # Trees are appended, so the oldest are at the front
+    grown.estimators_ = grown.estimators_[n_new:]
+    grown.set_params(warm_start=False, n_estimators=n_trees)
+    return grown
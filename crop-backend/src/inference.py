@@ -0,0 +1,277 @@
+import json
+import numpy as np
+from pathlib import Path
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes')
+# Only present for boosted ensembles: per-class raw score offsets and the class each tree scores
+OPTIONAL_ARRAYS = ('baseline', 'tree_class')
+
+# Why anytime evaluation stopped for a row, indexed by the codes predict_anytime returns
+EXIT_REASONS = ('full', 'exact', 'confidence')
+
+
+class CompiledForest:
+    """Flat array representation of a fitted tree ensemble for fast inference
+
+    With link "mean" (random forests) every leaf holds a class distribution
+    and the trees' distributions are averaged. With link "softmax" (gradient
+    boosting) every leaf holds one raw score for its tree's class; the scores
+    are summed per class on top of baseline and passed through a softmax.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth,
+                 link='mean', baseline=None, tree_class=None, input_dtype=np.float32):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.link = link
+        self.baseline = baseline
+        self.tree_class = tree_class
+        self.input_dtype = np.dtype(input_dtype)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Compile a fitted RandomForestClassifier or HistGradientBoostingClassifier"""
+        if hasattr(estimator, '_predictors'):
+            return cls.from_gradient_boosting(estimator)
+
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        n_classes = len(estimator.classes_)
+
+        sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            node_ids = np.arange(tree.node_count, dtype=np.int64) + offset
+            is_leaf = tree.children_left == -1
+
+            # Leaves point at themselves so every row can take the same
+            # number of steps without branching on leaf status
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+            # Normalise leaf values the same way DecisionTreeClassifier.predict_proba does
+            value = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=offsets,
+            classes=np.asarray(estimator.classes_),
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    @classmethod
+    def from_gradient_boosting(cls, estimator):
+        """Compile a fitted HistGradientBoostingClassifier into flat node tables"""
+        n_classes = len(estimator.classes_)
+        predictors = [
+            (iteration[k], k if n_classes > 2 else 1)
+            for iteration in estimator._predictors
+            for k in range(len(iteration))
+        ]
+        if any(predictor.nodes['is_categorical'].any() for predictor, _ in predictors):
+            raise ValueError("Categorical splits are not supported by the compiled engine")
+
+        sizes = np.array([len(predictor.nodes) for predictor, _ in predictors], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for (predictor, _), offset in zip(predictors, offsets):
+            nodes = predictor.nodes
+            node_ids = np.arange(len(nodes), dtype=np.int64) + offset
+            is_leaf = nodes['is_leaf'].astype(bool)
+            features.append(np.where(is_leaf, 0, nodes['feature_idx']).astype(np.int64))
+            thresholds.append(np.where(is_leaf, np.inf, nodes['num_threshold']))
+            lefts.append(np.where(is_leaf, node_ids, nodes['left'].astype(np.int64) + offset))
+            rights.append(np.where(is_leaf, node_ids, nodes['right'].astype(np.int64) + offset))
+            values.append(nodes['value'].astype(np.float64))
+
+        # A binary model scores only the positive class; a zero score for the other
+        # class makes the softmax equal to the logistic function
+        baseline = np.zeros(n_classes)
+        if n_classes > 2:
+            baseline[:] = estimator._baseline_prediction.ravel()
+        else:
+            baseline[1] = estimator._baseline_prediction.ravel()[0]
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values)[:, None],
+            roots=offsets,
+            classes=np.asarray(estimator.classes_),
+            max_depth=max(int(predictor.nodes['depth'].max()) for predictor, _ in predictors),
+            link='softmax',
+            baseline=baseline,
+            tree_class=np.array([k for _, k in predictors], dtype=np.int64),
+            # Boosted trees compare float64 inputs
+            input_dtype=np.float64
+        )
+
+    @property
+    def n_classes(self):
+        return len(self.classes)
+
+    def save(self, directory):
+        """Write the node tables as .npy files that can be memory-mapped"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_NAMES + OPTIONAL_ARRAYS:
+            if getattr(self, name) is not None:
+                np.save(directory / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(directory / "forest.json", "w") as f:
+            json.dump({'max_depth': self.max_depth, 'link': self.link, 'input_dtype': self.input_dtype.name}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load node tables, mapping them read-only so processes share one copy"""
+        directory = Path(directory)
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode)
+            for name in ARRAY_NAMES + OPTIONAL_ARRAYS
+            if name in ARRAY_NAMES or (directory / f"{name}.npy").exists()
+        }
+        with open(directory / "forest.json") as f:
+            meta = json.load(f)
+        return cls(
+            max_depth=meta['max_depth'],
+            link=meta.get('link', 'mean'),
+            input_dtype=meta.get('input_dtype', 'float32'),
+            **arrays
+        )
+
+    def freeze(self):
+        """Mark the node tables read-only and return self"""
+        for name in ARRAY_NAMES + OPTIONAL_ARRAYS:
+            array = getattr(self, name)
+            if isinstance(array, np.ndarray) and not isinstance(array, np.memmap):
+                array.flags.writeable = False
+        return self
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(
+            array.nbytes for array in (
+                self.feature, self.threshold, self.left, self.right, self.value, self.roots,
+                self.baseline, self.tree_class
+            )
+            if array is not None
+        )
+
+    def apply(self, X, roots=None):
+        """Return the leaf index reached by every row in every tree, shape (n_rows, n_trees)
+
+        roots restricts evaluation to a subset of the trees.
+        """
+        roots = self.roots if roots is None else roots
+        # sklearn forests compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=self.input_dtype)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(roots, (X.shape[0], len(roots)))
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def _combine(self, leaves):
+        """Class probabilities from the leaves reached in every tree"""
+        if self.link == 'mean':
+            return self.value[leaves].mean(axis=1)
+
+        # Sum each tree's score into its class, then softmax
+        scores = self.value[leaves, 0] @ np.eye(self.n_classes)[self.tree_class] + self.baseline
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, X, chunk_size=2048):
+        """Combine the leaves of all trees into class probabilities"""
+        X = np.asarray(X, dtype=self.input_dtype)
+        if len(X) <= chunk_size:
+            return self._combine(self.apply(X))
+
+        # Bound the (rows, trees, classes) intermediate for large batches
+        return np.concatenate([
+            self._combine(self.apply(X[start:start + chunk_size]))
+            for start in range(0, len(X), chunk_size)
+        ])
+
+    def predict(self, X):
+        """Return encoded class labels and the full probability matrix in one pass"""
+        proba = self.predict_proba(X)
+        return self.classes[np.argmax(proba, axis=1)], proba
+
+    def predict_anytime(self, X, check_every=10, confidence=None, min_trees=10):
+        """Evaluate trees in order, stopping per row once more trees cannot change the answer
+
+        After every check_every trees a row stops if its leading class's summed
+        probability beats the runner-up's by more than the number of trees
+        left (each tree adds at most 1 to any class, so the final label is
+        certain; this needs more than half the trees), or, when confidence is set
+        and at least min_trees trees have run, if the leader's mean probability
+        reaches confidence. Returns the labels, the probabilities averaged over
+        the trees each row used, the trees used and the exit reason codes (see
+        EXIT_REASONS). Boosted ensembles have no such bound and always use
+        every tree.
+        """
+        X = np.asarray(X, dtype=self.input_dtype)
+        if self.link != 'mean':
+            labels, proba = self.predict(X)
+            return labels, proba, np.full(len(X), self.n_estimators), np.zeros(len(X), dtype=np.int8)
+
+        n_trees = self.n_estimators
+        sums = np.zeros((len(X), self.value.shape[1]))
+        trees_used = np.full(len(X), n_trees)
+        reasons = np.zeros(len(X), dtype=np.int8)
+        active = np.arange(len(X))
+
+        for start in range(0, n_trees, check_every):
+            roots = self.roots[start:start + check_every]
+            sums[active] += self.value[self.apply(X[active], roots)].sum(axis=1)
+            used = start + len(roots)
+            remaining = n_trees - used
+            if remaining == 0:
+                break
+
+            top_two = np.partition(sums[active], -2, axis=1)[:, -2:]
+            # The margin must exceed the remaining trees strictly, with slack for rounding
+            reason = np.where(top_two[:, 1] - top_two[:, 0] > remaining + 1e-9, 1, 0)
+            if confidence is not None and used >= min_trees:
+                reason = np.where((reason == 0) & (top_two[:, 1] / used >= confidence), 2, reason)
+
+            done = reason > 0
+            trees_used[active[done]] = used
+            reasons[active[done]] = reason[done]
+            active = active[~done]
+            if len(active) == 0:
+                break
+
+        proba = sums / trees_used[:, None]
+        return self.classes[np.argmax(proba, axis=1)], proba, trees_used, reasons
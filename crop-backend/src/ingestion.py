@@ -0,0 +1,248 @@
+import io
+import json
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from .incremental import log_watermark, read_since
+from .preprocessing import (
+    CLEANING_VERSION, FEATURE_COLUMNS, OPTIONAL_FEATURES, add_sentinel_features, clean_data, valid_rows
+)
+
+TARGET_COLUMN = 'label'
+STAGES = ('read', 'filter', 'dedup', 'write')
+# Parquet schema metadata key holding how the store was ingested
+METADATA_KEY = b'crop_ingestion'
+
+class DigestSet:
+    """Set of 64-bit row digests kept as sorted numpy blocks, 8 bytes per distinct row
+
+    Blocks are merged like a binary counter, so there are at most log2(n)
+    of them and each digest is merged O(log n) times.
+    """
+
+    def __init__(self):
+        self._blocks = []
+
+    def __len__(self):
+        return sum(len(block) for block in self._blocks)
+
+    @property
+    def nbytes(self):
+        return sum(block.nbytes for block in self._blocks)
+
+    def contains(self, digests):
+        """Whether each digest is already in the set"""
+        found = np.zeros(len(digests), dtype=bool)
+        for block in self._blocks:
+            index = np.minimum(np.searchsorted(block, digests), len(block) - 1)
+            found |= block[index] == digests
+        return found
+
+    def add(self, digests):
+        """Add digests that are not yet in the set"""
+        if len(digests) == 0:
+            return
+        self._blocks.append(np.unique(digests))
+        while len(self._blocks) > 1 and len(self._blocks[-2]) <= 2 * len(self._blocks[-1]):
+            newest = self._blocks.pop()
+            self._blocks[-1] = np.union1d(self._blocks[-1], newest)
+
+class _Head(io.RawIOBase):
+    """The first size bytes of an open binary file"""
+
+    def __init__(self, f, size):
+        self._f = f
+        self._left = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(memoryview(buffer)[:self._left])
+        self._left -= n
+        return n
+
+
+def _read_chunks(source, dtypes, chunk_size, limit=None):
+    """chunk_size-row DataFrames of a CSV source; the labelled log is read only up to limit bytes"""
+    with open(source, "rb") as f:
+        if limit is None:
+            reader = pd.read_csv(f, usecols=list(dtypes), dtype=dtypes, chunksize=chunk_size)
+        else:
+            # As load_and_clean_data does, log rows lacking a column are dropped rather than failing
+            reader = pd.read_csv(io.BufferedReader(_Head(f, limit)), usecols=lambda column: column in dtypes,
+                                 dtype=dtypes, chunksize=chunk_size)
+        for chunk in reader:
+            yield chunk.reindex(columns=list(dtypes))
+
+def default_columns(sources):
+    """The training feature columns, with each optional feature every source has"""
+    headers = [set(pd.read_csv(source, nrows=0).columns) for source in sources]
+    return FEATURE_COLUMNS + [column for column in OPTIONAL_FEATURES
+                              if headers and all(column in header for header in headers)]
+
+def store_metadata(path):
+    """How a store was ingested, or {} for a store written without that record"""
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(METADATA_KEY, b'{}'))
+
+def ingest(sources, output_path, columns=None, chunk_size=100000, compression="snappy", sentinel_path=None,
+           labelled_path=None):
+    """Stream CSV sources through cleaning into a single Parquet file
+
+    Each source is read chunk_size rows at a time with explicit dtypes. Rows
+    are validated with the rules clean_data applies (preprocessing.valid_rows),
+    then rows already seen in any earlier chunk or source are dropped by
+    their pandas row hash. Unlike load_and_clean_data, every source is
+    validated and duplicates are dropped across sources. If sentinel_path
+    exists and ndvi is not ingested, each chunk gets the NDVI column
+    add_sentinel_features adds. The labelled data log at labelled_path is
+    ingested last, up to its watermark when ingestion started; rows appended
+    after it are read from the log by labelled_tail. Each surviving chunk is
+    appended as a row group, so memory is bounded by the chunk size plus 8
+    bytes per distinct row. The file is written under a temporary name and
+    renamed when complete, with CLEANING_VERSION and the log watermark in its
+    metadata.
+    """
+    columns = list(columns or default_columns(sources))
+    dtypes = {column: 'float64' for column in columns}
+    dtypes[TARGET_COLUMN] = 'str'
+    sentinel_ndvi = 'ndvi' not in columns and sentinel_path is not None and Path(sentinel_path).exists()
+    stored_columns = columns + (['ndvi'] if sentinel_ndvi else [])
+    # Sources are read in full; the log only up to the complete lines present now
+    inputs = [(source, None) for source in sources]
+    watermark = None
+    if labelled_path is not None and Path(labelled_path).exists():
+        watermark = log_watermark(labelled_path)
+        if watermark['offset']:
+            inputs.append((labelled_path, watermark['offset']))
+    metadata = {'cleaning_version': CLEANING_VERSION, 'sentinel_ndvi': sentinel_ndvi,
+                'labelled_watermark': watermark}
+    schema = pa.schema(
+        [(column, pa.float64()) for column in stored_columns] + [(TARGET_COLUMN, pa.string())],
+        metadata={METADATA_KEY: json.dumps(metadata)}
+    )
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.parent / f".{output_path.name}.tmp"
+    stages = {stage: {'rows': 0, 'seconds': 0.0} for stage in STAGES}
+    seen = DigestSet()
+    rows_read = invalid = duplicates = 0
+    started = time.perf_counter()
+
+    def timed(stage, rows, stage_started):
+        stages[stage]['rows'] += rows
+        stages[stage]['seconds'] += time.perf_counter() - stage_started
+
+    with pq.ParquetWriter(tmp_path, schema, compression=compression) as writer:
+        for source, limit in inputs:
+            logger.info(f"Ingesting {source}")
+            chunks = _read_chunks(source, dtypes, chunk_size, limit)
+            while True:
+                stage_started = time.perf_counter()
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                rows_read += len(chunk)
+                timed('read', len(chunk), stage_started)
+
+                stage_started = time.perf_counter()
+                valid = valid_rows(chunk).to_numpy()
+                invalid += int((~valid).sum())
+                filtered = chunk[valid]
+                timed('filter', len(chunk), stage_started)
+
+                stage_started = time.perf_counter()
+                digests = pd.util.hash_pandas_object(filtered[columns + [TARGET_COLUMN]], index=False).to_numpy()
+                new = ~pd.Series(digests).duplicated().to_numpy() & ~seen.contains(digests)
+                seen.add(digests[new])
+                duplicates += int((~new).sum())
+                kept = filtered[new]
+                timed('dedup', len(filtered), stage_started)
+
+                stage_started = time.perf_counter()
+                if sentinel_ndvi:
+                    kept = add_sentinel_features(kept.copy(), None)
+                writer.write_table(pa.Table.from_pandas(kept[stored_columns + [TARGET_COLUMN]], schema=schema,
+                                                        preserve_index=False))
+                timed('write', len(kept), stage_started)
+    os.replace(tmp_path, output_path)
+
+    for stage, totals in stages.items():
+        totals['rows_per_second'] = totals['rows'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+        logger.info(f"Ingestion stage '{stage}': {totals['rows']} rows in {totals['seconds']:.2f}s "
+                    f"({totals['rows_per_second']:,.0f} rows/s)")
+    rows_written = rows_read - invalid - duplicates
+    logger.info(f"Ingested {rows_written} of {rows_read} rows into {output_path} "
+                f"({invalid} invalid, {duplicates} duplicates)")
+    return {
+        'sources': [str(source) for source, _ in inputs],
+        'output': str(output_path),
+        'columns': stored_columns,
+        'rows_read': rows_read,
+        'rows_written': rows_written,
+        'dropped_invalid': invalid,
+        'dropped_duplicates': duplicates,
+        'digest_bytes': seen.nbytes,
+        'stages': stages,
+        'seconds': time.perf_counter() - started
+    }
+
+def labelled_tail(path, labelled_path):
+    """Labelled log rows appended after the store was ingested, cleaned as load_and_clean_data cleans them
+
+    Rows are read from the store's log watermark on, or the whole log for a
+    store ingested without it, and returned with the store's columns.
+    """
+    columns = pq.read_schema(path).names
+    metadata = store_metadata(path)
+    watermark = metadata.get('labelled_watermark') or {'offset': 0, 'collected_at': None}
+    df, _ = read_since(labelled_path, watermark)
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    if metadata.get('sentinel_ndvi'):
+        # The NDVI column is synthetic, added after cleaning as load_and_clean_data adds it
+        df = clean_data(df.reindex(columns=[name for name in columns if name != 'ndvi']))
+        return add_sentinel_features(df, None)[columns]
+    return clean_data(df.reindex(columns=columns))
+
+def store_to_arrays(path, x_path, labels_path, batch_size=100000, extra=None):
+    """Copy an ingested Parquet store, then the rows of extra, into .npy feature and label-code files
+
+    Labels are read in a first pass to fix the class codes; features are
+    then written into a memory-mapped matrix batch by batch, so memory stays
+    bounded by batch_size and the size of extra. Returns the feature
+    columns, classes and row count.
+    """
+    parquet = pq.ParquetFile(path)
+    feature_columns = [name for name in parquet.schema_arrow.names if name != TARGET_COLUMN]
+    extra = pd.DataFrame(columns=feature_columns + [TARGET_COLUMN]) if extra is None else extra
+    rows = parquet.metadata.num_rows + len(extra)
+
+    classes = set(extra[TARGET_COLUMN].astype(str))
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=[TARGET_COLUMN]):
+        classes.update(batch.column(0).unique().to_pylist())
+    classes = np.array(sorted(classes), dtype=object)
+
+    X = np.lib.format.open_memmap(x_path, mode='w+', dtype=np.float64, shape=(rows, len(feature_columns)))
+    codes = np.lib.format.open_memmap(
+        labels_path, mode='w+', dtype=np.min_scalar_type(max(len(classes) - 1, 0)), shape=(rows,)
+    )
+    start = 0
+    for batch in parquet.iter_batches(batch_size=batch_size, columns=feature_columns + [TARGET_COLUMN]):
+        end = start + batch.num_rows
+        for i, column in enumerate(feature_columns):
+            X[start:end, i] = batch.column(column).to_numpy(zero_copy_only=False)
+        codes[start:end] = np.searchsorted(classes, batch.column(TARGET_COLUMN).to_numpy(zero_copy_only=False))
+        start = end
+    X[start:] = extra[feature_columns].to_numpy(dtype=np.float64)
+    codes[start:] = np.searchsorted(classes, extra[TARGET_COLUMN].astype(str).to_numpy())
+    X.flush()
+    codes.flush()
+    return feature_columns, classes.tolist(), rows
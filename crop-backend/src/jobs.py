@@ -0,0 +1,319 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from loguru import logger
+from .config import settings
+from .model import CropModel
+from .training import remove_shared_arrays
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+JOB_KINDS = ('full', 'incremental')
+JOB_STATES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled')
+
+class TrainingJobRejected(RuntimeError):
+    """Raised when a job is submitted while one runs and the queue is full"""
+
+def planned_stages(kind, evaluation=None):
+    """Stages a job reports, in order, used to compute its progress"""
+    if kind == 'incremental':
+        return ['load_data', 'fit', 'score', 'save']
+    evaluation = evaluation or settings.TRAINING_EVALUATION
+    return ['load_data', 'fit', 'score'] + (['cross_validation'] if evaluation == 'cv' else []) + ['save']
+
+def _apply_limits(memory_mb, nice):
+    """Lower the job process's priority and cap its address space"""
+    if nice:
+        os.nice(nice)
+    if memory_mb:
+        if resource is None:
+            logger.warning("Memory limits are not supported on this platform")
+        else:
+            limit = int(memory_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _exit_on_sigterm(signum, frame):
+    # Unwind so open worker pools shut down and shared arrays are removed
+    raise SystemExit(128 + signum)
+
+def _signal_group(process, kill=False):
+    """Signal a job's process group, which holds the worker processes it started"""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+            return
+        except ProcessLookupError:
+            # The job has not made its group yet, or every process in it has exited
+            pass
+    if process.is_alive():
+        if kill:
+            process.kill()
+        else:
+            process.terminate()
+
+def _run_job(kind, params, settings_values, limits, events):
+    """Run one training job and report stage, result and error events; runs in the job's process"""
+    if hasattr(os, "setpgrp"):
+        # Lead a process group, so cancelling also stops cross-validation and tuning workers
+        os.setpgrp()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    # Match the server's settings, including any changed after startup
+    for name, value in settings_values.items():
+        setattr(settings, name, value)
+    try:
+        _apply_limits(**limits)
+        model = CropModel()
+        progress = lambda stage, seconds=None: events.put(('stage', stage, time.time(), seconds))
+        if kind == 'incremental':
+            result = model.train_incremental(progress=progress, **params)
+        else:
+            result = model.train(progress=progress, **params)
+        events.put(('result', result, model.version if result is not None else None))
+    except BaseException as e:
+        events.put(('error', f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+class TrainingJob:
+    """State of one submitted training run"""
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'
+        self.planned_stages = planned_stages(kind, params.get('evaluation'))
+        self.stages = {}
+        self.stage = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.version = None
+        self.error = None
+        self.process = None
+        self.cancel_requested = False
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def progress(self):
+        """Fraction of the planned stages completed"""
+        if self.status == 'succeeded':
+            return 1.0
+        done = sum(1 for name in self.planned_stages if self.stages.get(name, {}).get('seconds') is not None)
+        return done / len(self.planned_stages)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress(),
+            'stages': [{'name': name, **self.stages.get(name, {})} for name in self.planned_stages],
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'version': self.version,
+            'result': self.result,
+            'error': self.error
+        }
+
+class TrainingJobManager:
+    """Runs training jobs one at a time, each in its own spawned process
+
+    A job process is niced and optionally memory-capped so serving keeps its
+    CPU share. On cancellation or after the timeout its whole process group
+    is sent SIGTERM, and killed if it is still running after the grace period.
+    While a job runs, up to max_queue more wait for it; further submissions
+    are rejected. on_success is called with each job that registers a model.
+    """
+
+    # Seconds a stopped job gets to shut down its worker pools before it is killed
+    KILL_GRACE_SECONDS = 10
+
+    def __init__(self, max_queue=None, timeout=None, memory_mb=None, nice=None, history=None, on_success=None):
+        self.max_queue = settings.TRAINING_JOB_QUEUE_SIZE if max_queue is None else max_queue
+        self.timeout = settings.TRAINING_JOB_TIMEOUT if timeout is None else timeout
+        self.memory_mb = settings.TRAINING_JOB_MEMORY_MB if memory_mb is None else memory_mb
+        self.nice = settings.TRAINING_JOB_NICE if nice is None else nice
+        self.history = settings.TRAINING_JOB_HISTORY if history is None else history
+        self.on_success = on_success
+
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._running = None
+        self._context = multiprocessing.get_context("spawn")
+
+        self.submitted = 0
+        self.rejected = 0
+        self.counts = {state: 0 for state in FINISHED_STATES}
+
+    def submit(self, kind='full', **params):
+        """Start a job, or queue it behind the running one; raises TrainingJobRejected when full"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+        with self._lock:
+            if self._running is not None and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise TrainingJobRejected("A training job is already running and the queue is full")
+            job = TrainingJob(kind, params)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            self._prune()
+            if self._running is None:
+                self._start(job)
+            else:
+                self._queue.append(job)
+                logger.info(f"Training job {job.id} queued ({len(self._queue)} waiting)")
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """Known jobs, newest first"""
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it had already finished"""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.finished:
+                return False
+            if job.status == 'queued':
+                self._queue.remove(job)
+                self._finish(job, 'cancelled')
+            else:
+                # The watcher terminates the process
+                job.cancel_requested = True
+        logger.info(f"Cancelling training job {job_id}")
+        return True
+
+    def _start(self, job):
+        """Spawn the job's process and a thread that follows it; call with the lock held"""
+        events = self._context.Queue()
+        settings_values = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+        limits = {'memory_mb': self.memory_mb, 'nice': self.nice}
+        # Not a daemon: cross-validation starts its own worker processes
+        job.process = self._context.Process(
+            target=_run_job, args=(job.kind, job.params, settings_values, limits, events),
+            name=f"training-{job.id[:8]}"
+        )
+        job.process.start()
+        job.status = 'running'
+        job.started_at = time.time()
+        self._running = job
+        threading.Thread(target=self._watch, args=(job, events), name=f"watch-{job.id[:8]}", daemon=True).start()
+        logger.info(f"Training job {job.id} started in process {job.process.pid}")
+
+    def _watch(self, job, events):
+        """Apply a job's events until its process ends, enforcing cancellation and the timeout"""
+        outcome = None
+        while outcome is None:
+            try:
+                outcome = self._apply(job, events.get(timeout=0.2))
+                continue
+            except queue.Empty:
+                pass
+            if job.cancel_requested:
+                self._stop(job)
+                outcome = 'cancelled'
+            elif self.timeout and time.time() - job.started_at > self.timeout:
+                self._stop(job)
+                job.error = f"Timed out after {self.timeout:.0f}s"
+                outcome = 'failed'
+            elif not job.process.is_alive():
+                # Events still in the pipe when the process exited
+                try:
+                    while outcome is None:
+                        outcome = self._apply(job, events.get(timeout=0.5))
+                except queue.Empty:
+                    job.error = f"Training process exited with code {job.process.exitcode}"
+                    outcome = 'failed'
+        job.process.join()
+        events.close()
+
+        with self._lock:
+            self._finish(job, outcome)
+            self._running = None
+            if self._queue:
+                self._start(self._queue.popleft())
+
+        if outcome == 'succeeded' and job.version is not None and self.on_success is not None:
+            try:
+                self.on_success(job)
+            except Exception as e:
+                logger.error(f"Post-training hook failed for job {job.id}: {e}")
+
+    def _stop(self, job):
+        """Terminate a job and its worker processes, and remove any arrays they shared"""
+        _signal_group(job.process)
+        job.process.join(self.KILL_GRACE_SECONDS)
+        # Kill the job if it did not exit, and any worker that outlived it
+        _signal_group(job.process, kill=True)
+        job.process.join()
+        remove_shared_arrays(job.process.pid)
+
+    def _apply(self, job, event):
+        """Record one event from the job process; returns the final state once known"""
+        if event[0] == 'stage':
+            _, name, timestamp, seconds = event
+            if seconds is None:
+                job.stage = name
+                job.stages[name] = {'started_at': timestamp, 'seconds': None}
+            else:
+                job.stages.setdefault(name, {'started_at': timestamp - seconds})['seconds'] = seconds
+            return None
+        if event[0] == 'result':
+            _, job.result, job.version = event
+            return 'succeeded'
+        _, job.error, details = event
+        logger.error(f"Training job {job.id} failed: {job.error}\n{details}")
+        return 'failed'
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        self.counts[status] += 1
+        logger.info(f"Training job {job.id} {status}")
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history size; call with the lock held"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._running.id if self._running is not None else None,
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                **self.counts
+            }
+
+    def shutdown(self, timeout=10):
+        """Cancel queued jobs and stop the running one"""
+        with self._lock:
+            while self._queue:
+                self._finish(self._queue.popleft(), 'cancelled')
+            running = self._running
+            if running is not None:
+                running.cancel_requested = True
+        if running is not None:
+            running.process.join(timeout)
@@ -0,0 +1,166 @@
+import json
+import time
+from pathlib import Path
+import numpy as np
+from loguru import logger
+from .inference import CompiledForest
+from .training import process_pool, resolve_n_jobs
+
+TABLE_ARRAYS = ('top_classes', 'top_proba', 'fallback')
+
+class LookupGrid:
+    """Uniform quantization of a bounded input space into row-major cells"""
+
+    def __init__(self, feature_columns, lows, highs, bins):
+        self.feature_columns = list(feature_columns)
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.bins = np.asarray(bins, dtype=np.int64)
+        self.widths = (self.highs - self.lows) / self.bins
+        self.strides = np.append(np.cumprod(self.bins[::-1])[-2::-1], 1)
+
+    @property
+    def n_cells(self):
+        return int(np.prod(self.bins))
+
+    def cell_index(self, X):
+        """Flat cell index of every row, and whether the row lies inside the grid"""
+        X = np.asarray(X, dtype=np.float64)
+        inside = ((X >= self.lows) & (X <= self.highs)).all(axis=1)
+        with np.errstate(invalid='ignore'):
+            scaled = np.floor((X - self.lows) / self.widths)
+        index = np.clip(np.nan_to_num(scaled), 0, self.bins - 1).astype(np.int64)
+        return index @ self.strides, inside
+
+    def centers(self, start, end):
+        """Centre points of the cells with flat indices in [start, end)"""
+        index = np.stack(np.unravel_index(np.arange(start, end), tuple(self.bins)), axis=1)
+        return self.lows + (index + 0.5) * self.widths
+
+    def to_dict(self):
+        return {
+            'feature_columns': self.feature_columns,
+            'lows': self.lows.tolist(),
+            'highs': self.highs.tolist(),
+            'bins': self.bins.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec['feature_columns'], spec['lows'], spec['highs'], spec['bins'])
+
+class LookupTable:
+    """Per-cell top-k crops and probabilities, with cells that must use the exact forest
+
+    A cell falls back to the forest when the top two classes at its centre are
+    closer than the build's min_margin, or when held-out rows inside it were
+    predicted differently by the forest; either means a decision boundary
+    probably crosses the cell.
+    """
+
+    def __init__(self, grid, top_classes, top_proba, fallback, meta=None):
+        self.grid = grid
+        self.top_classes = top_classes
+        self.top_proba = top_proba
+        self.fallback = fallback
+        self.meta = meta or {}
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a built table, mapping its arrays read-only"""
+        directory = Path(directory)
+        with open(directory / "lookup.json") as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in TABLE_ARRAYS}
+        return cls(LookupGrid.from_dict(meta['grid']), meta=meta, **arrays)
+
+    def lookup(self, X):
+        """Cell of every row and whether the table can answer it"""
+        cells, inside = self.grid.cell_index(X)
+        return cells, inside & ~self.fallback[cells]
+
+    def evaluate(self, engine, X, mark_disagreements=False):
+        """Agreement of table lookups with the exact forest on held-out rows
+
+        With mark_disagreements, cells whose held-out rows the forest labels
+        differently are switched to fall back to the forest.
+        """
+        exact, _ = engine.predict(X)
+        cells, inside = self.grid.cell_index(X)
+        agrees = self.top_classes[cells, 0] == exact
+        if mark_disagreements:
+            self.fallback[cells[inside & ~agrees]] = True
+        served = inside & ~self.fallback[cells]
+        return {
+            'rows': len(X),
+            'coverage': float(inside.mean()),
+            'lookup_rate': float(served.mean()),
+            'agreement_in_grid': float(agrees[inside].mean()) if inside.any() else None,
+            'agreement_served': float(agrees[served].mean()) if served.any() else None
+        }
+
+def _fill_cells(engine_path, table_dir, grid_spec, start, end, min_margin):
+    """Evaluate the forest at the centres of cells [start, end) and write their rows"""
+    engine = CompiledForest.load(engine_path, mmap=True)
+    grid = LookupGrid.from_dict(grid_spec)
+    arrays = {name: np.load(Path(table_dir) / f"{name}.npy", mmap_mode='r+') for name in TABLE_ARRAYS}
+    k = arrays['top_classes'].shape[1]
+
+    proba = engine.predict_proba(grid.centers(start, end))
+    order = np.argsort(-proba, axis=1, kind='stable')
+    ranked = np.take_along_axis(proba, order[:, :max(k, 2)], axis=1)
+    arrays['top_classes'][start:end] = engine.classes[order[:, :k]]
+    arrays['top_proba'][start:end] = ranked[:, :k]
+    if proba.shape[1] > 1:
+        arrays['fallback'][start:end] = ranked[:, 0] - ranked[:, 1] < min_margin
+    else:
+        arrays['fallback'][start:end] = False
+    for array in arrays.values():
+        array.flush()
+    return end - start
+
+def build_table(engine, engine_path, table_dir, grid, top_k=3, min_margin=0.2, chunk_size=65536, workers=None):
+    """Evaluate the forest over every grid cell into memory-mapped .npy tables
+
+    Cells are split into chunks of chunk_size evaluated by a process pool;
+    every worker maps the saved node tables at engine_path and writes its
+    disjoint slice of the output arrays in place, so neither inputs nor
+    results are pickled between processes.
+    """
+    started = time.perf_counter()
+    table_dir = Path(table_dir)
+    n_cells = grid.n_cells
+    k = min(top_k, len(engine.classes))
+    class_dtype = np.min_scalar_type(max(int(engine.classes.max()), 0))
+    shapes = {
+        'top_classes': ((n_cells, k), class_dtype),
+        'top_proba': ((n_cells, k), np.float32),
+        'fallback': ((n_cells,), np.bool_)
+    }
+    for name, (shape, dtype) in shapes.items():
+        np.lib.format.open_memmap(table_dir / f"{name}.npy", mode='w+', dtype=dtype, shape=shape).flush()
+
+    chunks = [(start, min(start + chunk_size, n_cells)) for start in range(0, n_cells, chunk_size)]
+    workers = min(len(chunks), workers or resolve_n_jobs(-1))
+    args = (str(engine_path), str(table_dir), grid.to_dict())
+    if workers <= 1:
+        for start, end in chunks:
+            _fill_cells(*args, start, end, min_margin)
+    else:
+        with process_pool(workers) as pool:
+            futures = [pool.submit(_fill_cells, *args, start, end, min_margin) for start, end in chunks]
+            for future in futures:
+                future.result()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Evaluated {n_cells} lookup cells in {elapsed:.1f}s with {workers} workers")
+    return {
+        'n_cells': n_cells,
+        'top_k': k,
+        'min_margin': min_margin,
+        'chunks': len(chunks),
+        'workers': workers,
+        'build_seconds': elapsed,
+        'cells_per_second': n_cells / elapsed if elapsed > 0 else 0.0
+    }
@@ -1,70 +1,227 @@
 import joblib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 from sklearn.preprocessing import LabelEncoder
 from pathlib import Path
 from loguru import logger
 from .config import settings
-from .preprocessing import load_and_clean_data, prepare_features_target
+from .preprocessing import clean_data
+from .dataset_cache import load_training_data
+from .inference import EXIT_REASONS, CompiledForest
+from .registry import ModelRegistry
+from .incremental import (
+    STATE_ARTIFACT_NAME, TIMESTAMP_COLUMN, grow_forest, load_state, log_watermark, read_since, roll_holdout,
+    sample_replay, save_state
+)
+from .model_format import load_binary, save_binary
+from .backends import compare_backends, get_backend
+from .training import (
+    EVALUATION_MODES, StageTimer, cross_validate, load_forest_params, save_forest_config
+)
+from .tuning import choose, measure_latency, pareto_front, sample_candidates, successive_halving
+from .compaction import accuracy, compact
+from .lookup import TABLE_ARRAYS, LookupGrid, LookupTable, build_table
+from .cache import PredictionCache, parse_rounding
+from .utils import FEATURE_RANGES
+
+DEFAULT_FEATURE_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall', 'ndvi']
+BINARY_ARTIFACT_NAME = "model.bin"
+
+@dataclass(frozen=True)
+class ModelSnapshot:
+    """Immutable bundle of everything needed to serve one model version"""
+    engine: CompiledForest
+    label_encoder: LabelEncoder
+    feature_columns: tuple
+    model_type: str
+    estimator: object = None
+    lookup: LookupTable = None
+    version: str = None
+    trained_at: str = None
+    metrics: dict = field(default_factory=dict)
+    compact: bool = False
+    
+    @property
+    def cache_prefix(self):
+        """Version and serving mode, prefixed to cache keys so no two kinds of answer share one"""
+        return (
+            self.version,
+            'compact' if self.compact else 'full',
+            'lookup' if self.lookup is not None else 'forest'
+        )
+    
+    @classmethod
+    def from_estimator(cls, estimator, label_encoder, feature_columns, **kwargs):
+        """Compile an estimator into a read-only snapshot"""
+        return cls(
+            engine=CompiledForest.from_estimator(estimator).freeze(),
+            label_encoder=label_encoder,
+            feature_columns=tuple(feature_columns),
+            model_type=type(estimator).__name__,
+            estimator=estimator,
+            **kwargs
+        )
 
 class CropModel:
+    """Serving handle for the crop model
+    
+    All model state lives in an immutable ModelSnapshot. Training and reloading
+    build a new snapshot and publish it with a single reference assignment, so
+    a prediction running concurrently always sees one consistent model.
+    """
+    
     def __init__(self):
-        self.model = None
-        self.label_encoder = LabelEncoder()
-        self.feature_columns = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall', 'ndvi']
+        self._snapshot = None
+        self._estimators = {}
         self.model_path = Path(settings.MODEL_PATH)
+        self.cache = None
+        if settings.PREDICTION_CACHE_SIZE > 0:
+            self.cache = PredictionCache(
+                max_size=settings.PREDICTION_CACHE_SIZE,
+                ttl=settings.PREDICTION_CACHE_TTL or None,
+                rounding=parse_rounding(settings.PREDICTION_CACHE_ROUNDING)
+            )
+    
+    @property
+    def snapshot(self):
+        return self._snapshot
+    
+    @property
+    def is_loaded(self):
+        """Whether a model is available for predictions"""
+        return self._snapshot is not None
+    
+    @property
+    def model(self):
+        """The sklearn estimator, unpickled on first use when serving from model.bin"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if snapshot.estimator is not None or snapshot.version is None:
+            return snapshot.estimator
+        if snapshot.version not in self._estimators:
+            model_data, _ = self.registry.load(snapshot.version)
+            self._estimators = {snapshot.version: model_data['model']}
+        return self._estimators[snapshot.version]
+    
+    @property
+    def label_encoder(self):
+        return self._snapshot.label_encoder if self._snapshot else LabelEncoder()
+    
+    @property
+    def feature_columns(self):
+        return list(self._snapshot.feature_columns) if self._snapshot else list(DEFAULT_FEATURE_COLUMNS)
+    
+    @property
+    def engine(self):
+        return self._snapshot.engine if self._snapshot else None
+    
+    @property
+    def version(self):
+        return self._snapshot.version if self._snapshot else None
+    
+    @property
+    def registry(self):
+        """Versioned model store kept next to MODEL_PATH"""
+        return ModelRegistry(self.model_path.parent / "registry")
+    
+    @property
+    def forest_config_path(self):
+        """Tuned hyperparameters written by tune() and read by train()"""
+        return self.model_path.parent / "forest_config.json"
+    
+    def train(self, test_size=0.2, random_state=42, evaluation=None, progress=None):
+        """Train the crop recommendation model
         
-    def train(self, test_size=0.2, random_state=42):
-        """Train the crop recommendation model"""
-        logger.info("Starting model training")
-        
-        # Load and prepare data
-        df = load_and_clean_data()
-        X, y = prepare_features_target(df)
-        
-        # Encode labels
-        y_encoded = self.label_encoder.fit_transform(y)
+        evaluation is "cv" (parallel k-fold CV), "oob" (out-of-bag estimate
+        from the fitted forest, no refits) or "none"; defaults to TRAINING_EVALUATION.
+        The estimator comes from the MODEL_BACKEND backend. progress receives
+        stage start and end events (see StageTimer).
+        """
+        evaluation = evaluation or settings.TRAINING_EVALUATION
+        if evaluation not in EVALUATION_MODES:
+            raise ValueError(f"evaluation must be one of {', '.join(EVALUATION_MODES)}")
+        backend = get_backend()
+        if evaluation == 'oob' and not backend.supports_oob:
+            raise ValueError(f"The {backend.name} backend has no out-of-bag estimate; use cv or none")
+        logger.info(f"Starting model training (backend: {backend.name}, evaluation: {evaluation})")
+        timer = StageTimer(progress)
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y_encoded, test_size=test_size, random_state=random_state, stratify=y_encoded
-        )
+        # Load and prepare data, noting how much of the labelled data log it covers
+        with timer.stage('load_data'):
+            watermark = log_watermark(settings.LABELLED_DATA_PATH)
+            X, y = load_training_data()
+            
+            # Encode labels
+            label_encoder = LabelEncoder()
+            y_encoded = label_encoder.fit_transform(y)
+            
+            # Split data
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y_encoded, test_size=test_size, random_state=random_state, stratify=y_encoded
+            )
         
         logger.info(f"Training set size: {len(X_train)}")
         logger.info(f"Test set size: {len(X_test)}")
         
-        # Initialize and train model
-        self.model = RandomForestClassifier(
-            n_estimators=100,
+        # Initialize and train model, building trees on all cores
+        forest_params = load_forest_params(self.forest_config_path, backend.default_params, backend.name)
+        estimator = backend.build(
             random_state=random_state,
-            max_depth=20,
-            min_samples_split=5,
-            min_samples_leaf=2
+            n_jobs=settings.TRAINING_N_JOBS,
+            oob_score=evaluation == 'oob',
+            **forest_params
         )
+        with timer.stage('fit'):
+            estimator.fit(X_train, y_train)
         
-        self.model.fit(X_train, y_train)
-        
-        # Evaluate model
-        train_score = self.model.score(X_train, y_train)
-        test_score = self.model.score(X_test, y_test)
+        # Evaluate model, predicting the test set once for both the score and the report
+        with timer.stage('score'):
+            train_score = estimator.score(X_train, y_train)
+            y_pred = estimator.predict(X_test)
+            test_score = accuracy_score(y_test, y_pred)
         
         logger.info(f"Training accuracy: {train_score:.4f}")
         logger.info(f"Test accuracy: {test_score:.4f}")
         
-        # Cross-validation
-        cv_scores = cross_val_score(self.model, X, y_encoded, cv=5)
-        logger.info(f"Cross-validation scores: {cv_scores}")
-        logger.info(f"Mean CV score: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+        results = {
+            'backend': backend.name,
+            'evaluation': evaluation,
+            'forest_params': forest_params,
+            'train_accuracy': train_score,
+            'test_accuracy': test_score
+        }
         
-        # Generate predictions for classification report
-        y_pred = self.model.predict(X_test)
+        if evaluation == 'cv':
+            # Cross-validation, folds in parallel worker processes
+            with timer.stage('cross_validation'):
+                cv_scores = cross_validate(
+                    X.values, y_encoded,
+                    folds=settings.TRAINING_CV_FOLDS,
+                    random_state=random_state,
+                    workers=settings.TRAINING_CV_WORKERS or None,
+                    params=forest_params,
+                    build=backend.build
+                )
+            logger.info(f"Cross-validation scores: {cv_scores}")
+            logger.info(f"Mean CV score: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
+            results['cv_mean'] = cv_scores.mean()
+            results['cv_std'] = cv_scores.std()
+        elif evaluation == 'oob':
+            logger.info(f"Out-of-bag score: {estimator.oob_score_:.4f}")
+            results['oob_score'] = estimator.oob_score_
         
         # Convert back to original labels for report
-        y_test_original = self.label_encoder.inverse_transform(y_test)
-        y_pred_original = self.label_encoder.inverse_transform(y_pred)
+        y_test_original = label_encoder.inverse_transform(y_test)
+        y_pred_original = label_encoder.inverse_transform(y_pred)
         
         logger.info("Classification Report:")
         logger.info(f"\n{classification_report(y_test_original, y_pred_original)}")
@@ -72,129 +229,721 @@ class CropModel:
         # Feature importance
         feature_importance = pd.DataFrame({
             'feature': X.columns,
-            'importance': self.model.feature_importances_
+            'importance': backend.feature_importance(estimator, X_test, y_test, random_state)
         }).sort_values('importance', ascending=False)
         
         logger.info("Feature Importance:")
         logger.info(f"\n{feature_importance}")
         
-        # Save model
-        self.save_model()
+        results['feature_importance'] = feature_importance.to_dict('records')
+        
+        # Seed the replay sample and rolling holdout for incremental training
+        replay_X, replay_y = sample_replay(
+            X_train.values, y_train, settings.INCREMENTAL_REPLAY_ROWS, random_state=random_state
+        )
+        state = {
+            'replay_X': replay_X, 'replay_y': replay_y,
+            'holdout_X': X_test.values[-settings.INCREMENTAL_HOLDOUT_ROWS:],
+            'holdout_y': y_test[-settings.INCREMENTAL_HOLDOUT_ROWS:]
+        }
+        
+        # Publish the new model, then save it as a registry version
+        self._snapshot = ModelSnapshot.from_estimator(estimator, label_encoder, X.columns)
+        results['timings'] = timer.summary()
+        with timer.stage('save'):
+            self.save_model(metrics=results, watermark=watermark, state=state)
+        # The registered metrics stop before saving; the caller also sees the save time
+        results['timings'] = timer.summary()
+        
+        return results
+    
+    def train_incremental(self, test_size=0.2, random_state=42, n_trees=None, progress=None):
+        """Refresh the active forest with labelled rows collected since it was trained
+        
+        Only rows after the active version's watermark are read from
+        LABELLED_DATA_PATH. test_size of them join the rolling holdout; the
+        rest, with the replay sample of earlier training rows, fit n_trees new
+        trees (warm start) that replace the n_trees oldest, so the ensemble
+        size stays fixed. The result is scored on the rolling holdout next to
+        the current model and registered as a new version. Returns None when
+        there are no new rows. progress receives stage events as in train().
+        """
+        n_trees = n_trees or settings.INCREMENTAL_TREES
+        timer = StageTimer(progress)
+        if not self.is_loaded:
+            self.load_model()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version is None:
+            raise ValueError("No registered model version to update")
+        registry = self.registry
+        metadata = registry.metadata(snapshot.version)
+        if 'watermark' not in metadata:
+            raise ValueError(f"Model version {snapshot.version} has no training watermark; run a full training")
+        if not hasattr(self.model, 'estimators_'):
+            raise ValueError(f"{snapshot.model_type} cannot be updated incrementally; run a full training")
+        
+        with timer.stage('load_data'):
+            df, watermark = read_since(settings.LABELLED_DATA_PATH, metadata['watermark'])
+            state = load_state(registry.verify(snapshot.version, STATE_ARTIFACT_NAME))
+        
+        new_rows = len(df)
+        if new_rows:
+            missing = [column for column in snapshot.feature_columns + ('label',) if column not in df.columns]
+            if missing:
+                raise ValueError(f"Labelled rows are missing columns: {', '.join(missing)}")
+            df = clean_data(df.drop(columns=[TIMESTAMP_COLUMN]))
+            known = df['label'].isin(snapshot.label_encoder.classes_)
+            if not known.all():
+                logger.warning(f"Skipping {int((~known).sum())} rows with crops the model has never seen; "
+                               f"run a full training to add them")
+                df = df[known]
+        if df.empty:
+            logger.info(f"No new usable labelled rows since {metadata['watermark'].get('collected_at')}")
+            return None
+        
+        X_new = df[list(snapshot.feature_columns)].values.astype(np.float64)
+        y_new = snapshot.label_encoder.transform(df['label'])
+        order = np.random.default_rng(random_state).permutation(len(df))
+        held = np.sort(order[:int(round(len(df) * test_size))])
+        fit = np.sort(order[len(held):])
+        logger.info(f"Incremental training on {len(fit)} new rows ({len(held)} held out)")
+        
+        with timer.stage('fit'):
+            estimator = grow_forest(
+                self.model,
+                np.concatenate([state['replay_X'], X_new[fit]]),
+                np.concatenate([state['replay_y'], y_new[fit]]),
+                n_trees,
+                # A fresh seed per run so replacement trees never repeat earlier bootstraps
+                random_state=(random_state + watermark['offset']) % 2**31,
+                n_jobs=settings.TRAINING_N_JOBS
+            )
+        updated = ModelSnapshot.from_estimator(estimator, snapshot.label_encoder, snapshot.feature_columns)
+        
+        with timer.stage('score'):
+            holdout_X, holdout_y = roll_holdout(
+                state['holdout_X'], state['holdout_y'], X_new[held], y_new[held], settings.INCREMENTAL_HOLDOUT_ROWS
+            )
+            holdout_accuracy = accuracy(updated.engine, holdout_X, holdout_y)
+            previous_accuracy = accuracy(snapshot.engine, holdout_X, holdout_y)
+        logger.info(f"Rolling holdout accuracy: {previous_accuracy:.4f} -> {holdout_accuracy:.4f}")
+        
+        replay_X, replay_y = sample_replay(
+            np.concatenate([state['replay_X'], X_new[fit]]), np.concatenate([state['replay_y'], y_new[fit]]),
+            settings.INCREMENTAL_REPLAY_ROWS, random_state=random_state
+        )
+        results = {
+            'evaluation': 'incremental',
+            'previous_version': snapshot.version,
+            'new_rows': new_rows,
+            'train_rows': len(fit),
+            'holdout_rows': len(holdout_y),
+            'trees_replaced': n_trees,
+            'n_estimators': len(estimator.estimators_),
+            'holdout_accuracy': holdout_accuracy,
+            'previous_holdout_accuracy': previous_accuracy,
+            'watermark': watermark
+        }
+        
+        self._snapshot = updated
+        results['timings'] = timer.summary()
+        with timer.stage('save'):
+            self.save_model(
+                metrics=results, watermark=watermark,
+                state={'replay_X': replay_X, 'replay_y': replay_y, 'holdout_X': holdout_X, 'holdout_y': holdout_y}
+            )
+        results['timings'] = timer.summary()
+        return results
+    
+    def tune(self, budget_seconds=300, accuracy_floor=0.97, n_candidates=27, workers=None,
+             random_state=42, write_config=True):
+        """Search hyperparameters for the fastest, smallest model meeting accuracy_floor
+        
+        Candidates from the MODEL_BACKEND backend's search space are compared
+        with successive halving in a process pool under a wall-clock budget.
+        The chosen parameters are written to forest_config_path for train() to use.
+        """
+        backend = get_backend()
+        logger.info(f"Starting {backend.name} hyperparameter search "
+                    f"({n_candidates} candidates, {budget_seconds}s budget)")
+        X, y = load_training_data()
+        y_encoded = LabelEncoder().fit_transform(y)
+        
+        candidates = sample_candidates(backend.search_space, n_candidates, random_state=random_state)
+        results, history = successive_halving(
+            X.values, y_encoded, candidates,
+            budget_seconds=budget_seconds, workers=workers, random_state=random_state, build=backend.build
+        )
+        front = pareto_front(results)
+        chosen = choose(results, accuracy_floor)
+        
+        logger.info(f"Chosen parameters: {chosen['params']} "
+                    f"(accuracy {chosen['accuracy']:.4f}, {chosen['latency_ms']:.3f} ms, {chosen['nbytes']} bytes)")
+        if write_config:
+            save_forest_config(
+                self.forest_config_path,
+                chosen['params'],
+                backend=backend.name,
+                accuracy_floor=accuracy_floor,
+                metrics={key: value for key, value in chosen.items() if key != 'params'}
+            )
         
         return {
-            'train_accuracy': train_score,
-            'test_accuracy': test_score,
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std(),
-            'feature_importance': feature_importance.to_dict('records')
+            'chosen': chosen,
+            'pareto_front': front,
+            'candidates': results,
+            'rounds': history,
+            'config_path': str(self.forest_config_path) if write_config else None
         }
     
-    def predict(self, input_data):
+    def predict(self, input_data, early_exit=None):
         """Make predictions for new data"""
-        if self.model is None:
+        results = self.predict_batch(input_data, early_exit=early_exit)
+        
+        if len(results) == 1:
+            return results[0]
+        return results
+    
+    def predict_batch(self, input_data, early_exit=None):
+        """Make predictions for new data, always returning one result per row
+        
+        With early_exit (default EARLY_EXIT_ENABLED) each row stops evaluating
+        trees once its label is settled; see CompiledForest.predict_anytime.
+        """
+        if early_exit is None:
+            early_exit = settings.EARLY_EXIT_ENABLED
+        if not self.is_loaded:
             self.load_model()
         
-        if self.model is None:
+        # Read the reference once; a concurrent reload cannot change it under us
+        snapshot = self._snapshot
+        if snapshot is None:
             raise ValueError("Model not trained or loaded")
         
-        # Prepare input data
-        if isinstance(input_data, dict):
-            # Convert dict to DataFrame
-            input_df = pd.DataFrame([input_data])
-        else:
-            input_df = input_data
-        
-        # Ensure all required features are present
-        missing_features = set(self.feature_columns) - set(input_df.columns)
-        if missing_features:
-            logger.warning(f"Missing features: {missing_features}")
-            # Fill missing features with default values
-            for feature in missing_features:
-                if feature == 'ndvi':
-                    input_df[feature] = 0.5  # Default NDVI value
-                else:
-                    input_df[feature] = 0
+        X = self._prepare_matrix(input_data, snapshot.feature_columns)
+        if self.cache is None:
+            return self._evaluate(snapshot, X, early_exit)
         
-        # Select only the features that were used during training
-        available_features = [col for col in self.feature_columns if col in input_df.columns]
-        input_features = input_df[available_features]
+        # Serve repeated (quantized) inputs from the cache and evaluate only the misses
+        X = self.cache.quantize(X, snapshot.feature_columns)
+        # Early-exit results may differ from full ones, so they are cached under their own keys
+        prefix = snapshot.cache_prefix
+        suffix = ('early_exit',) if early_exit else ()
+        keys = [prefix + tuple(row) + suffix for row in X.tolist()]
+        results = self.cache.get_many(snapshot, keys)
         
-        # Make prediction
-        prediction_encoded = self.model.predict(input_features)
-        prediction_proba = self.model.predict_proba(input_features)
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            computed = self._evaluate(snapshot, X[misses], early_exit)
+            for i, result in zip(misses, computed):
+                results[i] = result
+            # Answers from a model replaced while they were computed are returned but not cached
+            if self._snapshot is snapshot:
+                self.cache.put_many(snapshot, [keys[i] for i in misses], computed)
         
-        # Convert back to original labels
-        prediction = self.label_encoder.inverse_transform(prediction_encoded)
+        return results
+    
+    def _evaluate(self, snapshot, X, early_exit=False):
+        """Answer rows from the lookup table where it can, and the compiled forest otherwise"""
+        if snapshot.lookup is None or early_exit:
+            return self._evaluate_forest(snapshot, X, early_exit)
         
-        # Get confidence (max probability)
-        confidence = np.max(prediction_proba, axis=1)
+        cells, hits = snapshot.lookup.lookup(X)
+        results = [None] * len(X)
+        classes = snapshot.label_encoder.classes_
+        class_names = classes.tolist()
+        hit_rows = np.flatnonzero(hits)
+        top_classes = snapshot.lookup.top_classes[cells[hit_rows]]
+        top_proba = snapshot.lookup.top_proba[cells[hit_rows]].astype(np.float64)
+        # Every crop is listed, as on the forest path; crops outside the stored top k read as zero
+        proba = np.zeros((len(hit_rows), len(class_names)))
+        np.put_along_axis(proba, top_classes.astype(np.intp), top_proba, axis=1)
+        for i, crop, confidence, row in zip(hit_rows.tolist(), classes[top_classes[:, 0]].tolist(),
+                                            top_proba[:, 0].tolist(), proba.tolist()):
+            results[i] = {
+                'crop': crop,
+                'confidence': confidence,
+                'all_probabilities': dict(zip(class_names, row)),
+                'trees_used': 0,
+                'source': 'lookup'
+            }
         
-        if len(prediction) == 1:
-            return {
-                'crop': prediction[0],
-                'confidence': float(confidence[0]),
-                'all_probabilities': {
-                    crop: float(prob) for crop, prob in zip(
-                        self.label_encoder.classes_,
-                        prediction_proba[0]
-                    )
-                }
+        miss_rows = np.flatnonzero(~hits)
+        if len(miss_rows):
+            for i, result in zip(miss_rows.tolist(), self._evaluate_forest(snapshot, X[miss_rows])):
+                results[i] = {**result, 'source': 'forest'}
+        return results
+    
+    def _evaluate_forest(self, snapshot, X, early_exit=False):
+        """Run the compiled forest and format one result dict per row"""
+        engine = snapshot.engine
+        if early_exit:
+            prediction_encoded, prediction_proba, trees_used, reasons = engine.predict_anytime(
+                X,
+                check_every=settings.EARLY_EXIT_CHECK_EVERY,
+                confidence=settings.EARLY_EXIT_CONFIDENCE or None,
+                min_trees=settings.EARLY_EXIT_MIN_TREES
+            )
+            extras = [
+                {'trees_used': used, 'exit_reason': EXIT_REASONS[reason]}
+                for used, reason in zip(trees_used.tolist(), reasons.tolist())
+            ]
+        else:
+            # Evaluate label and probabilities together in one pass over the forest
+            prediction_encoded, prediction_proba = engine.predict(X)
+            extras = [{'trees_used': engine.n_estimators}] * len(X)
+        
+        # Convert back to original labels
+        classes = snapshot.label_encoder.classes_
+        crops = classes[prediction_encoded].tolist()
+        class_names = classes.tolist()
+        
+        return [
+            {
+                'crop': crop,
+                'confidence': max(proba),
+                'all_probabilities': dict(zip(class_names, proba)),
+                **extra
             }
+            for crop, proba, extra in zip(crops, prediction_proba.tolist(), extras)
+        ]
+    
+    def _prepare_matrix(self, input_data, feature_columns):
+        """Build a float feature matrix in training column order"""
+        if isinstance(input_data, dict):
+            input_data = [input_data]
+        
+        # Absent or null values become NaN and are filled with defaults below
+        if isinstance(input_data, pd.DataFrame):
+            matrix = np.column_stack([
+                input_data[feature].to_numpy(dtype=np.float64)
+                if feature in input_data.columns
+                else np.full(len(input_data), np.nan)
+                for feature in feature_columns
+            ])
         else:
-            return [
-                {
-                    'crop': pred,
-                    'confidence': float(conf),
-                    'all_probabilities': {
-                        crop: float(prob) for crop, prob in zip(
-                            self.label_encoder.classes_,
-                            proba
-                        )
-                    }
-                }
-                for pred, conf, proba in zip(prediction, confidence, prediction_proba)
-            ]
+            matrix = np.array(
+                [[row.get(feature) for feature in feature_columns] for row in input_data],
+                dtype=np.float64
+            ).reshape(len(input_data), len(feature_columns))
+        
+        missing = np.isnan(matrix)
+        if missing.any():
+            missing_columns = np.flatnonzero(missing.any(axis=0))
+            logger.warning(f"Missing features: {set(feature_columns[j] for j in missing_columns)}")
+            for j in missing_columns:
+                matrix[missing[:, j], j] = self._default_value(feature_columns[j])
+        return matrix
     
-    def save_model(self):
-        """Save the trained model and label encoder"""
-        # Create model directory if it doesn't exist
-        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+    @staticmethod
+    def _default_value(feature):
+        """Default used to fill a feature absent from the input"""
+        if feature == 'ndvi':
+            return 0.5  # Default NDVI value
+        return 0
+    
+    def save_model(self, metrics=None, watermark=None, state=None):
+        """Register the current model as a new version and make it active
         
+        watermark records how far into the labelled data log the model was
+        trained and state holds the incremental replay sample and holdout.
+        """
+        snapshot = self._snapshot
         model_data = {
-            'model': self.model,
-            'label_encoder': self.label_encoder,
-            'feature_columns': self.feature_columns
+            'model': snapshot.estimator,
+            'label_encoder': snapshot.label_encoder,
+            'feature_columns': list(snapshot.feature_columns)
         }
         
-        joblib.dump(model_data, self.model_path)
-        logger.info(f"Model saved to {self.model_path}")
+        def write_binary(path):
+            save_binary(
+                path, snapshot.engine, snapshot.label_encoder.classes_, snapshot.feature_columns,
+                snapshot.model_type, compression=settings.MODEL_BINARY_COMPRESSION
+            )
+        
+        extra_artifacts = {BINARY_ARTIFACT_NAME: write_binary}
+        if state is not None:
+            extra_artifacts[STATE_ARTIFACT_NAME] = lambda path: save_state(path, **state)
+        
+        registry = self.registry
+        version = registry.register(
+            model_data, metrics=metrics, extra_artifacts=extra_artifacts,
+            extra_metadata={'watermark': watermark} if watermark is not None else None
+        )
+        metadata = registry.metadata(version)
+        self._snapshot = replace(
+            snapshot, version=version, trained_at=metadata['trained_at'], metrics=metadata['metrics']
+        )
+        
+        # Keep MODEL_PATH pointing at the active artifact for tools that read it directly
+        self._publish_model_path(registry.artifact_path(version))
+        logger.info(f"Model saved to {registry.version_dir(version)}")
+    
+    def _publish_model_path(self, artifact_path):
+        """Atomically repoint MODEL_PATH at an artifact"""
+        self.model_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.model_path.with_name(f".{self.model_path.name}.{os.getpid()}.tmp")
+        try:
+            os.symlink(os.path.relpath(artifact_path, self.model_path.parent), tmp_path)
+        except OSError:
+            shutil.copy2(artifact_path, tmp_path)
+        os.replace(tmp_path, self.model_path)
     
     def load_model(self):
-        """Load a trained model"""
-        if not self.model_path.exists():
-            logger.error(f"Model file not found at {self.model_path}")
-            return False
-        
+        """Load the active registry version (or a plain model file) and swap it in"""
         try:
-            model_data = joblib.load(self.model_path)
-            self.model = model_data['model']
-            self.label_encoder = model_data['label_encoder']
-            self.feature_columns = model_data.get('feature_columns', self.feature_columns)
-            logger.info(f"Model loaded from {self.model_path}")
-            return True
+            snapshot = self._load_snapshot()
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             return False
+        
+        if snapshot is None:
+            logger.error(f"Model file not found at {self.model_path}")
+            return False
+        
+        self._snapshot = snapshot
+        logger.info(f"Model {snapshot.version or self.model_path} loaded")
+        return True
+    
+    def reload(self):
+        """Swap in the registry's active version if it differs from the one being served
+        
+        Safe to call from a background thread: requests keep using the current
+        snapshot until the new one is fully loaded.
+        """
+        version = self.registry.active_version()
+        if version is None or version == self.version:
+            return False
+        logger.info(f"Reloading model: {self.version} -> {version}")
+        return self.load_model()
+    
+    def _load_snapshot(self):
+        """Build a snapshot from the active registry version, falling back to MODEL_PATH"""
+        registry = self.registry
+        version = registry.active_version()
+        
+        if version is not None:
+            metadata = registry.metadata(version)
+            if settings.MODEL_ARTIFACT_FORMAT == "binary" and BINARY_ARTIFACT_NAME in metadata.get('artifacts', {}):
+                snapshot = self._load_binary(registry.verify(version, BINARY_ARTIFACT_NAME), metadata)
+            elif settings.MODEL_SERVING_MODE == "shared":
+                snapshot = self._load_shared(
+                    registry.version_dir(version) / "shared", registry.artifact_path(version), metadata
+                )
+            else:
+                model_data, metadata = registry.load(version)
+                snapshot = ModelSnapshot.from_estimator(
+                    model_data['model'], model_data['label_encoder'], model_data['feature_columns'],
+                    version=version, trained_at=metadata['trained_at'], metrics=metadata['metrics']
+                )
+            
+            compact_dir = registry.version_dir(version) / "compact"
+            if settings.MODEL_SERVE_COMPACT and (compact_dir / "forest.json").exists():
+                logger.info(f"Serving compacted forest from {compact_dir}")
+                engine = CompiledForest.load(compact_dir, mmap=settings.MODEL_SERVING_MODE == "shared")
+                snapshot = replace(snapshot, engine=engine.freeze(), compact=True)
+            
+            lookup_dir = registry.version_dir(version) / "lookup"
+            if settings.LOOKUP_ENABLED and (lookup_dir / "lookup.json").exists():
+                lookup = LookupTable.load(lookup_dir)
+                if lookup.meta.get('engine_nodes') == snapshot.engine.n_nodes:
+                    logger.info(f"Serving lookup table from {lookup_dir}")
+                    snapshot = replace(snapshot, lookup=lookup)
+                else:
+                    logger.warning(f"Lookup table in {lookup_dir} was built for another forest; ignoring it")
+            return snapshot
+        
+        if not self.model_path.exists():
+            return None
+        
+        if settings.MODEL_SERVING_MODE == "shared":
+            stat = self.model_path.stat()
+            shared_dir = self.model_path.parent / "shared" / f"{stat.st_mtime_ns}-{stat.st_size}"
+            return self._load_shared(shared_dir, self.model_path, {})
+        
+        model_data = joblib.load(self.model_path)
+        return ModelSnapshot.from_estimator(
+            model_data['model'], model_data['label_encoder'],
+            model_data.get('feature_columns', DEFAULT_FEATURE_COLUMNS)
+        )
+    
+    def _load_binary(self, path, metadata):
+        """Build a snapshot from a binary artifact, memory-mapping it in shared mode"""
+        engine, header = load_binary(path, mmap=settings.MODEL_SERVING_MODE == "shared")
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(header['classes'])
+        logger.info(f"Model loaded from {path}")
+        return ModelSnapshot(
+            engine=engine.freeze(),
+            label_encoder=label_encoder,
+            feature_columns=tuple(header['feature_columns']),
+            model_type=header['model_type'],
+            version=metadata.get('version'),
+            trained_at=metadata.get('trained_at'),
+            metrics=metadata.get('metrics', {})
+        )
+    
+    def _load_shared(self, shared_dir, artifact_path, metadata):
+        """Map the compiled forest read-only, exporting it first if no worker has yet
+        
+        Every worker process maps the same files, so the node tables live once in
+        the page cache no matter how many workers serve the model.
+        """
+        if not (shared_dir / "model.json").exists():
+            self.export_shared(shared_dir, artifact_path)
+        
+        with open(shared_dir / "model.json") as f:
+            meta = json.load(f)
+        
+        label_encoder = LabelEncoder()
+        label_encoder.classes_ = np.array(meta['classes'])
+        logger.info(f"Model mapped from {shared_dir}")
+        return ModelSnapshot(
+            engine=CompiledForest.load(shared_dir, mmap=True),
+            label_encoder=label_encoder,
+            feature_columns=tuple(meta['feature_columns']),
+            model_type=meta['model_type'],
+            version=metadata.get('version'),
+            trained_at=metadata.get('trained_at'),
+            metrics=metadata.get('metrics', {})
+        )
+    
+    def export_shared(self, shared_dir, artifact_path):
+        """Compile a pickled model and publish its node tables to shared_dir"""
+        model_data = joblib.load(artifact_path)
+        engine = CompiledForest.from_estimator(model_data['model'])
+        
+        # Build in a private directory and rename into place, so concurrently
+        # starting workers never observe a half-written export
+        shared_dir.parent.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(dir=shared_dir.parent, prefix=".staging-"))
+        engine.save(staging_dir)
+        with open(staging_dir / "model.json", "w") as f:
+            json.dump({
+                'model_type': type(model_data['model']).__name__,
+                'classes': model_data['label_encoder'].classes_.tolist(),
+                'feature_columns': model_data.get('feature_columns', DEFAULT_FEATURE_COLUMNS)
+            }, f)
+        
+        try:
+            os.rename(staging_dir, shared_dir)
+            logger.info(f"Exported shared model to {shared_dir}")
+        except OSError:
+            # Another worker published the same export first
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    def compact(self, max_accuracy_loss=0.005, target_latency_ms=None, test_size=0.2, random_state=42):
+        """Prune and collapse the active model's forest into a separate compact artifact
+        
+        Trees are chosen on the held-out split train() used (pass the same
+        test_size and random_state). The compact node tables and a
+        compaction.json with before/after size, latency and accuracy are
+        written to the version's compact/ directory.
+        """
+        if not self.is_loaded:
+            self.load_model()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version is None:
+            raise ValueError("No registered model version to compact")
+        if snapshot.engine.link != 'mean':
+            raise ValueError(f"Compaction prunes averaged forests; {snapshot.model_type} cannot be compacted")
+        
+        X_val, y_val = self._holdout(snapshot, test_size, random_state)
+        
+        def describe(engine):
+            return {
+                'n_trees': engine.n_estimators,
+                'n_nodes': engine.n_nodes,
+                'nbytes': engine.nbytes,
+                'accuracy': accuracy(engine, X_val, y_val),
+                **measure_latency(engine, X_val)
+            }
+        
+        before = describe(snapshot.engine)
+        compacted, details = compact(
+            snapshot.engine, X_val, y_val,
+            max_accuracy_loss=max_accuracy_loss,
+            target_latency_ms=target_latency_ms,
+            measure=lambda engine: measure_latency(engine, X_val)['latency_ms']
+        )
+        after = describe(compacted)
+        metadata = {
+            'version': snapshot.version,
+            'max_accuracy_loss': max_accuracy_loss,
+            'target_latency_ms': target_latency_ms,
+            'validation_rows': len(X_val),
+            'before': before,
+            'after': after,
+            **details
+        }
+        
+        # Stage next to the version and swap in, replacing any earlier compaction
+        version_dir = self.registry.version_dir(snapshot.version)
+        compact_dir = version_dir / "compact"
+        staging_dir = Path(tempfile.mkdtemp(dir=version_dir, prefix=".compact-"))
+        compacted.save(staging_dir)
+        with open(staging_dir / "compaction.json", "w") as f:
+            json.dump(metadata, f, indent=2, default=float)
+        if compact_dir.exists():
+            shutil.rmtree(compact_dir)
+        os.rename(staging_dir, compact_dir)
+        
+        logger.info(
+            f"Compact model saved to {compact_dir}: {before['n_trees']} -> {after['n_trees']} trees, "
+            f"{before['nbytes']} -> {after['nbytes']} bytes, {before['latency_ms']:.3f} -> "
+            f"{after['latency_ms']:.3f} ms, accuracy {before['accuracy']:.4f} -> {after['accuracy']:.4f}"
+        )
+        return {**metadata, 'path': str(compact_dir)}
+    
+    def compare_backends(self, backends=None, test_size=0.2, random_state=42):
+        """Train each backend on train()'s split and compare time, latency, size and accuracy"""
+        X, y = load_training_data()
+        y_encoded = LabelEncoder().fit_transform(y)
+        X_train, X_test, y_train, y_test = train_test_split(
+            X.values, y_encoded, test_size=test_size, random_state=random_state, stratify=y_encoded
+        )
+        return compare_backends(
+            X_train, y_train, X_test, y_test, names=backends,
+            random_state=random_state, n_jobs=settings.TRAINING_N_JOBS
+        )
+    
+    def _holdout(self, snapshot, test_size, random_state, features=False):
+        """The held-out split train() used, as a matrix in the snapshot's column order
+        
+        With features, the full feature matrix is returned as well.
+        """
+        X, y = load_training_data()
+        X = X[list(snapshot.feature_columns)].values
+        y_encoded = snapshot.label_encoder.transform(y)
+        _, X_val, _, y_val = train_test_split(
+            X, y_encoded, test_size=test_size, random_state=random_state, stratify=y_encoded
+        )
+        return (X_val, y_val, X) if features else (X_val, y_val)
+    
+    def build_lookup(self, bins=None, top_k=None, min_margin=None, chunk_size=None, workers=None,
+                     test_size=0.2, random_state=42):
+        """Precompute the served forest's predictions over a quantized input grid
+        
+        bins maps features to bin counts (default LOOKUP_BINS; unlisted
+        features get one bin). Feature ranges come from the API's input
+        limits, or the training data where a limit is open. Held-out rows of
+        train()'s split measure agreement with the exact forest, and cells
+        where they disagree fall back to it. The table goes to the version's
+        lookup/ directory and is served when LOOKUP_ENABLED is set.
+        """
+        if not self.is_loaded:
+            self.load_model()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version is None:
+            raise ValueError("No registered model version to build a lookup table for")
+        bins = bins or parse_rounding(settings.LOOKUP_BINS)
+        
+        X_val, y_val, X = self._holdout(snapshot, test_size, random_state, features=True)
+        lows, highs = [], []
+        for j, feature in enumerate(snapshot.feature_columns):
+            low, high, _ = FEATURE_RANGES.get(feature, (None, None, None))
+            lows.append(X[:, j].min() if low is None else low)
+            highs.append(X[:, j].max() if high is None else high)
+        grid = LookupGrid(
+            snapshot.feature_columns, lows, highs,
+            [bins.get(feature, 1) for feature in snapshot.feature_columns]
+        )
+        
+        version_dir = self.registry.version_dir(snapshot.version)
+        lookup_dir = version_dir / "lookup"
+        staging_dir = Path(tempfile.mkdtemp(dir=version_dir, prefix=".lookup-"))
+        try:
+            # Worker processes map the served node tables from disk
+            engine_dir = staging_dir / "engine"
+            snapshot.engine.save(engine_dir)
+            details = build_table(
+                snapshot.engine, engine_dir, staging_dir, grid,
+                top_k=top_k or settings.LOOKUP_TOP_K,
+                min_margin=settings.LOOKUP_MIN_MARGIN if min_margin is None else min_margin,
+                chunk_size=chunk_size or settings.LOOKUP_CHUNK_SIZE,
+                workers=workers or settings.LOOKUP_WORKERS or None
+            )
+            shutil.rmtree(engine_dir)
+            
+            table = LookupTable(
+                grid,
+                top_classes=np.load(staging_dir / "top_classes.npy", mmap_mode='r'),
+                top_proba=np.load(staging_dir / "top_proba.npy", mmap_mode='r'),
+                fallback=np.load(staging_dir / "fallback.npy")
+            )
+            agreement = table.evaluate(snapshot.engine, X_val, mark_disagreements=True)
+            np.save(staging_dir / "fallback.npy", table.fallback)
+            
+            labels, _ = snapshot.engine.predict(X_val)
+            cells, hits = table.lookup(X_val)
+            served = np.where(hits, table.top_classes[cells, 0], labels)
+            metadata = {
+                'version': snapshot.version,
+                'engine_nodes': snapshot.engine.n_nodes,
+                'grid': grid.to_dict(),
+                **details,
+                'fallback_fraction': float(table.fallback.mean()),
+                'holdout': {
+                    **agreement,
+                    'forest_accuracy': float(np.mean(labels == y_val)),
+                    'served_accuracy': float(np.mean(served == y_val))
+                },
+                'nbytes': sum((staging_dir / f"{name}.npy").stat().st_size for name in TABLE_ARRAYS)
+            }
+            with open(staging_dir / "lookup.json", "w") as f:
+                json.dump(metadata, f, indent=2, default=float)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        
+        if lookup_dir.exists():
+            shutil.rmtree(lookup_dir)
+        os.rename(staging_dir, lookup_dir)
+        logger.info(
+            f"Lookup table saved to {lookup_dir}: {details['n_cells']} cells, "
+            f"{metadata['fallback_fraction']:.1%} fall back, held-out lookup rate "
+            f"{agreement['lookup_rate']:.1%}, agreement {agreement['agreement_served']}"
+        )
+        return {**metadata, 'path': str(lookup_dir)}
+    
+    def warm_up(self, rounds=3, batch_sizes=(1, 16, 64)):
+        """Run synthetic predictions so real requests don't pay first-call costs
+        
+        Returns the mean latency in milliseconds for each batch size.
+        """
+        rng = np.random.default_rng(0)
+        timings = {}
+        
+        for batch_size in batch_sizes:
+            # Draw rows uniformly from the accepted input ranges
+            rows = [
+                {
+                    feature: float(rng.uniform(low, high if high is not None else low + 300))
+                    for feature, (low, high, _) in FEATURE_RANGES.items()
+                    if feature in self.feature_columns
+                }
+                for _ in range(batch_size)
+            ]
+            
+            started = time.perf_counter()
+            for _ in range(rounds):
+                self.predict_batch(rows)
+            timings[batch_size] = (time.perf_counter() - started) / rounds * 1000
+        
+        return timings
     
     def get_model_info(self):
         """Get information about the trained model"""
-        if self.model is None:
+        snapshot = self._snapshot
+        if snapshot is None:
             return None
         
         return {
-            'model_type': type(self.model).__name__,
-            'n_features': len(self.feature_columns),
-            'feature_columns': self.feature_columns,
-            'n_classes': len(self.label_encoder.classes_),
-            'classes': self.label_encoder.classes_.tolist()
-        }
\ No newline at end of file
+            'model_type': snapshot.model_type,
+            'n_features': len(snapshot.feature_columns),
+            'feature_columns': list(snapshot.feature_columns),
+            'n_classes': len(snapshot.label_encoder.classes_),
+            'classes': snapshot.label_encoder.classes_.tolist(),
+            'version': snapshot.version,
+            'last_trained': snapshot.trained_at
+        }
@@ -0,0 +1,160 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+import numpy as np
+from .inference import ARRAY_NAMES, OPTIONAL_ARRAYS, CompiledForest
+
+# Binary model artifact layout:
+#   MAGIC | uint32 format version | uint32 header length | JSON header | arrays
+# Every array starts on an ALIGN-byte boundary so it can be memory-mapped in place.
+MAGIC = b"CROPFRST"
+FORMAT_VERSION = 1
+ALIGN = 64
+COMPRESSIONS = ('none', 'zlib')
+
+_PREAMBLE = struct.Struct("<8sII")
+
+def narrow_uint(max_value):
+    """Smallest unsigned integer dtype that holds max_value"""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+def float32_floor(threshold):
+    """Round thresholds down to float32 without changing any split decision
+
+    The engine compares float32 inputs, and for a float32 x, x <= t holds
+    exactly when x <= the largest float32 not above t.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    narrowed = threshold.astype(np.float32)
+    rounded_up = narrowed.astype(np.float64) > threshold
+    narrowed[rounded_up] = np.nextafter(narrowed[rounded_up], np.float32(-np.inf))
+    return narrowed
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def save_binary(path, engine, classes, feature_columns, model_type, metadata=None,
+                compression='none', value_dtype=np.float64):
+    """Write a compiled forest and its labels as a versioned binary artifact
+
+    Thresholds are stored as float32 (float64 for engines that compare float64
+    inputs) and feature, child and root indices in the narrowest unsigned type
+    that fits. Leaf values keep value_dtype (float64 reproduces the pickled
+    model's probabilities exactly).
+    With compression="zlib" each array is deflated; such files are smaller
+    but are decompressed into memory instead of being mapped.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {', '.join(COMPRESSIONS)}")
+    n_nodes = engine.n_nodes
+    float32_inputs = engine.input_dtype == np.float32
+    arrays = {
+        'feature': engine.feature.astype(narrow_uint(max(len(feature_columns) - 1, 0))),
+        'threshold': float32_floor(engine.threshold) if float32_inputs else engine.threshold.astype(np.float64),
+        'left': engine.left.astype(narrow_uint(n_nodes)),
+        'right': engine.right.astype(narrow_uint(n_nodes)),
+        'value': engine.value.astype(value_dtype),
+        'roots': engine.roots.astype(narrow_uint(n_nodes)),
+        'classes': engine.classes.astype(narrow_uint(max(len(classes) - 1, 0)))
+    }
+    if engine.baseline is not None:
+        arrays['baseline'] = engine.baseline.astype(np.float64)
+    if engine.tree_class is not None:
+        arrays['tree_class'] = engine.tree_class.astype(narrow_uint(max(len(classes) - 1, 0)))
+    names = [name for name in ARRAY_NAMES + OPTIONAL_ARRAYS if name in arrays]
+
+    blobs = {}
+    for name in names:
+        data = np.ascontiguousarray(arrays[name]).tobytes()
+        blobs[name] = zlib.compress(data, 6) if compression == 'zlib' else data
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'model_type': model_type,
+        'classes': [str(label) for label in classes],
+        'feature_columns': list(feature_columns),
+        'max_depth': engine.max_depth,
+        'link': engine.link,
+        'input_dtype': engine.input_dtype.name,
+        'compression': compression,
+        'arrays': {},
+        'metadata': metadata or {}
+    }
+    # Offsets depend on the header length, so lay out against a header of the final size
+    for _ in range(2):
+        header_bytes = json.dumps(header, default=float).encode()
+        offset = _align(_PREAMBLE.size + len(header_bytes))
+        for name in names:
+            header['arrays'][name] = {
+                'dtype': arrays[name].dtype.str,
+                'shape': list(arrays[name].shape),
+                'offset': offset,
+                'nbytes': len(blobs[name])
+            }
+            offset = _align(offset + len(blobs[name]))
+    header_bytes = json.dumps(header, default=float).encode()
+
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name in names:
+            f.write(b"\0" * (header['arrays'][name]['offset'] - f.tell()))
+            f.write(blobs[name])
+    os.replace(tmp_path, path)
+    return header
+
+def read_header(path):
+    """Parse and validate the header of a binary artifact"""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a binary model artifact")
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary model artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {version} in {path}")
+        return json.loads(f.read(header_length))
+
+def load_binary(path, mmap=True):
+    """Load a binary artifact into a CompiledForest without unpickling
+
+    Uncompressed arrays are memory-mapped read-only when mmap is set, so
+    processes serving the same file share its pages; otherwise they are read
+    into memory and viewed with numpy.frombuffer. Returns (engine, header).
+    """
+    header = read_header(path)
+    specs = header['arrays']
+    compressed = header['compression'] == 'zlib'
+
+    if mmap and not compressed:
+        arrays = {
+            name: np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r',
+                            offset=spec['offset'], shape=tuple(spec['shape']))
+            for name, spec in specs.items()
+        }
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        arrays = {}
+        for name, spec in specs.items():
+            blob = data[spec['offset']:spec['offset'] + spec['nbytes']]
+            if compressed:
+                blob = zlib.decompress(blob)
+            arrays[name] = np.frombuffer(blob, dtype=np.dtype(spec['dtype'])).reshape(spec['shape'])
+
+    engine = CompiledForest(
+        max_depth=header['max_depth'],
+        link=header.get('link', 'mean'),
+        input_dtype=header.get('input_dtype', 'float32'),
+        **arrays
+    )
+    return engine, header
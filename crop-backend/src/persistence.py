@@ -0,0 +1,186 @@
+import asyncio
+import queue
+import threading
+import time
+from datetime import datetime
+from loguru import logger
+from .config import settings
+from .prediction_store import prediction_store
+from .rollups import prediction_rollups
+
+class PredictionWriter:
+    """Background writer that persists prediction records in bulk
+
+    Requests enqueue records without waiting on MongoDB; a writer thread
+    flushes them to the store with one insert_many whenever batch_size records have
+    accumulated or flush_interval seconds have passed. Saved batches are then
+    folded into the analytics rollups, if any.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 overflow="drop", block_timeout=0.5, rollups=None):
+        self.store = store
+        self.rollups = rollups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+                self._thread.start()
+                logger.info("Prediction writer started")
+
+    def submit(self, record: dict):
+        """Queue a record for persistence; returns False if it was dropped
+
+        With overflow="block" the caller waits up to block_timeout seconds for
+        space, so only call it that way from threads, never the event loop.
+        """
+        self.start()
+        record.setdefault("timestamp", datetime.now())
+        try:
+            if self.overflow == "block":
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def submit_async(self, record: dict):
+        """Queue a record from the event loop, applying backpressure without blocking it"""
+        if self.overflow != "block":
+            return self.submit(record)
+
+        self.start()
+        record.setdefault("timestamp", datetime.now())
+        deadline = time.monotonic() + self.block_timeout
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                self.enqueued += 1
+                return True
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    self.dropped += 1
+                    return False
+                await asyncio.sleep(0.005)
+
+    async def submit_many_async(self, records: list):
+        """Queue several records, returning how many were accepted"""
+        accepted = 0
+        for record in records:
+            accepted += await self.submit_async(record)
+        return accepted
+
+    def _run(self):
+        """Writer loop: gather a batch, flush it, repeat until stopped"""
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Drain whatever was queued before the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not self._STOP:
+                        batch.append(item)
+
+            while batch:
+                self._flush(batch[:self.batch_size])
+                batch = batch[self.batch_size:]
+
+    def _flush(self, batch):
+        """Write one batch with insert_many"""
+        started = time.perf_counter()
+        inserted = self.store.save_predictions(batch)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.written += len(inserted)
+        self.failed += len(batch) - len(inserted)
+        if inserted and self.rollups is not None:
+            self.rollups.record(batch)
+
+    def stop(self, timeout=10.0):
+        """Flush everything queued and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        # The marker must get in even when the queue is full, so wait for space
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"Prediction writer queue still full after {timeout}s; not drained")
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Prediction writer did not drain within {timeout}s; {self._queue.qsize()} records left")
+        else:
+            logger.info(f"Prediction writer stopped after writing {self.written} records")
+        self._thread = None
+
+    def stats(self):
+        """Return queue and write counters"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queue_depth': self._queue.qsize(),
+            'max_queue': self._queue.maxsize,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'overflow': self.overflow,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'written': self.written,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_flush_ms': self.last_flush_ms
+        }
+
+# Global prediction writer
+prediction_writer = PredictionWriter(
+    prediction_store,
+    max_queue=settings.WRITER_MAX_QUEUE,
+    batch_size=settings.WRITER_BATCH_SIZE,
+    flush_interval=settings.WRITER_FLUSH_INTERVAL,
+    overflow=settings.WRITER_OVERFLOW,
+    block_timeout=settings.WRITER_BLOCK_TIMEOUT,
+    rollups=prediction_rollups
+)
@@ -0,0 +1,316 @@
+import base64
+import json
+import threading
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+from loguru import logger
+from .config import settings
+from .database import db_manager
+from .utils import INPUT_FEATURES
+
+class PredictionStore:
+    """Compact, indexed storage for prediction history
+
+    Predictions go into a MongoDB time-series collection (a plain collection
+    with a TTL index on servers older than 5.0). Each document holds only the
+    timestamp, the inputs as an array in INPUT_FEATURES order, the crop as a
+    small integer code from the crop_labels table and the confidence::
+
+        {"ts": <datetime>, "m": {"c": 3, "v": "<model version>"}, "x": [90, 42, ...], "p": 0.97}
+    """
+
+    LABELS_COLLECTION = "crop_labels"
+    # Public field name -> stored field
+    FIELDS = {
+        'timestamp': 'ts',
+        'input_data': 'x',
+        'prediction': 'm',
+        'confidence': 'p',
+        'model_version': 'm'
+    }
+    # Newest first, with _id breaking ties between predictions made in the same instant
+    HISTORY_SORT = [('ts', DESCENDING), ('_id', DESCENDING)]
+
+    def __init__(self, db_manager, collection_name="prediction_history", ttl_days=90,
+                 granularity="seconds", features=None):
+        self.db_manager = db_manager
+        self.collection_name = collection_name
+        self.ttl_days = ttl_days
+        self.granularity = granularity
+        self.features = list(features or INPUT_FEATURES)
+
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._codes = {}
+        self._labels = {}
+        self.timeseries = None
+
+    @property
+    def expire_after_seconds(self):
+        return int(self.ttl_days * 86400) if self.ttl_days > 0 else None
+
+    def initialize(self):
+        """Create the collections and indexes if they do not exist yet"""
+        with self._lock:
+            if self._initialized:
+                return
+            database = self.db_manager.database
+            if database is None:
+                raise RuntimeError("Database not connected")
+
+            self._create_collection(database)
+            collection = database[self.collection_name]
+            # Match the history sort so keyset pages are index range scans
+            self._create_index(collection, [("m.c", ASCENDING), ("ts", DESCENDING), ("_id", DESCENDING)], "crop_ts_id")
+            self._create_index(collection, [("ts", DESCENDING), ("_id", DESCENDING)], "ts_id")
+            if not self.timeseries and self.expire_after_seconds:
+                collection.create_index(
+                    [("ts", ASCENDING)], name="ts_ttl", expireAfterSeconds=self.expire_after_seconds
+                )
+
+            labels = database[self.LABELS_COLLECTION]
+            labels.create_index([("label", ASCENDING)], name="label", unique=True)
+            self._load_labels()
+
+            self._initialized = True
+            logger.info(
+                f"Prediction store ready: {self.collection_name} "
+                f"({'time-series' if self.timeseries else 'standard'}, TTL {self.ttl_days} days)"
+            )
+
+    def _create_index(self, collection, keys, name):
+        """Create a history index, dropping _id where the server cannot index it"""
+        try:
+            collection.create_index(keys, name=name)
+        except OperationFailure as e:
+            # Time-series collections before MongoDB 6.0 only index the time and meta fields
+            logger.warning(f"Index {name} not supported ({e}); indexing without _id")
+            collection.create_index([key for key in keys if key[0] != "_id"], name=name)
+
+    def _create_collection(self, database):
+        """Create the history collection, preferring the time-series layout"""
+        if self.collection_name in database.list_collection_names():
+            options = database[self.collection_name].options()
+            self.timeseries = 'timeseries' in options
+            if self.timeseries and options.get('expireAfterSeconds') != self.expire_after_seconds:
+                self._set_expiry(database)
+            return
+
+        options = {'timeseries': {'timeField': 'ts', 'metaField': 'm', 'granularity': self.granularity}}
+        if self.expire_after_seconds:
+            options['expireAfterSeconds'] = self.expire_after_seconds
+        try:
+            database.create_collection(self.collection_name, **options)
+            self.timeseries = True
+        except CollectionInvalid:
+            # Created concurrently by another worker
+            self.timeseries = 'timeseries' in database[self.collection_name].options()
+        except OperationFailure as e:
+            logger.warning(f"Time-series collections unavailable ({e}); using a standard collection")
+            database.create_collection(self.collection_name)
+            self.timeseries = False
+
+    def _set_expiry(self, database):
+        """Apply a changed TTL to an existing time-series collection"""
+        try:
+            database.command(
+                'collMod', self.collection_name,
+                expireAfterSeconds=self.expire_after_seconds or 'off'
+            )
+        except OperationFailure as e:
+            logger.warning(f"Could not update prediction TTL: {e}")
+
+    def _load_labels(self):
+        """Read the crop code table into memory"""
+        for doc in self.db_manager.database[self.LABELS_COLLECTION].find():
+            self._codes[doc['label']] = doc['_id']
+            self._labels[doc['_id']] = doc['label']
+
+    def label_code(self, label: str):
+        """Return the integer code for a crop label, assigning one if it is new"""
+        code = self._codes.get(label)
+        if code is not None:
+            return code
+
+        labels = self.db_manager.database[self.LABELS_COLLECTION]
+        while True:
+            code = max(self._labels, default=-1) + 1
+            try:
+                labels.insert_one({'_id': code, 'label': label})
+            except DuplicateKeyError:
+                # Another worker took this code or registered the label; re-read and retry
+                self._load_labels()
+                if label in self._codes:
+                    return self._codes[label]
+                continue
+            self._codes[label] = code
+            self._labels[code] = label
+            return code
+
+    def label_for(self, code: int):
+        """Return the crop label for a code"""
+        if code not in self._labels:
+            self._load_labels()
+        return self._labels.get(code)
+
+    def encode(self, record: dict):
+        """Convert a prediction record into its compact document"""
+        input_data = record["input_data"]
+        meta = {'c': self.label_code(record["prediction"])}
+        if record.get("model_version"):
+            meta['v'] = record["model_version"]
+        return {
+            'ts': record.get("timestamp") or datetime.now(),
+            'm': meta,
+            'x': [input_data.get(feature) for feature in self.features],
+            'p': record.get("confidence")
+        }
+
+    def decode(self, document: dict):
+        """Expand a compact document, or a projection of one, back into a prediction record"""
+        record = {}
+        if '_id' in document:
+            record['id'] = str(document['_id'])
+        if 'ts' in document:
+            record['timestamp'] = document['ts']
+        if 'x' in document:
+            record['input_data'] = {
+                feature: value for feature, value in zip(self.features, document['x'])
+                if value is not None
+            }
+        if 'm' in document:
+            record['prediction'] = self.label_for(document['m']['c'])
+            record['model_version'] = document['m'].get('v')
+        if 'p' in document:
+            record['confidence'] = document['p']
+        return record
+
+    def save_predictions(self, records: list):
+        """Insert prediction records in one round trip, returning the inserted ids"""
+        if not records:
+            return []
+        breaker = self.db_manager.breaker
+        if not breaker.allow():
+            return []
+        try:
+            self.initialize()
+            documents = [self.encode(record) for record in records]
+            result = self.db_manager.database[self.collection_name].insert_many(documents, ordered=False)
+            breaker.record_success()
+            logger.debug(f"Saved {len(result.inserted_ids)} predictions")
+            return result.inserted_ids
+        except Exception as e:
+            breaker.record_failure()
+            logger.error(f"Failed to save predictions: {e}")
+            return []
+
+    def recent(self, limit: int = 100, crop: str = None):
+        """Return the most recent predictions, newest first"""
+        return list(self.iter_history(limit, crop=crop))
+
+    def history_filter(self, crop=None, min_confidence=None, max_confidence=None,
+                       start=None, end=None, after=None):
+        """Build the query for a history page, or None if it cannot match anything
+
+        after is the (timestamp, _id) of the last row of the previous page;
+        rows strictly older in (ts, _id) order follow it.
+        """
+        clauses = []
+        if crop is not None:
+            if crop not in self._codes:
+                # Another worker may have registered it since the table was read
+                self._load_labels()
+            code = self._codes.get(crop)
+            if code is None:
+                return None
+            clauses.append({'m.c': code})
+
+        confidence = {}
+        if min_confidence is not None:
+            confidence['$gte'] = min_confidence
+        if max_confidence is not None:
+            confidence['$lte'] = max_confidence
+        if confidence:
+            clauses.append({'p': confidence})
+
+        window = {}
+        if start is not None:
+            window['$gte'] = start
+        if end is not None:
+            window['$lt'] = end
+        if window:
+            clauses.append({'ts': window})
+
+        if after is not None:
+            ts, _id = after
+            clauses.append({'$or': [{'ts': {'$lt': ts}}, {'ts': ts, '_id': {'$lt': _id}}]})
+
+        if not clauses:
+            return {}
+        return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+    def projection(self, fields=None):
+        """Map public field names to a projection of the stored fields"""
+        if not fields:
+            return None
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # The sort keys are always returned so the next cursor can be built
+        projection = {'ts': 1, '_id': 1}
+        for field in fields:
+            projection[self.FIELDS[field]] = 1
+        return projection
+
+    def iter_history(self, limit: int, fields=None, **filters):
+        """Yield decoded predictions newest first, reading at most limit documents"""
+        self.initialize()
+        query = self.history_filter(**filters)
+        if query is None:
+            return
+        cursor = (
+            self.db_manager.database[self.collection_name]
+            .find(query, self.projection(fields))
+            .sort(self.HISTORY_SORT)
+            .limit(limit)
+            .batch_size(min(limit, 1000))
+        )
+        for document in cursor:
+            record = self.decode(document)
+            if fields:
+                record = {key: record[key] for key in ('id', 'timestamp', *fields) if key in record}
+            yield record
+
+    def stats(self):
+        """Return the storage layout and retention settings"""
+        return {
+            'collection': self.collection_name,
+            'initialized': self._initialized,
+            'timeseries': self.timeseries,
+            'ttl_days': self.ttl_days,
+            'known_crops': len(self._codes)
+        }
+
+def encode_cursor(record: dict):
+    """Opaque page token for the position after a history record"""
+    payload = json.dumps({'t': record['timestamp'].isoformat(), 'i': record['id']})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(token: str):
+    """Turn a page token back into the (timestamp, ObjectId) it points after"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(payload['t']), ObjectId(payload['i'])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+
+# Global prediction store
+prediction_store = PredictionStore(
+    db_manager,
+    collection_name=settings.PREDICTION_COLLECTION,
+    ttl_days=settings.PREDICTION_TTL_DAYS,
+    granularity=settings.PREDICTION_TIMESERIES_GRANULARITY
+)
@@ -4,14 +4,31 @@ from pathlib import Path
 from loguru import logger
 from .config import settings
 
+# Source files read from DATA_PATH by load_and_clean_data: primary dataset, Indian crops, Sentinel NDVI
+SOURCE_FILES = ('Crop_recommendation.csv', 'indian_crops.csv', 'sentinel_ndvi.csv')
+
+# Bump whenever the cleaning or combining below changes its output; cached training data is rebuilt
+CLEANING_VERSION = 1
+
+# Training features in order; OPTIONAL_FEATURES are added when the data has them
+FEATURE_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+OPTIONAL_FEATURES = ['ndvi']
+
+# Accepted value ranges enforced by clean_data
+VALID_RANGES = {'ph': (0, 14), 'temperature': (-50, 60), 'humidity': (0, 100)}
+
+def source_paths():
+    """Files read by load_and_clean_data: SOURCE_FILES in DATA_PATH, then the labelled data log"""
+    data_dir = Path(settings.DATA_PATH)
+    return [data_dir / name for name in SOURCE_FILES] + [Path(settings.LABELLED_DATA_PATH)]
+
 def load_and_clean_data():
     """Load and preprocess Kaggle datasets"""
     logger.info("Loading and cleaning crop recommendation data")
     
-    data_dir = Path(settings.DATA_PATH)
+    crop_data_path, indian_crops_path, sentinel_path, labelled_path = source_paths()
     
     # Load primary crop recommendation dataset
-    crop_data_path = data_dir / "Crop_recommendation.csv"
     if crop_data_path.exists():
         df = pd.read_csv(crop_data_path)
         logger.info(f"Loaded crop recommendation dataset with {len(df)} rows")
@@ -24,15 +41,19 @@ def load_and_clean_data():
     df = clean_data(df)
     
     # Load Indian crops dataset if available
-    indian_crops_path = data_dir / "indian_crops.csv"
     if indian_crops_path.exists():
         indian_df = pd.read_csv(indian_crops_path)
         logger.info(f"Loaded Indian crops dataset with {len(indian_df)} rows")
         # Merge or combine datasets as needed
         df = combine_datasets(df, indian_df)
     
+    # Load newly collected labelled rows if available
+    if labelled_path.exists() and labelled_path.stat().st_size:
+        labelled_df = pd.read_csv(labelled_path)
+        logger.info(f"Loaded {len(labelled_df)} collected labelled rows")
+        df = combine_datasets(df, clean_data(labelled_df.reindex(columns=df.columns)))
+    
     # Load Sentinel NDVI data if available
-    sentinel_path = data_dir / "sentinel_ndvi.csv"
     if sentinel_path.exists():
         sentinel_df = pd.read_csv(sentinel_path)
         logger.info(f"Loaded Sentinel NDVI data with {len(sentinel_df)} rows")
@@ -50,19 +71,19 @@ def clean_data(df):
     df = df.drop_duplicates()
     logger.info(f"Removed {initial_rows - len(df)} duplicate rows")
     
-    # Handle missing values
-    df = df.dropna()
-    
-    # Validate data ranges
-    if 'ph' in df.columns:
-        df = df[(df['ph'] >= 0) & (df['ph'] <= 14)]
-    if 'temperature' in df.columns:
-        df = df[(df['temperature'] >= -50) & (df['temperature'] <= 60)]
-    if 'humidity' in df.columns:
-        df = df[(df['humidity'] >= 0) & (df['humidity'] <= 100)]
+    # Handle missing values and validate data ranges
+    df = df[valid_rows(df)]
     
     return df
 
+def valid_rows(df):
+    """Mask of rows with no missing values and every VALID_RANGES column in range"""
+    mask = df.notna().all(axis=1)
+    for column, (low, high) in VALID_RANGES.items():
+        if column in df.columns:
+            mask &= (df[column] >= low) & (df[column] <= high)
+    return mask
+
 def create_sample_data():
     """Create sample data for testing"""
     logger.info("Creating sample crop recommendation data")
@@ -106,12 +127,8 @@ def prepare_features_target(df, target_column='label'):
     """Prepare features and target for model training"""
     logger.info("Preparing features and target variables")
     
-    # Define feature columns
-    feature_columns = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    
-    # Add NDVI if available
-    if 'ndvi' in df.columns:
-        feature_columns.append('ndvi')
+    # Define feature columns, adding NDVI if available
+    feature_columns = FEATURE_COLUMNS + [column for column in OPTIONAL_FEATURES if column in df.columns]
     
     X = df[feature_columns]
     y = df[target_column]
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+import joblib
+from loguru import logger
+
+class ModelRegistry:
+    """Versioned, content-addressed store of trained model artifacts
+
+    Layout::
+
+        <root>/versions/<version>/model.pkl      immutable artifact
+        <root>/versions/<version>/model.bin      binary node tables (optional)
+        <root>/versions/<version>/metadata.json  hash, metrics, training timestamp
+        <root>/ACTIVE                            name of the version being served
+    """
+
+    ARTIFACT_NAME = "model.pkl"
+    METADATA_NAME = "metadata.json"
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.active_file = self.root / "ACTIVE"
+
+    def register(self, model_data: dict, metrics: dict = None, activate=True, extra_metadata: dict = None,
+                 extra_artifacts: dict = None):
+        """Store a new model version and optionally make it the active one
+
+        extra_artifacts maps file names to callables that write that file into
+        the version; their hashes are recorded next to the main artifact's.
+        """
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+
+        # Serialize into a private staging directory first; nothing is visible until the rename
+        staging_dir = Path(tempfile.mkdtemp(dir=self.versions_dir, prefix=".staging-"))
+        artifact_path = staging_dir / self.ARTIFACT_NAME
+        joblib.dump(model_data, artifact_path)
+        sha256 = file_sha256(artifact_path)
+        artifacts = {}
+        for name, write in (extra_artifacts or {}).items():
+            write(staging_dir / name)
+            artifacts[name] = file_sha256(staging_dir / name)
+
+        trained_at = datetime.now(timezone.utc)
+        version = f"{trained_at.strftime('%Y%m%d%H%M%S')}-{sha256[:12]}"
+        metadata = {
+            'version': version,
+            'sha256': sha256,
+            'trained_at': trained_at.isoformat(),
+            'model_type': type(model_data['model']).__name__,
+            'feature_columns': list(model_data['feature_columns']),
+            'classes': model_data['label_encoder'].classes_.tolist(),
+            'metrics': metrics or {},
+            'artifacts': artifacts,
+            **(extra_metadata or {})
+        }
+        with open(staging_dir / self.METADATA_NAME, "w") as f:
+            json.dump(metadata, f, indent=2, default=float)
+
+        version_dir = self.versions_dir / version
+        try:
+            os.rename(staging_dir, version_dir)
+        except OSError:
+            # Identical artifact registered in the same second
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        logger.info(f"Registered model version {version}")
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """Atomically point ACTIVE at an existing version"""
+        if not (self.versions_dir / version / self.METADATA_NAME).exists():
+            raise ValueError(f"Unknown model version: {version}")
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".ACTIVE-")
+        with os.fdopen(fd, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, self.active_file)
+        logger.info(f"Activated model version {version}")
+
+    def active_version(self):
+        """Name of the active version, or None if nothing is registered"""
+        try:
+            return self.active_file.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self):
+        """All registered versions, oldest first"""
+        if not self.versions_dir.exists():
+            return []
+        return sorted(
+            path.name for path in self.versions_dir.iterdir()
+            if not path.name.startswith(".") and (path / self.METADATA_NAME).exists()
+        )
+
+    def version_dir(self, version: str):
+        return self.versions_dir / version
+
+    def artifact_path(self, version: str, name: str = None):
+        return self.versions_dir / version / (name or self.ARTIFACT_NAME)
+
+    def metadata(self, version: str):
+        """Read the metadata file of a version"""
+        with open(self.versions_dir / version / self.METADATA_NAME) as f:
+            return json.load(f)
+
+    def load(self, version: str):
+        """Load a version's artifact after checking it against its recorded hash"""
+        metadata = self.metadata(version)
+        artifact_path = self.artifact_path(version)
+        if file_sha256(artifact_path) != metadata['sha256']:
+            raise ValueError(f"Artifact for model version {version} does not match its hash")
+        return joblib.load(artifact_path), metadata
+
+    def verify(self, version: str, name: str):
+        """Path of an extra artifact after checking it against its recorded hash"""
+        metadata = self.metadata(version)
+        path = self.artifact_path(version, name)
+        expected = metadata.get('artifacts', {}).get(name)
+        if expected is None or not path.exists():
+            raise FileNotFoundError(f"Model version {version} has no {name}")
+        if file_sha256(path) != expected:
+            raise ValueError(f"{name} for model version {version} does not match its hash")
+        return path
+
+def file_sha256(path):
+    """Hex SHA-256 digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
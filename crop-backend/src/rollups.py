@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+from loguru import logger
+from .config import settings
+from .database import db_manager
+from .utils import INPUT_FEATURES
+
+GRANULARITIES = ('hour', 'day', 'month')
+
+# How far back /stats looks when no start is given
+DEFAULT_WINDOWS = {
+    'hour': timedelta(hours=24),
+    'day': timedelta(days=30),
+    'month': timedelta(days=365)
+}
+
+def bucket_start(timestamp: datetime, granularity: str):
+    """Truncate a timestamp to the start of its hour, day or month"""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'month':
+        return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+class PredictionRollups:
+    """Pre-aggregated prediction counters per time bucket and crop
+
+    One document per (granularity, bucket start, crop) holds the prediction
+    count and, for the confidence and every input feature, a running sum and
+    the number of values summed. Each flushed batch is folded into one $inc
+    upsert per touched bucket, so dashboards read O(buckets) documents.
+    """
+
+    def __init__(self, db_manager, collection_name="prediction_rollups", features=None):
+        self.db_manager = db_manager
+        self.collection_name = collection_name
+        self.fields = ['confidence', *(features or INPUT_FEATURES)]
+        self._indexed = False
+
+        self.batches = 0
+        self.upserts = 0
+        self.failed = 0
+
+    def _collection(self):
+        database = self.db_manager.database
+        if database is None:
+            raise RuntimeError("Database not connected")
+        collection = database[self.collection_name]
+        if not self._indexed:
+            collection.create_index(
+                [("g", ASCENDING), ("t", ASCENDING), ("c", ASCENDING)], name="bucket", unique=True
+            )
+            self._indexed = True
+        return collection
+
+    def aggregate(self, records: list):
+        """Fold records into per-bucket $inc documents keyed by (granularity, bucket, crop)"""
+        increments = {}
+        now = datetime.now()
+        for record in records:
+            values = {'confidence': record.get("confidence"), **record["input_data"]}
+            timestamp = record.get("timestamp") or now
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(timestamp, granularity), record["prediction"])
+                inc = increments.setdefault(key, {'n': 0})
+                inc['n'] += 1
+                for field in self.fields:
+                    value = values.get(field)
+                    if value is not None:
+                        inc[f'sums.{field}'] = inc.get(f'sums.{field}', 0.0) + float(value)
+                        inc[f'counts.{field}'] = inc.get(f'counts.{field}', 0) + 1
+        return increments
+
+    def record(self, records: list):
+        """Apply a batch of saved predictions to the rollups in one bulk write"""
+        if not records:
+            return 0
+        breaker = self.db_manager.breaker
+        if not breaker.allow():
+            self.failed += len(records)
+            return 0
+        try:
+            operations = [
+                UpdateOne({'g': g, 't': t, 'c': crop}, {'$inc': inc}, upsert=True)
+                for (g, t, crop), inc in self.aggregate(records).items()
+            ]
+            self._collection().bulk_write(operations, ordered=False)
+            breaker.record_success()
+            self.batches += 1
+            self.upserts += len(operations)
+            return len(operations)
+        except Exception as e:
+            breaker.record_failure()
+            self.failed += len(records)
+            logger.error(f"Failed to update prediction rollups: {e}")
+            return 0
+
+    def query(self, granularity="day", start=None, end=None, crop=None):
+        """Read rollup buckets in [start, end) and summarize them per crop"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        end = end or datetime.now()
+        start = bucket_start(start or end - DEFAULT_WINDOWS[granularity], granularity)
+
+        query = {'g': granularity, 't': {'$gte': start, '$lt': end}}
+        if crop is not None:
+            query['c'] = crop
+
+        buckets = []
+        totals = {}
+        for doc in self._collection().find(query, {'_id': 0}).sort([('t', ASCENDING), ('c', ASCENDING)]):
+            buckets.append({
+                'bucket': doc['t'].isoformat(),
+                'crop': doc['c'],
+                'count': doc['n'],
+                **self._means(doc)
+            })
+            total = totals.setdefault(doc['c'], {'n': 0, 'sums': {}, 'counts': {}})
+            total['n'] += doc['n']
+            for field, value in doc.get('sums', {}).items():
+                total['sums'][field] = total['sums'].get(field, 0.0) + value
+                total['counts'][field] = total['counts'].get(field, 0) + doc['counts'][field]
+
+        crops = [
+            {'crop': crop_name, 'count': total['n'], **self._means(total)}
+            for crop_name, total in sorted(totals.items(), key=lambda item: -item[1]['n'])
+        ]
+        return {
+            'granularity': granularity,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'total_predictions': sum(total['n'] for total in totals.values()),
+            'crops': crops,
+            'buckets': buckets
+        }
+
+    def _means(self, doc):
+        """Mean confidence and feature averages from running sums"""
+        sums = doc.get('sums', {})
+        counts = doc.get('counts', {})
+        means = {field: sums[field] / counts[field] for field in sums if counts.get(field)}
+        return {
+            'mean_confidence': means.pop('confidence', None),
+            'feature_means': means
+        }
+
+    def stats(self):
+        """Return rollup write counters"""
+        return {
+            'collection': self.collection_name,
+            'batches': self.batches,
+            'upserts': self.upserts,
+            'failed_records': self.failed
+        }
+
+# Global rollups instance
+prediction_rollups = PredictionRollups(db_manager, collection_name=settings.ROLLUP_COLLECTION)
@@ -0,0 +1,156 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from loguru import logger
+
+# Hyperparameters of the production forest
+FOREST_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 20,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+
+EVALUATION_MODES = ('cv', 'oob', 'none')
+
+class StageTimer:
+    """Wall-clock seconds spent in each named training stage
+
+    progress, if given, is called with a stage's name when it starts and
+    with its name and seconds when it ends.
+    """
+
+    def __init__(self, progress=None):
+        self.timings = {}
+        self.progress = progress
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        if self.progress is not None:
+            self.progress(name)
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            logger.info(f"Training stage '{name}' took {self.timings[name]:.2f}s")
+            if self.progress is not None:
+                self.progress(name, self.timings[name])
+
+    def summary(self):
+        return {**self.timings, 'total': time.perf_counter() - self._started}
+
+def resolve_n_jobs(n_jobs):
+    """Turn -1 (all cores) or a positive count into a concrete number of cores"""
+    cores = os.cpu_count() or 1
+    return cores if n_jobs is None or n_jobs < 1 else min(n_jobs, cores)
+
+def load_forest_params(config_path, defaults=FOREST_PARAMS, backend="random_forest"):
+    """Production hyperparameters, overridden by a tuned config file for the same backend"""
+    try:
+        with open(config_path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return dict(defaults)
+    if config.get('backend', "random_forest") != backend:
+        logger.info(f"Ignoring {config_path}: it was tuned for the {config.get('backend')} backend")
+        return dict(defaults)
+    logger.info(f"Using tuned parameters from {config_path}")
+    return {**defaults, **config['params']}
+
+def save_forest_config(config_path, params, **details):
+    """Atomically write the hyperparameters train() should use"""
+    config_path = Path(config_path)
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config = {'params': params, 'saved_at': datetime.now(timezone.utc).isoformat(), **details}
+    fd, tmp_path = tempfile.mkstemp(dir=config_path.parent, prefix=f".{config_path.name}-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(config, f, indent=2, default=float)
+    os.replace(tmp_path, config_path)
+    logger.info(f"Saved forest parameters to {config_path}")
+
+def build_forest(random_state=42, n_jobs=-1, oob_score=False, **overrides):
+    """Create the production forest, building trees on n_jobs cores"""
+    return RandomForestClassifier(
+        **{**FOREST_PARAMS, **overrides},
+        random_state=random_state,
+        n_jobs=n_jobs,
+        oob_score=oob_score
+    )
+
+def shared_memory_dir():
+    """Directory for arrays shared between processes; RAM-backed where available"""
+    return "/dev/shm" if Path("/dev/shm").is_dir() else None
+
+def shared_arrays_prefix(pid=None):
+    """Name prefix of the shared array directories created by process pid"""
+    return f"crop-train-{os.getpid() if pid is None else pid}-"
+
+def remove_shared_arrays(pid):
+    """Delete shared array directories left behind by a process that was killed"""
+    root = Path(shared_memory_dir() or tempfile.gettempdir())
+    for path in root.glob(f"{shared_arrays_prefix(pid)}*"):
+        shutil.rmtree(path, ignore_errors=True)
+
+@contextmanager
+def shared_arrays(X, y):
+    """Write X and y once as .npy files that worker processes memory-map read-only"""
+    with tempfile.TemporaryDirectory(dir=shared_memory_dir(), prefix=shared_arrays_prefix()) as tmp_dir:
+        x_path = os.path.join(tmp_dir, "X.npy")
+        y_path = os.path.join(tmp_dir, "y.npy")
+        np.save(x_path, np.ascontiguousarray(X, dtype=np.float64))
+        np.save(y_path, np.ascontiguousarray(y))
+        yield x_path, y_path
+
+def process_pool(workers):
+    """Process pool for CPU-bound training work"""
+    # Spawn rather than fork: the caller may already be running threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _score_fold(x_path, y_path, train_index, test_index, params, random_state, n_jobs, build=build_forest):
+    """Fit and score one CV fold on memory-mapped X/y; runs in a worker process"""
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    estimator = build(random_state=random_state, n_jobs=n_jobs, **params)
+    estimator.fit(X[train_index], y[train_index])
+    return estimator.score(X[test_index], y[test_index])
+
+def cross_validate(X, y, folds=5, random_state=42, workers=None, params=None, build=build_forest):
+    """Score the model build() creates with stratified k-fold CV, running folds concurrently
+
+    X and y are written once to memory-mapped .npy files that every worker
+    maps read-only instead of receiving a pickled copy per fold. Each fold
+    builds its trees on cpu_count / workers cores. With a single worker the
+    folds run in this process.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y)
+    params = params or {}
+    splits = list(StratifiedKFold(n_splits=folds).split(X, y))
+    workers = min(folds, workers or resolve_n_jobs(-1))
+    n_jobs = max(1, resolve_n_jobs(-1) // workers)
+
+    if workers <= 1:
+        return np.array([
+            build(random_state=random_state, n_jobs=n_jobs, **params)
+            .fit(X[train], y[train]).score(X[test], y[test])
+            for train, test in splits
+        ])
+
+    with shared_arrays(X, y) as (x_path, y_path), process_pool(workers) as pool:
+        futures = [
+            pool.submit(_score_fold, x_path, y_path, train, test, params, random_state, n_jobs, build)
+            for train, test in splits
+        ]
+        return np.array([future.result() for future in futures])
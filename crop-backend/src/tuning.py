@@ -0,0 +1,186 @@
+import itertools
+import math
+import multiprocessing
+import random
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from loguru import logger
+from .inference import CompiledForest
+from .training import build_forest, resolve_n_jobs, shared_arrays
+
+# Hyperparameters explored by the search
+SEARCH_SPACE = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [8, 12, 16, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 0.5]
+}
+
+def sample_candidates(space, n_candidates, random_state=42):
+    """Draw up to n_candidates distinct parameter combinations from the grid"""
+    grid = [dict(zip(space, values)) for values in itertools.product(*space.values())]
+    if n_candidates >= len(grid):
+        return grid
+    return random.Random(random_state).sample(grid, n_candidates)
+
+def _evaluate_candidate(x_path, y_path, train_index, val_index, params, random_state, build=build_forest):
+    """Fit one candidate on a subsample and score it; runs in a worker process"""
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    started = time.perf_counter()
+    estimator = build(random_state=random_state, n_jobs=1, **params)
+    estimator.fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - started
+    engine = CompiledForest.from_estimator(estimator).freeze()
+    return {
+        'accuracy': estimator.score(X[val_index], y[val_index]),
+        'fit_seconds': fit_seconds,
+        'nbytes': engine.nbytes,
+        'n_nodes': engine.n_nodes
+    }, engine
+
+def measure_latency(engine, X, repeats=50):
+    """Median milliseconds for a single-row prediction and per row in a batch of 64"""
+    single = X[:1]
+    batch = X[:64]
+    engine.predict_proba(batch)
+
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        engine.predict_proba(single)
+        timings.append(time.perf_counter() - started)
+
+    batch_timings = []
+    for _ in range(max(1, repeats // 5)):
+        started = time.perf_counter()
+        engine.predict_proba(batch)
+        batch_timings.append(time.perf_counter() - started)
+
+    return {
+        'latency_ms': float(np.median(timings)) * 1000,
+        'batch_latency_ms_per_row': float(np.median(batch_timings)) * 1000 / len(batch)
+    }
+
+# (metric, +1 if higher is better, -1 if lower is better)
+OBJECTIVES = (('accuracy', 1), ('latency_ms', -1), ('nbytes', -1))
+
+def pareto_front(results, objectives=OBJECTIVES):
+    """Candidates no other candidate beats on one objective without losing on another"""
+    def dominates(a, b):
+        differences = [sign * (a[metric] - b[metric]) for metric, sign in objectives]
+        return all(d >= 0 for d in differences) and any(d > 0 for d in differences)
+
+    front = [r for r in results if not any(dominates(other, r) for other in results if other is not r)]
+    # Cheapest first: order by the cost objectives, then by accuracy
+    order = (*objectives[1:], objectives[0])
+    return sorted(front, key=lambda r: tuple(-sign * r[metric] for metric, sign in order))
+
+def choose(results, accuracy_floor):
+    """Fastest, then smallest, candidate meeting the accuracy floor; else the most accurate"""
+    eligible = [r for r in results if r['accuracy'] >= accuracy_floor]
+    if eligible:
+        return min(eligible, key=lambda r: (r['latency_ms'], r['nbytes'], -r['accuracy']))
+    logger.warning(f"No candidate reached accuracy {accuracy_floor}; choosing the most accurate")
+    return max(results, key=lambda r: (r['accuracy'], -r['latency_ms']))
+
+def successive_halving(X, y, candidates, budget_seconds=300, eta=3, min_resource=None,
+                       validation_size=0.25, workers=None, random_state=42, build=build_forest):
+    """Search candidates with successive halving under a wall-clock budget
+
+    Every round fits the surviving candidates concurrently on a larger
+    stratified subsample of the training split. Once a round's fits are
+    done, each scored candidate has its compiled inference latency measured
+    one at a time, so concurrent fits do not distort the timings. The most
+    accurate 1/eta plus the accuracy/latency/size Pareto front survive, so
+    small, fast forests are not eliminated only for being slightly less
+    accurate. The last round uses the whole training split. If the budget
+    runs out, the pool is terminated and the unfinished round is discarded
+    in favour of the last complete one. Returns every candidate's metrics
+    from the last round it completed, and the per-round history. build
+    creates a candidate model from its parameters.
+    """
+    deadline = time.monotonic() + budget_seconds
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    train_index, val_index = train_test_split(
+        np.arange(len(X)), test_size=validation_size, random_state=random_state, stratify=y
+    )
+    X_val = X[val_index]
+
+    n_classes = len(np.unique(y))
+    rounds = max(1, int(math.log(len(candidates), eta)) + 1) if len(candidates) > 1 else 1
+    min_resource = min_resource or max(n_classes * 5, len(train_index) // eta ** (rounds - 1))
+    workers = workers or resolve_n_jobs(-1)
+
+    survivors = [{'params': params} for params in candidates]
+    finalists = []
+    latest = {}
+    history = []
+    # Spawn rather than fork: the caller may already be running threads
+    context = multiprocessing.get_context("spawn")
+    with shared_arrays(X, y) as (x_path, y_path), context.Pool(workers) as pool:
+        for round_number in range(rounds):
+            resource = min(len(train_index), min_resource * eta ** round_number)
+            if round_number == rounds - 1:
+                resource = len(train_index)
+            if resource < len(train_index):
+                subsample, _ = train_test_split(
+                    train_index, train_size=resource, random_state=random_state, stratify=y[train_index]
+                )
+            else:
+                subsample = train_index
+
+            pending = [
+                (pool.apply_async(_evaluate_candidate, (x_path, y_path, subsample, val_index,
+                                                        candidate['params'], random_state, build)),
+                 candidate['params'])
+                for candidate in survivors
+            ]
+            for result, _ in pending:
+                result.wait(max(0.0, deadline - time.monotonic()))
+            budget_exhausted = not all(result.ready() for result, _ in pending)
+            if budget_exhausted:
+                # Fits still running past the budget are abandoned, not awaited
+                pool.terminate()
+
+            scored = []
+            for result, params in pending:
+                if not result.ready():
+                    continue
+                try:
+                    metrics, engine = result.get()
+                except Exception as e:
+                    logger.warning(f"Candidate {params} failed: {e}")
+                    continue
+                scored.append({
+                    'params': params, **metrics, **measure_latency(engine, X_val),
+                    'resource': int(resource), 'round': round_number
+                })
+            history.append({'round': round_number, 'resource': int(resource),
+                            'candidates': len(survivors), 'completed': len(scored),
+                            'complete': not budget_exhausted})
+            logger.info(f"Round {round_number}: {len(scored)}/{len(survivors)} candidates on {resource} rows")
+
+            if budget_exhausted and finalists:
+                logger.warning("Tuning budget exhausted; reporting the last complete round")
+                break
+            if not scored:
+                break
+            for candidate in scored:
+                latest[tuple(sorted(candidate['params'].items(), key=str))] = candidate
+            finalists = sorted(scored, key=lambda c: (-c['accuracy'], c['latency_ms'], c['nbytes']))
+            if budget_exhausted:
+                logger.warning("Tuning budget exhausted during the first round; reporting the fits that finished")
+                break
+            # Keep the most accurate 1/eta, plus any faster or smaller forest that is not strictly worse
+            survivors = finalists[:max(1, math.ceil(len(finalists) / eta))]
+            survivors += [c for c in pareto_front(finalists) if c not in survivors]
+            if len(survivors) == 1 and resource == len(train_index):
+                break
+
+    if not finalists:
+        raise RuntimeError(f"No candidate finished within the {budget_seconds}s budget")
+    return list(latest.values()), history
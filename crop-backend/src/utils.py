@@ -1,6 +1,7 @@
 import os
 import requests
 import zipfile
+import numpy as np
 from pathlib import Path
 from loguru import logger
 from .config import settings
@@ -78,46 +79,88 @@ def download_crop_datasets():
     logger.info(f"Downloaded {success_count}/{len(datasets)} datasets successfully")
     return success_count == len(datasets)
 
+# Accepted (min, max) range and error message for each input feature; None means unbounded
+FEATURE_RANGES = {
+    'N': (0, 200, "Nitrogen (N) should be between 0-200"),
+    'P': (0, 200, "Phosphorus (P) should be between 0-200"),
+    'K': (0, 300, "Potassium (K) should be between 0-300"),
+    'temperature': (-50, 60, "Temperature should be between -50°C to 60°C"),
+    'humidity': (0, 100, "Humidity should be between 0-100%"),
+    'ph': (0, 14, "pH should be between 0-14"),
+    'rainfall': (0, None, "Rainfall should be non-negative"),
+    'ndvi': (-1, 1, "NDVI should be between -1 and 1"),
+}
+
+REQUIRED_FIELDS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+INPUT_FEATURES = list(FEATURE_RANGES)
+
 def validate_input_data(data):
     """Validate crop prediction input data"""
-    required_fields = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    optional_fields = ['ndvi']
-    
     errors = []
     
     # Check required fields
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in data:
             errors.append(f"Missing required field: {field}")
         elif not isinstance(data[field], (int, float)):
             errors.append(f"Field {field} must be a number")
     
     # Validate ranges if data is present
-    if 'N' in data and (data['N'] < 0 or data['N'] > 200):
-        errors.append("Nitrogen (N) should be between 0-200")
+    for field, (low, high, message) in FEATURE_RANGES.items():
+        value = data.get(field)
+        if not isinstance(value, (int, float)):
+            continue
+        if (low is not None and value < low) or (high is not None and value > high):
+            errors.append(message)
     
-    if 'P' in data and (data['P'] < 0 or data['P'] > 200):
-        errors.append("Phosphorus (P) should be between 0-200")
-    
-    if 'K' in data and (data['K'] < 0 or data['K'] > 300):
-        errors.append("Potassium (K) should be between 0-300")
+    return errors
+
+def input_batch_to_matrix(rows=None, columns=None):
+    """Build an (n_rows, n_features) float matrix from row dicts or column arrays
     
-    if 'temperature' in data and (data['temperature'] < -50 or data['temperature'] > 60):
-        errors.append("Temperature should be between -50°C to 60°C")
+    Features are laid out in INPUT_FEATURES order; absent or null values are NaN.
+    """
+    if rows is not None:
+        return np.array(
+            [[row.get(feature) for feature in INPUT_FEATURES] for row in rows],
+            dtype=np.float64
+        ).reshape(len(rows), len(INPUT_FEATURES))
     
-    if 'humidity' in data and (data['humidity'] < 0 or data['humidity'] > 100):
-        errors.append("Humidity should be between 0-100%")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All column arrays must have the same length")
+    n_rows = lengths.pop() if lengths else 0
     
-    if 'ph' in data and (data['ph'] < 0 or data['ph'] > 14):
-        errors.append("pH should be between 0-14")
+    return np.column_stack([
+        np.array(columns[feature], dtype=np.float64) if feature in columns else np.full(n_rows, np.nan)
+        for feature in INPUT_FEATURES
+    ]).reshape(n_rows, len(INPUT_FEATURES))
+
+def validate_input_batch(matrix):
+    """Validate a feature matrix in one vectorized pass
     
-    if 'rainfall' in data and data['rainfall'] < 0:
-        errors.append("Rainfall should be non-negative")
+    Returns a dict mapping row index to its list of errors; valid rows are omitted.
+    """
+    invalid = {}
     
-    if 'ndvi' in data and data['ndvi'] is not None and (data['ndvi'] < -1 or data['ndvi'] > 1):
-        errors.append("NDVI should be between -1 and 1")
+    for j, feature in enumerate(INPUT_FEATURES):
+        column = matrix[:, j]
+        low, high, message = FEATURE_RANGES[feature]
+        
+        if feature in REQUIRED_FIELDS:
+            for i in np.flatnonzero(np.isnan(column)):
+                invalid.setdefault(int(i), []).append(f"Missing required field: {feature}")
+        
+        # NaN compares False on both sides, so missing values never count as out of range
+        out_of_range = np.zeros(len(column), dtype=bool)
+        if low is not None:
+            out_of_range |= column < low
+        if high is not None:
+            out_of_range |= column > high
+        for i in np.flatnonzero(out_of_range):
+            invalid.setdefault(int(i), []).append(message)
     
-    return errors
+    return invalid
 
 def setup_logging():
     """Set up logging configuration"""
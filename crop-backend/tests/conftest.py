@@ -0,0 +1,11 @@
+import pytest
+
+from src.config import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_model_path(tmp_path, monkeypatch):
+    """Keep each test's model artifacts and cached training data out of the repository"""
+    monkeypatch.setattr(settings, "MODEL_PATH", str(tmp_path / "models" / "model.pkl"))
+    monkeypatch.setattr(settings, "DATASET_CACHE_DIR", str(tmp_path / "dataset_cache"))
+    monkeypatch.setattr(settings, "INGESTED_DATA_PATH", str(tmp_path / "ingested" / "crops.parquet"))
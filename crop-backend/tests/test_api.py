@@ -1,5 +1,7 @@
 import pytest
+import asyncio
 import sys
+from datetime import datetime
 from pathlib import Path
 from fastapi.testclient import TestClient
 
@@ -7,6 +9,9 @@ from fastapi.testclient import TestClient
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from src.api.main import app
+from src.api import routes
+from src.model import CropModel
+from src.utils import input_batch_to_matrix, validate_input_batch
 
 client = TestClient(app)
 
@@ -179,5 +184,195 @@ class TestAPIValidation:
         else:
             assert response.status_code in [200, 503], f"Valid input {field}={value} should not fail validation"
 
+class TestReadiness:
+    """Test cases for model preload and readiness"""
+    
+    def test_not_ready_without_model(self, monkeypatch):
+        """Test readiness fails when no model can be loaded"""
+        monkeypatch.setattr(routes, "model", CropModel())
+        monkeypatch.setattr(routes, "serving_state", dict(routes.serving_state))
+        monkeypatch.setattr("src.api.main.serving_state", routes.serving_state)
+        
+        asyncio.run(routes.preload_model())
+        assert routes.serving_state["status"] == "model_unavailable"
+        
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+    
+    def test_ready_after_warm_up(self, monkeypatch):
+        """Test readiness succeeds after the model is loaded and warmed up"""
+        trained = CropModel()
+        trained.train(test_size=0.3, random_state=42)
+        monkeypatch.setattr(routes, "model", trained)
+        monkeypatch.setattr(routes, "serving_state", dict(routes.serving_state))
+        monkeypatch.setattr("src.api.main.serving_state", routes.serving_state)
+        
+        asyncio.run(routes.preload_model())
+        
+        response = client.get("/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ready"] is True
+        assert data["load_ms"] is not None
+        assert data["warmup_ms"] is not None
+        assert set(data["warmup_latency_ms"]) == {"1", "16", "64"}
+
+class TestBatchPrediction:
+    """Test cases for the batch prediction endpoint"""
+    
+    @pytest.fixture
+    def trained_model(self, monkeypatch):
+        """Serve a freshly trained model from the routes module"""
+        trained = CropModel()
+        trained.train(test_size=0.3, random_state=42)
+        monkeypatch.setattr(routes, "model", trained)
+        return trained
+    
+    def test_batch_rows(self, trained_model):
+        """Test batch prediction reports errors only for invalid rows"""
+        rows = [
+            {"N": 90, "P": 42, "K": 43, "temperature": 20.87, "humidity": 82.00, "ph": 6.50, "rainfall": 202.93},
+            {"N": -10, "P": 42, "K": 43, "temperature": 20.87, "humidity": 150, "ph": 6.50, "rainfall": 202.93},
+            {"N": 120, "P": 60, "K": 80, "temperature": 25.5, "humidity": 70.0, "ph": 7.0, "rainfall": 150.0}
+        ]
+        
+        response = client.post("/api/v1/predict/batch", json={"rows": rows})
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["total"] == 3
+        assert data["succeeded"] == 2
+        assert data["failed"] == 1
+        assert [item["index"] for item in data["results"]] == [0, 1, 2]
+        
+        assert data["results"][1]["prediction"] is None
+        assert len(data["results"][1]["errors"]) == 2
+        for item in (data["results"][0], data["results"][2]):
+            assert item["errors"] is None
+            assert item["prediction"]["crop"] == trained_model.predict(rows[item["index"]])["crop"]
+    
+    def test_batch_columns(self, trained_model):
+        """Test batch prediction with column arrays"""
+        columns = {
+            "N": [90, 120], "P": [42, 60], "K": [43, 80],
+            "temperature": [20.87, 25.5], "humidity": [82.0, 70.0],
+            "ph": [6.5, 7.0], "rainfall": [202.93, 150.0]
+        }
+        
+        response = client.post("/api/v1/predict/batch", json={"columns": columns})
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 2
+    
+    def test_batch_early_exit(self, trained_model):
+        """Test batch predictions report trees used and exit reasons when opted in"""
+        rows = [
+            {"N": 90, "P": 42, "K": 43, "temperature": 20.87, "humidity": 82.00, "ph": 6.50, "rainfall": 202.93},
+            {"N": 120, "P": 60, "K": 80, "temperature": 25.5, "humidity": 70.0, "ph": 7.0, "rainfall": 150.0}
+        ]
+        
+        response = client.post("/api/v1/predict/batch", params={"early_exit": "true"}, json={"rows": rows})
+        assert response.status_code == 200
+        for item in response.json()["results"]:
+            assert item["prediction"]["exit_reason"] in ("exact", "confidence", "full")
+            assert 1 <= item["prediction"]["trees_used"] <= trained_model.engine.n_estimators
+        
+        response = client.post("/api/v1/predict/batch", json={"rows": rows})
+        for item in response.json()["results"]:
+            assert item["prediction"]["exit_reason"] is None
+            assert item["prediction"]["trees_used"] == trained_model.engine.n_estimators
+    
+    def test_sample_follows_early_exit_setting(self, trained_model, monkeypatch):
+        """Test the sample prediction only exits early when the setting is on"""
+        monkeypatch.setattr(routes.settings, "EARLY_EXIT_ENABLED", False)
+        response = client.get("/api/v1/predict/sample")
+        assert response.status_code == 200
+        prediction = response.json()["prediction"]
+        assert prediction["exit_reason"] is None
+        assert prediction["trees_used"] == trained_model.engine.n_estimators
+        
+        monkeypatch.setattr(routes.settings, "EARLY_EXIT_ENABLED", True)
+        response = client.get("/api/v1/predict/sample")
+        assert response.json()["prediction"]["exit_reason"] in ("exact", "confidence", "full")
+    
+    def test_batch_requires_one_format(self):
+        """Test that exactly one of rows or columns must be given"""
+        response = client.post("/api/v1/predict/batch", json={})
+        assert response.status_code == 400
+        
+        response = client.post("/api/v1/predict/batch", json={"rows": [], "columns": {}})
+        assert response.status_code == 400
+    
+    def test_batch_mismatched_columns(self):
+        """Test column arrays of different lengths are rejected"""
+        response = client.post("/api/v1/predict/batch", json={"columns": {"N": [1, 2], "P": [1]}})
+        assert response.status_code == 400
+    
+    def test_validate_input_batch(self):
+        """Test vectorized validation matches per-row validation messages"""
+        matrix = input_batch_to_matrix(rows=[
+            {"N": 90, "P": 42, "K": 43, "temperature": 20, "humidity": 80, "ph": 6.5, "rainfall": 200},
+            {"N": 90, "P": 42, "K": 43, "temperature": 20, "humidity": 80, "ph": 15, "rainfall": 200, "ndvi": 2},
+            {"N": 90, "P": 42, "K": 43, "temperature": 20, "humidity": 80, "ph": 6.5}
+        ])
+        
+        errors = validate_input_batch(matrix)
+        assert set(errors) == {1, 2}
+        assert errors[1] == ["pH should be between 0-14", "NDVI should be between -1 and 1"]
+        assert errors[2] == ["Missing required field: rainfall"]
+
+class TestPredictionHistory:
+    """Test cases for the paginated prediction history endpoint"""
+    
+    @pytest.fixture
+    def history(self, monkeypatch):
+        """Serve history rows from memory instead of MongoDB"""
+        rows = [
+            {"id": f"{i:024x}", "timestamp": datetime(2026, 5, 1, 12, 0, i), "prediction": "rice", "confidence": 0.9}
+            for i in range(5, 0, -1)
+        ]
+        calls = []
+        
+        def iter_history(limit, fields=None, **filters):
+            calls.append({"limit": limit, "fields": fields, **filters})
+            after = filters.get("after")
+            remaining = [row for row in rows if after is None or row["timestamp"] < after[0]]
+            return iter(remaining[:limit])
+        
+        monkeypatch.setattr(routes.prediction_store, "iter_history", iter_history)
+        return calls
+    
+    def test_pages_follow_cursor(self, history):
+        """Test next_cursor walks through every row exactly once"""
+        response = client.get("/api/v1/predictions", params={"limit": 2})
+        assert response.status_code == 200
+        page = response.json()
+        assert page["count"] == 2
+        assert page["items"][0]["timestamp"] == "2026-05-01T12:00:05"
+        assert history[0]["limit"] == 3
+        
+        seen = [item["id"] for item in page["items"]]
+        while page["next_cursor"]:
+            page = client.get("/api/v1/predictions", params={"limit": 2, "cursor": page["next_cursor"]}).json()
+            seen.extend(item["id"] for item in page["items"])
+        
+        assert len(seen) == len(set(seen)) == 5
+    
+    def test_filters_and_fields_are_passed_through(self, history):
+        """Test query parameters reach the store"""
+        response = client.get("/api/v1/predictions", params={
+            "crop": "rice", "min_confidence": 0.5, "fields": "prediction, confidence"
+        })
+        assert response.status_code == 200
+        assert history[0]["crop"] == "rice"
+        assert history[0]["min_confidence"] == 0.5
+        assert history[0]["fields"] == ["prediction", "confidence"]
+    
+    def test_invalid_requests(self, history):
+        """Test bad cursors, unknown fields and oversized pages are rejected"""
+        assert client.get("/api/v1/predictions", params={"cursor": "bogus"}).status_code == 400
+        assert client.get("/api/v1/predictions", params={"fields": "secret"}).status_code == 400
+        assert client.get("/api/v1/predictions", params={"limit": 100000}).status_code == 422
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
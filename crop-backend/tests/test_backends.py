@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.backends import BACKENDS, compare_backends, get_backend
+from src.config import settings
+from src.inference import CompiledForest
+from src.model import CropModel
+from src.training import cross_validate, save_forest_config
+
+@pytest.fixture
+def hgb(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_BACKEND", "hist_gradient_boosting")
+    # Keep the boosted model small so the tests stay fast
+    monkeypatch.setitem(BACKENDS['hist_gradient_boosting'].default_params, 'max_iter', 10)
+
+class TestBackends:
+    """Test cases for pluggable estimator backends"""
+
+    def test_get_backend(self, monkeypatch):
+        """Test backends resolve by name, from settings, and unknown names are refused"""
+        assert get_backend().name == "random_forest"
+        monkeypatch.setattr(settings, "MODEL_BACKEND", "hist_gradient_boosting")
+        assert get_backend().name == "hist_gradient_boosting"
+        with pytest.raises(ValueError, match="Unknown model backend"):
+            get_backend("xgboost")
+
+    @pytest.mark.parametrize("n_classes", [2, 4])
+    def test_compiled_boosting_matches_sklearn(self, n_classes):
+        """Test the compiled engine reproduces boosted probabilities, binary and multiclass"""
+        X, y = make_classification(n_samples=500, n_features=6, n_informative=4,
+                                   n_classes=n_classes, random_state=0)
+        boosted = HistGradientBoostingClassifier(max_iter=20, random_state=42).fit(X, y)
+        engine = CompiledForest.from_estimator(boosted)
+
+        labels, proba = engine.predict(X)
+
+        np.testing.assert_allclose(proba, boosted.predict_proba(X), rtol=1e-12, atol=1e-12)
+        np.testing.assert_array_equal(labels, boosted.predict(X))
+        assert engine.n_estimators == 20 * (n_classes if n_classes > 2 else 1)
+
+    def test_boosted_anytime_uses_every_tree(self):
+        """Test early exit falls back to full evaluation for boosted ensembles"""
+        X, y = make_classification(n_samples=300, n_features=6, n_informative=4, n_classes=3, random_state=0)
+        engine = CompiledForest.from_estimator(HistGradientBoostingClassifier(max_iter=10).fit(X, y))
+
+        labels, proba, trees_used, reasons = engine.predict_anytime(X, check_every=3)
+
+        np.testing.assert_array_equal(labels, engine.predict(X)[0])
+        assert (trees_used == engine.n_estimators).all() and (reasons == 0).all()
+
+    def test_cross_validate_with_backend(self):
+        """Test CV folds build the backend's estimator in worker processes"""
+        X, y = make_classification(n_samples=300, n_features=6, n_informative=4, n_classes=3, random_state=0)
+        backend = get_backend("hist_gradient_boosting")
+
+        scores = cross_validate(X, y, folds=3, workers=2, params={'max_iter': 5}, build=backend.build)
+
+        assert len(scores) == 3 and (scores > 0.5).all()
+
+    def test_train_predict_and_reload_boosted_model(self, hgb, monkeypatch):
+        """Test a boosted model trains, serves and reloads like the forest"""
+        model = CropModel()
+        results = model.train(test_size=0.3, random_state=42, evaluation="none")
+        row = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.8, 'humidity': 82.0,
+               'ph': 6.5, 'rainfall': 202.9, 'ndvi': 0.6}
+        expected = model.predict(row)
+
+        assert results['backend'] == "hist_gradient_boosting"
+        assert len(results['feature_importance']) == len(model.feature_columns)
+        assert model.get_model_info()['model_type'] == "HistGradientBoostingClassifier"
+
+        for artifact_format in ("binary", "pickle"):
+            monkeypatch.setattr(settings, "MODEL_ARTIFACT_FORMAT", artifact_format)
+            served = CropModel()
+            assert served.load_model()
+            assert served.predict(row) == expected
+            assert served.get_model_info()['model_type'] == "HistGradientBoostingClassifier"
+
+    def test_boosted_model_refuses_oob_and_compaction(self, hgb):
+        """Test forest-only features are refused for boosted models"""
+        model = CropModel()
+        with pytest.raises(ValueError, match="out-of-bag"):
+            model.train(evaluation="oob")
+
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+        with pytest.raises(ValueError, match="cannot be compacted"):
+            model.compact()
+
+    def test_tuned_config_applies_to_its_backend(self, hgb):
+        """Test a config tuned for the forest is ignored when training a boosted model"""
+        model = CropModel()
+        save_forest_config(model.forest_config_path, {'n_estimators': 7}, backend="random_forest")
+
+        results = model.train(test_size=0.3, random_state=42, evaluation="none")
+
+        assert 'n_estimators' not in results['forest_params']
+        assert results['forest_params']['max_iter'] == 10
+
+    def test_compare_backends_report(self, hgb):
+        """Test the comparison covers time, latency, size and accuracy for every backend"""
+        X, y = make_classification(n_samples=400, n_features=6, n_informative=4, n_classes=3, random_state=0)
+
+        report = compare_backends(X[:300], y[:300], X[300:], y[300:], n_jobs=1)
+
+        assert [row['backend'] for row in report] == list(BACKENDS)
+        for row in report:
+            assert row['train_seconds'] > 0 and row['latency_ms'] > 0
+            assert row['batch_latency_ms_per_row'] > 0
+            assert row['binary_bytes'] > 0 and row['pickle_bytes'] > 0
+            assert 0.5 < row['test_accuracy'] <= 1.0
@@ -0,0 +1,75 @@
+import pytest
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.api.batching import MicroBatcher
+
+class TestMicroBatcher:
+    """Test cases for the request micro-batcher"""
+    
+    def test_concurrent_requests_are_coalesced(self):
+        """Test concurrent submissions share one inference call"""
+        calls = []
+        
+        def predict_fn(rows):
+            calls.append(len(rows))
+            return [row['x'] * 2 for row in rows]
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=64, max_wait_ms=20)
+        
+        async def run():
+            results = await asyncio.gather(*(batcher.submit({'x': i}) for i in range(10)))
+            await batcher.close()
+            return results
+        
+        results = asyncio.run(run())
+        assert results == [i * 2 for i in range(10)]
+        assert calls == [10]
+        
+        stats = batcher.stats()
+        assert stats['batches'] == 1
+        assert stats['rows'] == 10
+        assert stats['batch_size_histogram']['16'] == 1
+    
+    def test_max_batch_size(self):
+        """Test batches never exceed the configured size"""
+        calls = []
+        
+        def predict_fn(rows):
+            calls.append(len(rows))
+            return rows
+        
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=5)
+        
+        async def run():
+            await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+            await batcher.close()
+        
+        asyncio.run(run())
+        assert max(calls) <= 4
+        assert sum(calls) == 10
+    
+    def test_errors_propagate_to_every_request(self):
+        """Test an inference failure is raised in each waiting request"""
+        def predict_fn(rows):
+            raise ValueError("Model not trained or loaded")
+        
+        batcher = MicroBatcher(predict_fn)
+        
+        async def run():
+            results = await asyncio.gather(
+                batcher.submit(1), batcher.submit(2), return_exceptions=True
+            )
+            await batcher.close()
+            return results
+        
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+        assert batcher.stats()['failures'] >= 1
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+import pytest
+import time
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.cache import PredictionCache, parse_rounding
+from src.model import CropModel
+
+class TestPredictionCache:
+    """Test cases for the prediction cache"""
+    
+    def test_parse_rounding(self):
+        """Test parsing the per-feature rounding spec"""
+        assert parse_rounding("N:0, ph:1") == {'N': 0, 'ph': 1}
+        assert parse_rounding("") == {}
+    
+    def test_quantize(self):
+        """Test only configured features are rounded"""
+        cache = PredictionCache(rounding={'N': 0, 'ph': 1})
+        X = np.array([[90.4, 6.54, 20.871]])
+        np.testing.assert_array_equal(cache.quantize(X, ['N', 'ph', 'temperature']), [[90.0, 6.5, 20.871]])
+    
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted beyond max_size"""
+        owner = object()
+        cache = PredictionCache(max_size=2)
+        cache.get_many(owner, [])
+        cache.put_many(owner, ['a', 'b'], [1, 2])
+        assert cache.get_many(owner, ['a']) == [1]
+        
+        cache.put_many(owner, ['c'], [3])
+        assert cache.get_many(owner, ['a', 'b', 'c']) == [1, None, 3]
+        assert cache.stats()['evictions'] == 1
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        owner = object()
+        cache = PredictionCache(ttl=0.01)
+        cache.get_many(owner, [])
+        cache.put_many(owner, ['a'], [1])
+        time.sleep(0.02)
+        assert cache.get_many(owner, ['a']) == [None]
+        assert cache.stats()['expirations'] == 1
+    
+    def test_invalidated_by_new_owner(self):
+        """Test binding a different model clears the cache"""
+        first, second = object(), object()
+        cache = PredictionCache()
+        cache.get_many(first, [])
+        cache.put_many(first, ['a'], [1])
+        
+        assert cache.get_many(second, ['a']) == [None]
+        assert cache.stats()['invalidations'] == 1
+        
+        # Late results from the replaced model are discarded
+        cache.put_many(first, ['a'], [1])
+        assert cache.get_many(second, ['a']) == [None]
+
+class TestCropModelCache:
+    """Test the cache in front of CropModel predictions"""
+    
+    def test_hit_skips_inference(self, monkeypatch):
+        """Test a repeated input is answered without running the forest"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        test_input = {
+            'N': 90, 'P': 42, 'K': 43,
+            'temperature': 20.87, 'humidity': 82.00,
+            'ph': 6.50, 'rainfall': 202.93
+        }
+        first = model.predict(test_input)
+        
+        def fail(*args):
+            raise AssertionError("forest evaluated on a cache hit")
+        monkeypatch.setattr(model.engine, "predict", fail)
+        
+        assert model.predict({**test_input, 'N': 90.2}) == first
+        assert model.cache.stats()['hits'] == 1
+    
+    def test_invalidated_on_retrain(self):
+        """Test a new model version does not serve cached predictions"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        test_input = {
+            'N': 90, 'P': 42, 'K': 43,
+            'temperature': 20.87, 'humidity': 82.00,
+            'ph': 6.50, 'rainfall': 202.93
+        }
+        model.predict(test_input)
+        
+        model.train(test_size=0.3, random_state=7)
+        model.predict(test_input)
+        
+        stats = model.cache.stats()
+        assert stats['hits'] == 0
+        assert stats['invalidations'] == 1
+    
+    def test_keys_include_version_and_mode(self):
+        """Test entries are keyed on the model version and serving mode as well as the inputs"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        model.predict({'N': 90, 'P': 42, 'K': 43, 'temperature': 20.87, 'humidity': 82.00,
+                       'ph': 6.50, 'rainfall': 202.93})
+        
+        key = next(iter(model.cache._entries))
+        assert key[:3] == (model.version, 'full', 'forest')
+    
+    def test_late_result_from_replaced_model_not_cached(self, monkeypatch):
+        """Test a prediction finished after a reload is returned but not cached"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        old = model.snapshot
+        model.train(test_size=0.3, random_state=7)
+        new = model.snapshot
+        model._snapshot = old
+        evaluate = model._evaluate
+        
+        def reload_during(snapshot, X, early_exit=False):
+            results = evaluate(snapshot, X, early_exit)
+            model._snapshot = new
+            model.cache.clear()
+            return results
+        monkeypatch.setattr(model, "_evaluate", reload_during)
+        
+        result = model.predict({'N': 90, 'P': 42, 'K': 43, 'temperature': 20.87, 'humidity': 82.00,
+                                'ph': 6.50, 'rainfall': 202.93})
+        
+        assert result['crop'] in old.label_encoder.classes_
+        assert model.cache.stats()['size'] == 0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import pytest
+import json
+import numpy as np
+import sys
+from pathlib import Path
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src import compaction
+from src.compaction import accuracy, compact, compact_forest, greedy_tree_order
+from src.config import settings
+from src.inference import CompiledForest
+from src.model import CropModel
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=900, n_features=8, n_informative=6, n_classes=4, random_state=0)
+    return X[:600], y[:600], X[600:], y[600:]
+
+@pytest.fixture
+def engine(data):
+    X_train, y_train, _, _ = data
+    forest = RandomForestClassifier(n_estimators=30, max_depth=12, random_state=42).fit(X_train, y_train)
+    return CompiledForest.from_estimator(forest)
+
+class TestCompaction:
+    """Test cases for forest pruning and compaction"""
+    
+    def test_collapsing_keeps_single_tree_predictions(self, engine, data):
+        """Test merging agreeing leaves never changes what a tree predicts"""
+        _, _, X_val, _ = data
+        for tree in (0, 7):
+            original = compact_forest(engine, [tree])
+            leaves = engine.apply(X_val)[:, tree]
+            expected = engine.classes[np.argmax(engine.value[leaves], axis=1)]
+            
+            labels, _ = original.predict(X_val)
+            np.testing.assert_array_equal(labels, expected)
+    
+    def test_collapsing_shrinks_trees(self, engine):
+        """Test subtrees whose leaves agree are replaced by a single leaf"""
+        compacted = compact_forest(engine, range(engine.n_estimators))
+        
+        assert compacted.n_estimators == engine.n_estimators
+        assert compacted.n_nodes < engine.n_nodes
+        assert compacted.max_depth <= engine.max_depth
+    
+    def test_greedy_order_covers_all_trees(self, engine, data):
+        """Test greedy selection ends at the full forest's accuracy"""
+        _, _, X_val, y_val = data
+        order, curve = greedy_tree_order(engine, X_val, y_val)
+        
+        assert sorted(order) == list(range(engine.n_estimators))
+        assert curve[-1] == pytest.approx(accuracy(engine, X_val, y_val))
+    
+    def test_stops_within_accuracy_loss(self, engine, data):
+        """Test the fewest trees within the allowed loss are kept"""
+        _, _, X_val, y_val = data
+        compacted, details = compact(engine, X_val, y_val, max_accuracy_loss=0.02)
+        
+        assert details['stopped_by'] == "accuracy"
+        assert compacted.n_estimators < engine.n_estimators
+        assert details['greedy_accuracy_curve'][compacted.n_estimators - 1] >= details['baseline_accuracy'] - 0.02
+    
+    @pytest.mark.parametrize("max_accuracy_loss", [0.0, 0.01, 0.02])
+    def test_collapsed_forest_meets_accuracy_bound(self, engine, data, max_accuracy_loss):
+        """Test the forest actually returned, after collapsing, is within the allowed loss"""
+        _, _, X_val, y_val = data
+        compacted, details = compact(engine, X_val, y_val, max_accuracy_loss=max_accuracy_loss)
+        
+        assert accuracy(compacted, X_val, y_val) >= details['baseline_accuracy'] - max_accuracy_loss
+        assert details['compacted_accuracy'] == accuracy(compacted, X_val, y_val)
+    
+    def test_collapsing_that_breaks_bound_is_undone(self, engine, data, monkeypatch):
+        """Test trees are kept uncollapsed when no collapsed prefix meets the bound"""
+        _, _, X_val, y_val = data
+        def ruinous_collapse(engine, trees, collapse=True):
+            # Stand-in for collapsing that ruins the soft vote: every collapsed forest is a single tree
+            return compact_forest(engine, list(trees)[:1] if collapse else trees, collapse=False)
+        monkeypatch.setattr(compaction, "compact_forest", ruinous_collapse)
+        
+        compacted, details = compact(engine, X_val, y_val, max_accuracy_loss=0.01)
+        
+        assert not details['collapsed']
+        assert compacted.n_estimators == details['trees_selected'] > 1
+        assert details['compacted_accuracy'] >= details['baseline_accuracy'] - 0.01
+    
+    def test_greedy_order_in_row_blocks(self, engine, data):
+        """Test gathering candidate votes in small row blocks gives the same order"""
+        _, _, X_val, y_val = data
+        
+        assert greedy_tree_order(engine, X_val, y_val, max_elements=500) == greedy_tree_order(engine, X_val, y_val)
+    
+    def test_stops_at_latency_budget(self, engine, data):
+        """Test a latency budget cuts the forest further than the accuracy target"""
+        _, _, X_val, y_val = data
+        compacted, details = compact(
+            engine, X_val, y_val, max_accuracy_loss=0.0,
+            target_latency_ms=3, measure=lambda candidate: candidate.n_estimators
+        )
+        
+        assert details['stopped_by'] == "latency"
+        assert compacted.n_estimators == 3
+    
+    def test_model_compact_artifact_is_served(self, monkeypatch):
+        """Test CropModel.compact saves a separate artifact that can be served"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+        
+        result = model.compact(max_accuracy_loss=0.0, test_size=0.3, random_state=42)
+        
+        compact_dir = Path(result['path'])
+        with open(compact_dir / "compaction.json") as f:
+            metadata = json.load(f)
+        assert set(metadata['before']) == set(metadata['after'])
+        assert metadata['after']['n_nodes'] <= metadata['before']['n_nodes']
+        assert model.registry.artifact_path(model.version).exists()
+        
+        monkeypatch.setattr(settings, "MODEL_SERVE_COMPACT", True)
+        served = CropModel()
+        assert served.load_model()
+        assert served.engine.n_nodes == metadata['after']['n_nodes']
+        assert served.predict({"N": 90, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82,
+                               "ph": 6.5, "rainfall": 202.9})['crop']
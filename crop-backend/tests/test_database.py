@@ -0,0 +1,92 @@
+import pytest
+import time
+import sys
+from pathlib import Path
+from pymongo.errors import ServerSelectionTimeoutError
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.database import CircuitBreaker, DatabaseManager, parse_write_concern_w
+from src.prediction_store import PredictionStore
+
+class UnreachableClient:
+    """Client whose commands fail as if the server were down"""
+    
+    class admin:
+        @staticmethod
+        def command(name):
+            raise ServerSelectionTimeoutError("no servers available")
+
+class TestCircuitBreaker:
+    """Test cases for the database circuit breaker"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the breaker rejects calls once the failure threshold is reached"""
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+        
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.stats()['rejected'] == 1
+    
+    def test_success_resets_failure_count(self):
+        """Test failures must be consecutive to open the breaker"""
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+        
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_half_open_allows_single_trial(self):
+        """Test one trial call is let through after the cooldown"""
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        assert not breaker.allow()
+        
+        time.sleep(0.06)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow()
+    
+    def test_failed_trial_reopens(self):
+        """Test a failing trial call starts a new cooldown"""
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        
+        assert breaker.allow()
+        breaker.record_failure()
+        
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()['times_opened'] == 2
+
+class TestDatabaseManager:
+    """Test cases for database manager write protection"""
+    
+    def test_ping_failure_opens_breaker(self):
+        """Test a failed startup ping counts against the circuit breaker"""
+        manager = DatabaseManager()
+        manager.breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+        manager.client = UnreachableClient()
+        
+        assert not manager.ping()
+        assert not manager.connected
+        assert manager.stats()['circuit_breaker']['state'] == CircuitBreaker.OPEN
+        assert PredictionStore(manager).save_predictions([{"input_data": {"N": 1}, "prediction": "rice"}]) == []
+    
+    def test_parse_write_concern(self):
+        """Test numeric and tag write concerns are both accepted"""
+        assert parse_write_concern_w("1") == 1
+        assert parse_write_concern_w("majority") == "majority"
@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src import dataset_cache, preprocessing
+from src.config import settings
+from src.dataset_cache import DatasetCache, load_training_data
+from src.model import CropModel
+from src.preprocessing import create_sample_data, load_and_clean_data, prepare_features_target
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    path = tmp_path / "data"
+    path.mkdir()
+    monkeypatch.setattr(settings, "DATA_PATH", str(path))
+    monkeypatch.setattr(settings, "LABELLED_DATA_PATH", str(path / "labelled_rows.csv"))
+    create_sample_data().to_csv(path / "Crop_recommendation.csv", index=False)
+    return path
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+    def counting_load():
+        calls.append(1)
+        return load_and_clean_data()
+    monkeypatch.setattr(dataset_cache, "load_and_clean_data", counting_load)
+    return calls
+
+class TestDatasetCache:
+    """Test cases for the cached training dataset"""
+
+    def test_hit_skips_parsing(self, data_dir, builds):
+        """Test a second load maps the stored arrays instead of re-reading the CSVs"""
+        X, y = DatasetCache().load()
+        cached_X, cached_y = DatasetCache().load()
+        expected_X, expected_y = prepare_features_target(load_and_clean_data())
+
+        assert len(builds) == 1
+        np.testing.assert_array_equal(cached_X.values, expected_X.values.astype(np.float64))
+        assert cached_y.tolist() == expected_y.astype(str).tolist()
+        assert list(cached_X.columns) == list(expected_X.columns)
+        assert isinstance(np.load(DatasetCache().entries()[0] / "X.npy", mmap_mode='r'), np.memmap)
+
+    def test_changed_source_rebuilds(self, data_dir, builds):
+        """Test editing a source file or adding one selects a new entry"""
+        cache = DatasetCache()
+        first = cache.key()
+        cache.load()
+
+        df = create_sample_data().head(500)
+        df.to_csv(data_dir / "Crop_recommendation.csv", index=False)
+        X, _ = cache.load()
+        assert cache.key() != first and len(X) == 500
+
+        df.head(10).to_csv(data_dir / "indian_crops.csv", index=False)
+        X, _ = cache.load()
+        assert len(X) == 500 + 10 - df.head(10).duplicated().sum() and len(builds) == 3
+
+    def test_cleaning_version_changes_key(self, data_dir, monkeypatch):
+        """Test bumping the cleaning code version invalidates cached entries"""
+        key = DatasetCache().key()
+        monkeypatch.setattr(dataset_cache, "CLEANING_VERSION", dataset_cache.CLEANING_VERSION + 1)
+        assert DatasetCache().key() != key
+
+    def test_key_follows_loaded_files(self, data_dir, monkeypatch):
+        """Test the files hashed for the key are the files the loader reads"""
+        monkeypatch.setattr(preprocessing, "SOURCE_FILES", ("crops.csv", "indian_crops.csv", "sentinel_ndvi.csv"))
+        create_sample_data().head(300).to_csv(data_dir / "crops.csv", index=False)
+
+        hashes = DatasetCache().source_hashes()
+        X, _ = DatasetCache().load()
+
+        assert hashes[str(data_dir / "crops.csv")] is not None
+        assert str(data_dir / "Crop_recommendation.csv") not in hashes
+        assert len(X) == 300
+
+    def test_unchanged_files_are_not_rehashed(self, data_dir, monkeypatch):
+        """Test content hashes are reused while a file's size and mtime are unchanged"""
+        DatasetCache().source_hashes()
+        hashed = []
+        monkeypatch.setattr(dataset_cache, "file_sha256", lambda path: hashed.append(path) or "changed")
+
+        DatasetCache().source_hashes()
+        assert hashed == []
+
+        (data_dir / "Crop_recommendation.csv").write_text("N,label\n1,rice\n")
+        assert "changed" in DatasetCache().source_hashes().values()
+
+    def test_prune_keeps_recent_entries(self, data_dir):
+        """Test old entries beyond the limit are deleted"""
+        cache = DatasetCache(max_entries=2)
+        for rows in (300, 400, 500):
+            create_sample_data().head(rows).to_csv(data_dir / "Crop_recommendation.csv", index=False)
+            cache.load()
+
+        assert len(cache.entries()) == 2
+
+    def test_training_matches_uncached(self, data_dir, monkeypatch):
+        """Test training on cached data gives the same model as parsing the CSVs"""
+        cached = CropModel().train(test_size=0.3, random_state=42, evaluation="none")
+        monkeypatch.setattr(settings, "DATASET_CACHE_ENABLED", False)
+        uncached = CropModel().train(test_size=0.3, random_state=42, evaluation="none")
+
+        assert cached['test_accuracy'] == uncached['test_accuracy']
+        assert cached['feature_importance'] == uncached['feature_importance']
+        assert load_training_data()[0].shape == DatasetCache().load()[0].shape
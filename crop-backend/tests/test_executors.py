@@ -0,0 +1,46 @@
+import pytest
+import asyncio
+import threading
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.executors import BoundedExecutor, ExecutorSaturatedError
+
+class TestBoundedExecutor:
+    """Test cases for the bounded executor pools"""
+    
+    def test_run_returns_result(self):
+        """Test awaiting work in the pool returns its result and records metrics"""
+        pool = BoundedExecutor("test", max_workers=2, max_queue=2)
+        
+        async def run():
+            return await asyncio.gather(*(pool.run(pow, i, 2) for i in range(4)))
+        
+        assert asyncio.run(run()) == [0, 1, 4, 9]
+        pool.shutdown()
+        
+        stats = pool.stats()
+        assert stats['submitted'] == 4
+        assert stats['completed'] == 4
+        assert stats['active'] == 0
+    
+    def test_rejects_when_saturated(self):
+        """Test submissions beyond workers plus queue are rejected"""
+        pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+        release = threading.Event()
+        
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(ExecutorSaturatedError):
+            pool.submit(release.wait)
+        
+        assert pool.stats()['rejected'] == 1
+        assert pool.stats()['queued'] == 1
+        release.set()
+        pool.shutdown()
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
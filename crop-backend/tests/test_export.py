@@ -0,0 +1,129 @@
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.export import PredictionExporter
+
+def matches(document, query):
+    """Evaluate the subset of MongoDB query syntax the exporter uses"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            for op, value in condition.items():
+                if op == '$lt' and not document[key] < value:
+                    return False
+                if op == '$gt' and not document[key] > value:
+                    return False
+        elif document[key] != condition:
+            return False
+    return True
+
+class FakeCursor(list):
+    def sort(self, keys):
+        return FakeCursor(sorted(self, key=lambda doc: tuple(doc[key] for key, _ in keys)))
+    
+    def batch_size(self, n):
+        return self
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+    
+    def find(self, query, projection=None):
+        return FakeCursor(doc for doc in self.documents if matches(doc, query))
+
+class FakeStore:
+    """Prediction store holding compact documents in memory"""
+    
+    collection_name = "history"
+    features = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall', 'ndvi']
+    
+    def __init__(self):
+        self.collection = FakeCollection()
+        self.db_manager = type("Manager", (), {"database": {"history": self.collection}})()
+    
+    def initialize(self):
+        pass
+    
+    def label_for(self, code):
+        return ["rice", "maize"][code]
+    
+    def add(self, timestamp, crop_code, n):
+        self.collection.documents.append({
+            '_id': ObjectId(), 'ts': timestamp, 'm': {'c': crop_code, 'v': "v1"},
+            'x': [n, 42, 43, 20.9, 82.0, 6.5, 202.9, None], 'p': 0.9
+        })
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+def read_dataset(directory):
+    return pq.read_table(directory).to_pandas()
+
+class TestPredictionExporter:
+    """Test cases for the incremental Parquet export"""
+    
+    def test_exports_partitioned_by_date(self, store, tmp_path):
+        """Test rows land in one partition per date, one row group per batch"""
+        day = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) - timedelta(days=2)
+        for i in range(5):
+            store.add(day + timedelta(minutes=i), i % 2, i)
+        for i in range(3):
+            store.add(day + timedelta(days=1, minutes=i), 0, 10 + i)
+        
+        exporter = PredictionExporter(store, tmp_path, batch_size=2, lag_seconds=0)
+        result = exporter.export()
+        
+        assert result['rows'] == 8
+        assert result['partitions'] == 2
+        partitions = sorted(path.name for path in tmp_path.iterdir() if path.is_dir())
+        assert partitions == [f"date={day.date()}", f"date={(day + timedelta(days=1)).date()}"]
+        
+        first_day = pq.ParquetFile(next((tmp_path / partitions[0]).glob("part-*.parquet")))
+        assert first_day.metadata.num_rows == 5
+        assert first_day.metadata.num_row_groups == 3
+        
+        data = read_dataset(tmp_path)
+        assert sorted(data['N']) == [0, 1, 2, 3, 4, 10, 11, 12]
+        assert set(data['crop']) == {"rice", "maize"}
+        assert data['ndvi'].isna().all()
+        assert not list(tmp_path.rglob("*.tmp"))
+    
+    def test_runs_are_incremental(self, store, tmp_path):
+        """Test a second run only exports documents after the high-water mark"""
+        start = datetime.now() - timedelta(hours=1)
+        for i in range(3):
+            store.add(start + timedelta(minutes=i), 0, i)
+        exporter = PredictionExporter(store, tmp_path, batch_size=100, lag_seconds=0)
+        exporter.export()
+        
+        # Same timestamp as the high-water mark but a later _id, plus a newer row
+        store.add(start + timedelta(minutes=2), 1, 100)
+        store.add(start + timedelta(minutes=5), 1, 101)
+        
+        result = exporter.export()
+        assert result['rows'] == 2
+        assert exporter.export()['rows'] == 0
+        assert sorted(read_dataset(tmp_path)['N']) == [0, 1, 2, 100, 101]
+    
+    def test_recent_rows_wait_for_next_run(self, store, tmp_path):
+        """Test predictions inside the lag window are left for later"""
+        store.add(datetime.now() - timedelta(hours=1), 0, 1)
+        store.add(datetime.now(), 0, 2)
+        
+        exporter = PredictionExporter(store, tmp_path, lag_seconds=600)
+        
+        assert exporter.export()['rows'] == 1
+        assert exporter.status()['last_result']['status'] == "completed"
@@ -0,0 +1,139 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.config import settings
+from src.incremental import grow_forest, log_watermark, read_since, sample_replay
+from src.model import CropModel
+
+CROPS = ['rice', 'wheat', 'corn', 'cotton', 'sugarcane', 'jute', 'coconut', 'papaya', 'orange', 'apple']
+
+def labelled_rows(n, start, seed, crops=CROPS):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'N': rng.integers(0, 150, n), 'P': rng.integers(0, 150, n), 'K': rng.integers(0, 210, n),
+        'temperature': rng.uniform(8, 45, n), 'humidity': rng.uniform(14, 100, n),
+        'ph': rng.uniform(3.5, 10, n), 'rainfall': rng.uniform(20, 300, n),
+        'label': rng.choice(crops, n),
+        'collected_at': pd.date_range(start, periods=n, freq="min").strftime("%Y-%m-%dT%H:%M:%S")
+    })
+
+def append(path, df):
+    df.to_csv(path, mode="a", header=not path.exists(), index=False)
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = tmp_path / "labelled_rows.csv"
+    monkeypatch.setattr(settings, "LABELLED_DATA_PATH", str(path))
+    return path
+
+class TestIncremental:
+    """Test cases for warm-start incremental training"""
+
+    def test_read_since_returns_only_appended_rows(self, log_path):
+        """Test rows after the watermark are read, and a partly written line waits"""
+        append(log_path, labelled_rows(5, "2024-01-01", 0))
+        watermark = log_watermark(log_path)
+        append(log_path, labelled_rows(3, "2024-02-01", 1))
+        with open(log_path, "a") as f:
+            f.write("1,2,3")
+
+        df, next_watermark = read_since(log_path, watermark)
+
+        assert len(df) == 3
+        assert next_watermark['collected_at'] == "2024-02-01T00:02:00"
+        assert next_watermark['offset'] < log_path.stat().st_size
+        assert read_since(log_path, next_watermark)[0].empty
+
+    def test_rewritten_log_filters_on_timestamp(self, log_path):
+        """Test a log shorter than the watermark is re-read and filtered by collected_at"""
+        append(log_path, labelled_rows(20, "2024-01-01", 0))
+        watermark = log_watermark(log_path)
+        log_path.unlink()
+        append(log_path, labelled_rows(4, "2024-01-01T00:18", 2))
+
+        df, _ = read_since(log_path, watermark)
+
+        assert df['collected_at'].tolist() == ["2024-01-01T00:20:00", "2024-01-01T00:21:00"]
+
+    def test_rewritten_log_of_same_length_is_detected(self, log_path):
+        """Test a log rewritten past the watermark's offset is noticed by its head hash"""
+        append(log_path, labelled_rows(20, "2024-01-01", 0))
+        watermark = log_watermark(log_path)
+        log_path.unlink()
+        append(log_path, labelled_rows(30, "2024-01-01T00:15", 3))
+        assert log_path.stat().st_size > watermark['offset']
+
+        df, next_watermark = read_since(log_path, watermark)
+
+        assert len(df) == 30 - 5
+        assert df['collected_at'].min() == "2024-01-01T00:20:00"
+        assert next_watermark == log_watermark(log_path)
+
+    def test_watermark_without_head_hash_reads_from_offset(self, log_path):
+        """Test watermarks saved before head hashes still read only appended rows"""
+        append(log_path, labelled_rows(5, "2024-01-01", 0))
+        watermark = log_watermark(log_path)
+        del watermark['head_sha256']
+        append(log_path, labelled_rows(3, "2024-02-01", 1))
+
+        df, next_watermark = read_since(log_path, watermark)
+
+        assert len(df) == 3
+        assert 'head_sha256' in next_watermark
+
+    def test_sample_replay_keeps_every_class(self):
+        """Test the replay sample is capped and keeps rare classes"""
+        y = np.array([0] * 500 + [1] * 500 + [2] * 3)
+        X = np.arange(len(y))[:, None]
+
+        replay_X, replay_y = sample_replay(X, y, max_rows=60)
+
+        assert len(replay_y) <= 60
+        assert set(replay_y) == {0, 1, 2}
+
+    def test_grow_forest_replaces_oldest_trees(self):
+        """Test new trees are appended, the oldest retired and the original left serving"""
+        X, y = make_classification(n_samples=300, n_features=6, n_informative=4, n_classes=3, random_state=0)
+        forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        original = list(forest.estimators_)
+
+        grown = grow_forest(forest, X[:100], y[:100], n_new=4, random_state=1, n_jobs=1)
+
+        assert len(grown.estimators_) == grown.n_estimators == 10
+        assert grown.estimators_[:6] == original[4:]
+        assert not any(tree in original for tree in grown.estimators_[6:])
+        assert forest.estimators_ == original and not forest.warm_start
+        with pytest.raises(ValueError, match="classes"):
+            grow_forest(forest, X[y != 2], y[y != 2], n_new=4, random_state=1)
+
+    def test_train_incremental_registers_new_version(self, log_path):
+        """Test only new rows are used and the result becomes the active version"""
+        append(log_path, labelled_rows(50, "2024-01-01", 0))
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+        first_version = model.version
+        trees = list(model.model.estimators_)
+
+        append(log_path, labelled_rows(40, "2024-03-01", 1))
+        append(log_path, labelled_rows(2, "2024-03-02", 2, crops=["quinoa"]))
+        results = model.train_incremental(test_size=0.25, random_state=42, n_trees=5)
+
+        assert results['new_rows'] == 42
+        assert results['train_rows'] == 30 and results['trees_replaced'] == 5
+        assert model.model.estimators_[:-5] == trees[5:]
+        assert 0.0 <= results['holdout_accuracy'] <= 1.0
+        assert results['previous_version'] == first_version
+
+        served = CropModel()
+        assert served.load_model()
+        assert served.version == model.version != first_version
+        assert served.registry.metadata(served.version)['watermark']['collected_at'] == "2024-03-02T00:01:00"
+        assert served.train_incremental() is None
@@ -0,0 +1,154 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+from sklearn.ensemble import RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.inference import EXIT_REASONS, CompiledForest
+from src.model import CropModel
+from src.config import settings
+
+class TestCompiledForest:
+    """Test cases for the compiled forest inference engine"""
+    
+    @pytest.fixture
+    def forest(self):
+        """Fit a small forest on random data"""
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 100, size=(500, 8))
+        y = rng.integers(0, 5, size=500)
+        return RandomForestClassifier(
+            n_estimators=20, max_depth=10, min_samples_leaf=2, random_state=42
+        ).fit(X, y)
+    
+    @pytest.fixture
+    def test_matrix(self):
+        """Create unseen rows for evaluation"""
+        return np.random.default_rng(1).uniform(0, 100, size=(300, 8))
+    
+    def test_matches_sklearn_probabilities(self, forest, test_matrix):
+        """Test compiled probabilities match sklearn predict_proba"""
+        compiled = CompiledForest.from_estimator(forest)
+        np.testing.assert_allclose(
+            compiled.predict_proba(test_matrix), forest.predict_proba(test_matrix), atol=1e-12
+        )
+    
+    def test_matches_sklearn_labels(self, forest, test_matrix):
+        """Test compiled labels match sklearn predict"""
+        compiled = CompiledForest.from_estimator(forest)
+        labels, proba = compiled.predict(test_matrix)
+        np.testing.assert_array_equal(labels, forest.predict(test_matrix))
+        assert proba.shape == (len(test_matrix), len(forest.classes_))
+    
+    def test_single_row(self, forest, test_matrix):
+        """Test a single row gives the same result as in a batch"""
+        compiled = CompiledForest.from_estimator(forest)
+        _, batch_proba = compiled.predict(test_matrix)
+        _, row_proba = compiled.predict(test_matrix[5:6])
+        np.testing.assert_allclose(row_proba[0], batch_proba[5])
+    
+    def test_chunked_batches(self, forest, test_matrix):
+        """Test chunked evaluation gives the same result as one pass"""
+        compiled = CompiledForest.from_estimator(forest)
+        np.testing.assert_allclose(
+            compiled.predict_proba(test_matrix, chunk_size=7), compiled.predict_proba(test_matrix)
+        )
+
+class TestAnytimeInference:
+    """Test cases for early-exit evaluation of the compiled forest"""
+    
+    @pytest.fixture
+    def compiled(self):
+        """Compile a forest on separable data so most rows settle early"""
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 100, size=(600, 4))
+        y = (X[:, 0] // 34).astype(int)
+        forest = RandomForestClassifier(n_estimators=60, max_depth=8, random_state=42).fit(X, y)
+        return CompiledForest.from_estimator(forest)
+    
+    @pytest.fixture
+    def test_matrix(self):
+        return np.random.default_rng(1).uniform(0, 100, size=(400, 4))
+    
+    def test_exact_exits_keep_the_full_label(self, compiled, test_matrix):
+        """Test rows leaving on the exact bound get the full forest's label"""
+        expected, _ = compiled.predict(test_matrix)
+        labels, proba, trees_used, reasons = compiled.predict_anytime(test_matrix, check_every=5)
+        
+        np.testing.assert_array_equal(labels, expected)
+        assert set(np.unique(reasons)) <= {EXIT_REASONS.index('exact'), EXIT_REASONS.index('full')}
+        assert (trees_used[reasons == EXIT_REASONS.index('exact')] < compiled.n_estimators).all()
+        # A unanimous leader can only be certain once more than half the trees have voted
+        assert (trees_used > compiled.n_estimators / 2).all()
+        assert trees_used.mean() < compiled.n_estimators * 0.75
+        np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    
+    def test_full_rows_match_full_probabilities(self, compiled, test_matrix):
+        """Test rows that never settle are evaluated on every tree"""
+        _, full_proba = compiled.predict(test_matrix)
+        _, proba, trees_used, reasons = compiled.predict_anytime(test_matrix, check_every=5)
+        
+        full = reasons == EXIT_REASONS.index('full')
+        assert (trees_used[full] == compiled.n_estimators).all()
+        np.testing.assert_allclose(proba[full], full_proba[full])
+    
+    def test_confidence_bound_stops_sooner(self, compiled, test_matrix):
+        """Test a confidence bound exits after min_trees with the leader above it"""
+        _, _, exact_trees, _ = compiled.predict_anytime(test_matrix, check_every=5)
+        _, proba, trees_used, reasons = compiled.predict_anytime(
+            test_matrix, check_every=5, confidence=0.8, min_trees=10
+        )
+        
+        by_confidence = reasons == EXIT_REASONS.index('confidence')
+        assert by_confidence.any()
+        assert (trees_used[by_confidence] >= 10).all()
+        assert (proba[by_confidence].max(axis=1) >= 0.8).all()
+        assert trees_used.sum() <= exact_trees.sum()
+
+class TestCropModelEngine:
+    """Test CropModel predictions through the compiled engine"""
+    
+    def test_predictions_match_sklearn(self):
+        """Test CropModel.predict agrees with the underlying sklearn model"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        
+        rows = [
+            {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.87, 'humidity': 82.00, 'ph': 6.50, 'rainfall': 202.93},
+            {'N': 10, 'P': 120, 'K': 200, 'temperature': 35.0, 'humidity': 20.0, 'ph': 8.2, 'rainfall': 40.0}
+        ]
+        predictions = model.predict(rows)
+        
+        X = pd.DataFrame(rows)[model.feature_columns]
+        expected = model.label_encoder.inverse_transform(model.model.predict(X))
+        expected_proba = model.model.predict_proba(X)
+        
+        for prediction, crop, proba in zip(predictions, expected, expected_proba):
+            assert prediction['crop'] == crop
+            assert prediction['confidence'] == pytest.approx(proba.max())
+    
+    def test_early_exit_results(self, monkeypatch):
+        """Test early-exit predictions report the trees used and keep exact-bound labels"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42)
+        rows = [
+            {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.87, 'humidity': 82.00, 'ph': 6.50, 'rainfall': 202.93},
+            {'N': 10, 'P': 120, 'K': 200, 'temperature': 35.0, 'humidity': 20.0, 'ph': 8.2, 'rainfall': 40.0}
+        ]
+        
+        full = model.predict_batch(rows, early_exit=False)
+        anytime = model.predict_batch(rows, early_exit=True)
+        for full_result, result in zip(full, anytime):
+            assert full_result['trees_used'] == model.engine.n_estimators
+            assert 'exit_reason' not in full_result
+            assert 1 <= result['trees_used'] <= model.engine.n_estimators
+            assert result['exit_reason'] in ('exact', 'full')
+            assert result['crop'] == full_result['crop']
+        
+        # The global setting applies when a caller does not choose
+        monkeypatch.setattr(settings, "EARLY_EXIT_ENABLED", True)
+        assert model.predict_batch(rows) == anytime
@@ -0,0 +1,164 @@
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.config import settings
+from src import dataset_cache
+from src.dataset_cache import DatasetCache
+from src.ingestion import DigestSet, ingest, store_metadata, store_to_arrays
+from src.model import CropModel
+from src.preprocessing import CLEANING_VERSION, create_sample_data, load_and_clean_data, prepare_features_target
+
+@pytest.fixture
+def sources(tmp_path):
+    df = create_sample_data()
+    first, second = tmp_path / "2022.csv", tmp_path / "2023.csv"
+    # The second export repeats 100 rows of the first and has out-of-range and missing values
+    broken = df.iloc[600:700].copy()
+    broken.loc[broken.index[:10], 'ph'] = 15.0
+    broken.loc[broken.index[10:15], 'humidity'] = np.nan
+    df.iloc[:600].to_csv(first, index=False)
+    pd.concat([df.iloc[500:600], broken, df.iloc[700:]]).to_csv(second, index=False)
+    return [first, second], df
+
+def append_labelled(path, n, start, seed, crops=('rice', 'wheat', 'corn')):
+    """Append n collected labelled rows to the log at path"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'N': rng.integers(0, 150, n), 'P': rng.integers(0, 150, n), 'K': rng.integers(0, 210, n),
+        'temperature': rng.uniform(8, 45, n), 'humidity': rng.uniform(14, 100, n),
+        'ph': rng.uniform(3.5, 10, n), 'rainfall': rng.uniform(20, 300, n),
+        'label': rng.choice(crops, n),
+        'collected_at': pd.date_range(start, periods=n, freq="min").strftime("%Y-%m-%dT%H:%M:%S")
+    })
+    df.to_csv(path, mode="a", header=not path.exists(), index=False)
+
+class TestIngestion:
+    """Test cases for streaming ingestion"""
+
+    def test_digest_set(self):
+        """Test membership across merged blocks"""
+        digests = DigestSet()
+        for start in range(0, 1000, 100):
+            digests.add(np.arange(start, start + 100, dtype=np.uint64) * 7)
+
+        assert len(digests) == 1000 and digests.nbytes == 8000
+        assert len(digests._blocks) <= 4
+        found = digests.contains(np.array([0, 7, 6993, 8, 7000], dtype=np.uint64))
+        assert found.tolist() == [True, True, True, False, False]
+
+    @pytest.mark.parametrize("chunk_size", [64, 10000])
+    def test_ingest_filters_and_dedups_across_chunks(self, sources, tmp_path, chunk_size):
+        """Test invalid rows and rows repeated in later chunks or files are dropped"""
+        paths, df = sources
+        output = tmp_path / "store" / "crops.parquet"
+
+        result = ingest(paths, output, chunk_size=chunk_size)
+
+        stored = pq.read_table(output).to_pandas()
+        assert result['rows_read'] == 1100
+        assert result['dropped_duplicates'] == 100
+        assert result['dropped_invalid'] == 15
+        assert len(stored) == result['rows_written'] == 985
+        assert not stored.duplicated().any()
+        assert pq.ParquetFile(output).metadata.num_row_groups >= (1100 // chunk_size)
+        for totals in result['stages'].values():
+            assert totals['rows'] > 0 and totals['rows_per_second'] > 0
+
+    def test_store_to_arrays(self, sources, tmp_path):
+        """Test the store is copied into feature and label-code arrays in batches"""
+        paths, _ = sources
+        output = tmp_path / "crops.parquet"
+        ingest(paths, output)
+        stored = pq.read_table(output).to_pandas()
+
+        columns, classes, rows = store_to_arrays(output, tmp_path / "X.npy", tmp_path / "labels.npy",
+                                                 batch_size=100)
+
+        X, codes = np.load(tmp_path / "X.npy"), np.load(tmp_path / "labels.npy")
+        assert rows == len(stored) and columns == list(stored.columns[:-1])
+        np.testing.assert_array_equal(X, stored[columns].values)
+        assert np.asarray(classes, dtype=object)[codes].tolist() == stored['label'].tolist()
+
+    def test_training_reads_ingested_store(self, sources, tmp_path):
+        """Test the dataset cache and training use the store when it exists"""
+        paths, _ = sources
+        ingest(paths, settings.INGESTED_DATA_PATH)
+
+        X, y = DatasetCache().load()
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+
+        assert len(X) == len(y) == 985
+        assert model.feature_columns == ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+    def test_store_matches_loader_cleaning(self, tmp_path, monkeypatch):
+        """Test the store keeps the rows and feature columns load_and_clean_data does"""
+        monkeypatch.setattr(settings, "DATA_PATH", str(tmp_path))
+        monkeypatch.setattr(settings, "LABELLED_DATA_PATH", str(tmp_path / "labelled_rows.csv"))
+        df = create_sample_data()
+        df['ndvi'] = np.linspace(0.1, 0.9, len(df))
+        # Outside the API's input ranges but accepted by clean_data
+        df.loc[:9, 'N'] = 250
+        df.loc[10:14, 'ph'] = 15.0
+        source = tmp_path / "Crop_recommendation.csv"
+        df.to_csv(source, index=False)
+        expected_X, expected_y = prepare_features_target(load_and_clean_data())
+
+        result = ingest([source], settings.INGESTED_DATA_PATH)
+        X, y = DatasetCache().load()
+
+        assert result['dropped_invalid'] == 5
+        assert list(X.columns) == list(expected_X.columns) == result['columns']
+        np.testing.assert_array_equal(X.values, expected_X.values)
+        assert y.tolist() == expected_y.tolist()
+        assert store_metadata(settings.INGESTED_DATA_PATH)['cleaning_version'] == CLEANING_VERSION
+
+    def test_sentinel_adds_ndvi(self, sources, tmp_path):
+        """Test the store gets the NDVI column the loader adds when Sentinel data is present"""
+        paths, _ = sources
+        sentinel = tmp_path / "sentinel_ndvi.csv"
+        sentinel.write_text("ndvi\n0.5\n")
+
+        result = ingest(paths, tmp_path / "crops.parquet", sentinel_path=sentinel)
+
+        stored = pq.read_table(tmp_path / "crops.parquet").to_pandas()
+        assert result['columns'][-1] == 'ndvi' and stored['ndvi'].between(0.1, 0.9).all()
+        assert store_metadata(tmp_path / "crops.parquet")['sentinel_ndvi']
+
+    def test_stale_store_is_ignored(self, sources, monkeypatch):
+        """Test a store ingested under other cleaning rules is not used for training"""
+        paths, _ = sources
+        ingest(paths, settings.INGESTED_DATA_PATH)
+        assert DatasetCache().current_store() is not None
+
+        monkeypatch.setattr(dataset_cache, "CLEANING_VERSION", CLEANING_VERSION + 1)
+        assert DatasetCache().current_store() is None
+
+    def test_labelled_rows_after_ingestion_are_trained(self, sources, tmp_path, monkeypatch):
+        """Test labelled rows appended after ingestion reach full training, and later ones incremental training"""
+        paths, _ = sources
+        log = tmp_path / "labelled_rows.csv"
+        monkeypatch.setattr(settings, "LABELLED_DATA_PATH", str(log))
+        append_labelled(log, 50, "2024-01-01", 0)
+        result = ingest(paths, settings.INGESTED_DATA_PATH, labelled_path=log)
+        assert result['rows_written'] == 985 + 50
+
+        # A crop first collected after ingestion
+        append_labelled(log, 40, "2024-02-01", 1, crops=('mango',))
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+
+        assert len(DatasetCache().load()[0]) == 985 + 50 + 40
+        assert 'mango' in model.label_encoder.classes_
+        assert model.registry.metadata(model.version)['watermark']['offset'] == log.stat().st_size
+
+        append_labelled(log, 30, "2024-03-01", 2)
+        result = model.train_incremental(n_trees=5)
+        assert result['new_rows'] == 30
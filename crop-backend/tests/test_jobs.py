@@ -0,0 +1,150 @@
+import pytest
+import tempfile
+import time
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.api.main import app
+from src.api import routes
+from src.jobs import TrainingJobManager, TrainingJobRejected, planned_stages
+from src.registry import ModelRegistry
+from src.training import shared_arrays_prefix, shared_memory_dir
+from src.config import settings
+
+def wait_until_finished(job, timeout=120):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.1)
+    assert job.finished, f"job still {job.status}"
+    return job
+
+def group_members(pgid):
+    """Live processes in a process group, read from /proc"""
+    members = []
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            state, _, group = stat.read_text().rsplit(")", 1)[1].split()[:3]
+        except OSError:
+            continue
+        if int(group) == pgid and state != "Z":
+            members.append(int(stat.parent.name))
+    return members
+
+def shared_dirs(pid):
+    return list(Path(shared_memory_dir() or tempfile.gettempdir()).glob(f"{shared_arrays_prefix(pid)}*"))
+
+class TestTrainingJobs:
+    """Test cases for background training jobs"""
+
+    def test_planned_stages(self):
+        """Test progress is tracked over the stages the job will run"""
+        assert planned_stages('full', 'cv') == ['load_data', 'fit', 'score', 'cross_validation', 'save']
+        assert planned_stages('full', 'none') == ['load_data', 'fit', 'score', 'save']
+        assert planned_stages('incremental') == ['load_data', 'fit', 'score', 'save']
+
+    def test_job_trains_in_separate_process(self):
+        """Test a job reports every stage, registers a version and calls on_success"""
+        succeeded = []
+        manager = TrainingJobManager(nice=0, on_success=succeeded.append)
+
+        job = wait_until_finished(manager.submit('full', evaluation="none", test_size=0.3))
+
+        assert job.status == "succeeded", job.error
+        status = job.to_dict()
+        assert status['progress'] == 1.0
+        assert all(stage['seconds'] >= 0 for stage in status['stages'])
+        assert job.version == ModelRegistry(Path(settings.MODEL_PATH).parent / "registry").active_version()
+        assert succeeded == [job]
+        assert manager.stats()['succeeded'] == 1
+
+    def test_concurrent_submissions_refused_or_queued(self):
+        """Test a second job is refused with no queue, and queued behind the first otherwise"""
+        manager = TrainingJobManager(max_queue=0, nice=0)
+        first = manager.submit('full', evaluation="none")
+        with pytest.raises(TrainingJobRejected):
+            manager.submit('full', evaluation="none")
+        manager.cancel(first.id)
+        wait_until_finished(first)
+
+        queueing = TrainingJobManager(max_queue=1, nice=0)
+        running = queueing.submit('full', evaluation="none")
+        waiting = queueing.submit('full', evaluation="none")
+        assert waiting.status == "queued"
+        assert queueing.cancel(waiting.id) and waiting.status == "cancelled"
+        queueing.cancel(running.id)
+        wait_until_finished(running)
+        assert not queueing.cancel(running.id)
+
+    def test_cancel_terminates_process(self):
+        """Test cancelling a running job stops its process"""
+        manager = TrainingJobManager(nice=0)
+        job = manager.submit('full', evaluation="cv")
+
+        assert manager.cancel(job.id)
+        wait_until_finished(job)
+
+        assert job.status == "cancelled"
+        assert not job.process.is_alive()
+        assert manager.stats()['running'] is None
+
+    @pytest.mark.skipif(not Path("/proc").is_dir(), reason="reads process groups from /proc")
+    def test_cancel_during_cross_validation_stops_workers(self, monkeypatch):
+        """Test cancelling during cross-validation stops the fold workers and removes their shared arrays"""
+        monkeypatch.setattr(settings, "TRAINING_CV_WORKERS", 2)
+        monkeypatch.setattr(settings, "TRAINING_CV_FOLDS", 20)
+        manager = TrainingJobManager(nice=0)
+        job = manager.submit('full', evaluation="cv")
+        pid = job.process.pid
+
+        deadline = time.time() + 60
+        while not (job.stage == "cross_validation" and len(group_members(pid)) >= 3 and shared_dirs(pid)):
+            assert time.time() < deadline and not job.finished, "fold workers never started"
+            time.sleep(0.05)
+        assert manager.cancel(job.id)
+        wait_until_finished(job)
+
+        assert job.status == "cancelled"
+        assert group_members(pid) == []
+        assert shared_dirs(pid) == []
+
+    def test_timeout_fails_job(self):
+        """Test jobs running past the timeout are terminated and marked failed"""
+        manager = TrainingJobManager(timeout=0.5, nice=0)
+
+        job = wait_until_finished(manager.submit('full', evaluation="cv"))
+
+        assert job.status == "failed"
+        assert "Timed out" in job.error
+
+    def test_errors_are_reported(self):
+        """Test an exception in the job process fails the job with its message"""
+        manager = TrainingJobManager(nice=0)
+
+        job = wait_until_finished(manager.submit('incremental'))
+
+        assert job.status == "failed"
+        assert "No registered model version" in job.error
+
+    def test_api_submit_status_and_cancel(self, monkeypatch):
+        """Test the endpoints return a job ID at once and report and cancel the job"""
+        monkeypatch.setattr(routes, "training_jobs", TrainingJobManager(nice=0))
+        client = TestClient(app)
+
+        response = client.post("/api/v1/model/train", params={"evaluation": "cv"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        status = client.get(f"/api/v1/model/train/{job_id}").json()
+        assert status["status"] == "running"
+        assert [stage["name"] for stage in status["stages"]][-1] == "save"
+        assert client.post("/api/v1/model/train").status_code == 409
+
+        assert client.delete(f"/api/v1/model/train/{job_id}").status_code == 200
+        wait_until_finished(routes.training_jobs.get(job_id))
+        assert client.get(f"/api/v1/model/train/{job_id}").json()["status"] == "cancelled"
+        assert client.delete(f"/api/v1/model/train/{job_id}").status_code == 409
+        assert client.get("/api/v1/model/train/unknown").status_code == 404
@@ -0,0 +1,104 @@
+import pytest
+import json
+import numpy as np
+import sys
+from pathlib import Path
+from sklearn.ensemble import RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.config import settings
+from src.inference import CompiledForest
+from src.lookup import LookupGrid, LookupTable, build_table
+from src.model import CropModel
+
+@pytest.fixture
+def grid():
+    return LookupGrid(['a', 'b'], lows=[0, 0], highs=[100, 10], bins=[20, 5])
+
+@pytest.fixture
+def engine():
+    rng = np.random.default_rng(0)
+    X = rng.uniform([0, 0], [100, 10], size=(600, 2))
+    y = (X[:, 0] // 34).astype(int)
+    forest = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=42).fit(X, y)
+    return CompiledForest.from_estimator(forest)
+
+class TestLookupTable:
+    """Test cases for the precomputed lookup table predictor"""
+
+    def test_cell_index_round_trips_centres(self, grid):
+        """Test every cell centre maps back to its own cell"""
+        cells, inside = grid.cell_index(grid.centers(0, grid.n_cells))
+        np.testing.assert_array_equal(cells, np.arange(grid.n_cells))
+        assert inside.all()
+
+    def test_rows_outside_the_grid(self, grid):
+        """Test out-of-range rows are flagged, and upper bounds stay inside"""
+        _, inside = grid.cell_index(np.array([[100, 10], [-1, 5], [50, 11]]))
+        assert inside.tolist() == [True, False, False]
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_build_matches_forest_at_centres(self, grid, engine, tmp_path, workers):
+        """Test chunked builds, inline or in worker processes, store the forest's answer per cell"""
+        engine_dir = tmp_path / "engine"
+        engine.save(engine_dir)
+        details = build_table(engine, engine_dir, tmp_path, grid, top_k=2, min_margin=0.3,
+                              chunk_size=17, workers=workers)
+        (tmp_path / "lookup.json").write_text(json.dumps({'grid': grid.to_dict(), **details}))
+
+        table = LookupTable.load(tmp_path)
+        labels, proba = engine.predict(grid.centers(0, grid.n_cells))
+        np.testing.assert_array_equal(table.top_classes[:, 0], labels)
+        np.testing.assert_allclose(table.top_proba[:, 0], proba.max(axis=1), rtol=1e-6)
+
+        ranked = np.sort(proba, axis=1)
+        np.testing.assert_array_equal(table.fallback, ranked[:, -1] - ranked[:, -2] < 0.3)
+        assert details['n_cells'] == 100 and details['chunks'] == 6
+
+    def test_disagreeing_cells_fall_back(self, grid, engine, tmp_path):
+        """Test held-out disagreements switch their cells to the forest"""
+        engine_dir = tmp_path / "engine"
+        engine.save(engine_dir)
+        build_table(engine, engine_dir, tmp_path, grid, min_margin=0.0, workers=1)
+        table = LookupTable(
+            grid, np.load(tmp_path / "top_classes.npy"), np.load(tmp_path / "top_proba.npy"),
+            np.load(tmp_path / "fallback.npy")
+        )
+
+        X = np.random.default_rng(1).uniform([0, 0], [100, 10], size=(500, 2))
+        before = table.evaluate(engine, X)
+        after = table.evaluate(engine, X, mark_disagreements=True)
+        assert before['agreement_in_grid'] < 1.0
+        assert after['agreement_served'] == 1.0
+        assert after['lookup_rate'] < before['lookup_rate']
+
+    def test_model_serves_lookup_with_forest_fallback(self, monkeypatch):
+        """Test CropModel builds a table and answers hits from it, misses from the forest"""
+        model = CropModel()
+        model.train(test_size=0.3, random_state=42, evaluation="none")
+        result = model.build_lookup(
+            bins={'N': 4, 'P': 4, 'K': 4, 'temperature': 3}, min_margin=0.0,
+            workers=1, test_size=0.3, random_state=42
+        )
+        assert result['n_cells'] == 4 * 4 * 4 * 3
+        assert result['holdout']['agreement_served'] == 1.0
+
+        monkeypatch.setattr(settings, "LOOKUP_ENABLED", True)
+        served = CropModel()
+        assert served.load_model()
+        assert served.snapshot.lookup is not None
+
+        # The centre of a cell the table answers, and a row beyond the grid
+        table = served.snapshot.lookup
+        cell = int(np.flatnonzero(~table.fallback)[0])
+        centre = dict(zip(served.feature_columns, table.grid.centers(cell, cell + 1)[0].tolist()))
+        rows = [centre, {**centre, "rainfall": 1e6}]
+        hit, miss = served.predict_batch(rows)
+        assert hit['source'] == "lookup" and hit['trees_used'] == 0
+        assert list(hit['all_probabilities']) == list(miss['all_probabilities'])
+        assert sum(p > 0 for p in hit['all_probabilities'].values()) <= result['top_k']
+        assert hit['all_probabilities'][hit['crop']] == hit['confidence']
+        assert miss['source'] == "forest"
+        assert miss == {**model.predict_batch(rows[1:])[0], 'source': "forest"}
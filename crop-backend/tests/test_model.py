@@ -10,6 +10,7 @@ import shutil
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from src.model import CropModel
+from src.config import settings
 from src.preprocessing import create_sample_data, prepare_features_target
 
 class TestCropModel:
@@ -148,6 +149,96 @@ class TestCropModel:
         assert original_prediction['crop'] == loaded_prediction['crop']
         assert abs(original_prediction['confidence'] - loaded_prediction['confidence']) < 0.001
     
+    def test_model_shared_serving(self, model, sample_data, temp_model_path, monkeypatch):
+        """Test serving from memory-mapped node tables shared across processes"""
+        model.model_path = temp_model_path
+        model.train(test_size=0.3, random_state=42)
+        
+        monkeypatch.setattr(settings, "MODEL_SERVING_MODE", "shared")
+        monkeypatch.setattr(settings, "MODEL_ARTIFACT_FORMAT", "pickle")
+        workers = [CropModel(), CropModel()]
+        for worker in workers:
+            worker.model_path = temp_model_path
+            assert worker.load_model() is True
+            assert isinstance(worker.engine.value, np.memmap)
+        
+        # Both workers map the single export kept with the active version
+        shared_dir = model.registry.version_dir(model.version) / "shared"
+        for worker in workers:
+            assert worker.version == model.version
+            assert Path(worker.engine.value.filename) == shared_dir / "value.npy"
+        
+        test_input = {
+            'N': 90, 'P': 42, 'K': 43,
+            'temperature': 20.87, 'humidity': 82.00,
+            'ph': 6.50, 'rainfall': 202.93, 'ndvi': 0.65
+        }
+        expected = model.predict(test_input)
+        for worker in workers:
+            assert worker.predict(test_input) == expected
+            assert worker.get_model_info()['model_type'] == 'RandomForestClassifier'
+    
+    def test_model_binary_serving(self, model, sample_data, temp_model_path, monkeypatch):
+        """Test shared workers map model.bin directly and match the trained model"""
+        model.model_path = temp_model_path
+        model.train(test_size=0.3, random_state=42)
+        binary_path = model.registry.artifact_path(model.version, "model.bin")
+        assert binary_path.exists()
+        
+        monkeypatch.setattr(settings, "MODEL_SERVING_MODE", "shared")
+        worker = CropModel()
+        worker.model_path = temp_model_path
+        assert worker.load_model() is True
+        assert Path(worker.engine.value.filename) == binary_path
+        assert worker.engine.threshold.dtype == np.float32
+        assert not (model.registry.version_dir(model.version) / "shared").exists()
+        
+        X, _ = prepare_features_target(sample_data)
+        rows = X.to_dict('records')
+        assert worker.predict_batch(rows) == model.predict_batch(rows)
+        
+        # The sklearn estimator is still available, unpickled on demand
+        assert worker.snapshot.estimator is None
+        assert worker.model.n_estimators == model.model.n_estimators
+    
+    def test_model_warm_up(self, model, sample_data):
+        """Test warm-up runs synthetic predictions for each batch size"""
+        model.train(test_size=0.3, random_state=42)
+        
+        timings = model.warm_up(rounds=2, batch_sizes=[1, 8])
+        assert set(timings) == {1, 8}
+        assert all(ms > 0 for ms in timings.values())
+    
+    def test_model_registry_versions(self, model, sample_data, temp_model_path):
+        """Test each training run registers an immutable version and reloads swap atomically"""
+        model.model_path = temp_model_path
+        model.train(test_size=0.3, random_state=42)
+        first_version = model.version
+        
+        serving = CropModel()
+        serving.model_path = temp_model_path
+        assert serving.load_model() is True
+        first_snapshot = serving.snapshot
+        assert serving.reload() is False
+        
+        model.train(test_size=0.3, random_state=7)
+        assert model.version != first_version
+        assert model.registry.list_versions() == sorted([first_version, model.version])
+        assert model.registry.active_version() == model.version
+        
+        metadata = model.registry.metadata(model.version)
+        assert 'test_accuracy' in metadata['metrics']
+        assert metadata['trained_at']
+        
+        # Reload swaps the whole snapshot; the old one is left untouched
+        assert serving.reload() is True
+        assert serving.version == model.version
+        assert first_snapshot.version == first_version
+        assert serving.get_model_info()['last_trained'] == metadata['trained_at']
+        
+        with pytest.raises(ValueError):
+            first_snapshot.engine.threshold[0] = 0.0
+    
     def test_model_info(self, model, sample_data):
         """Test model information retrieval"""
         # Initially should return None
@@ -0,0 +1,117 @@
+import pytest
+import numpy as np
+import sys
+from pathlib import Path
+from sklearn.datasets import make_classification
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.inference import CompiledForest
+from src.model_format import float32_floor, load_binary, narrow_uint, read_header, save_binary
+
+FEATURES = ['f0', 'f1', 'f2', 'f3', 'f4', 'f5']
+LABELS = ['rice', 'maize', 'jute']
+
+@pytest.fixture
+def data():
+    X, y = make_classification(n_samples=600, n_features=6, n_informative=4, n_classes=3, random_state=0)
+    return X, y
+
+@pytest.fixture
+def engine(data):
+    X, y = data
+    forest = RandomForestClassifier(n_estimators=20, max_depth=10, random_state=42).fit(X, y)
+    return CompiledForest.from_estimator(forest)
+
+class TestModelFormat:
+    """Test cases for the binary model artifact format"""
+
+    def test_float32_floor_keeps_split_decisions(self):
+        """Test float32 thresholds send every float32 input the same way"""
+        rng = np.random.default_rng(0)
+        thresholds = rng.normal(size=1000) * 100
+        narrowed = float32_floor(thresholds)
+
+        assert narrowed.dtype == np.float32
+        assert np.all(narrowed.astype(np.float64) <= thresholds)
+        # Values just either side of each narrowed threshold
+        for x in (narrowed, np.nextafter(narrowed, np.float32(np.inf))):
+            np.testing.assert_array_equal(x <= narrowed, x.astype(np.float64) <= thresholds)
+
+    def test_narrow_uint(self):
+        """Test index dtypes are the smallest that fit"""
+        assert narrow_uint(7) == np.uint8
+        assert narrow_uint(256) == np.uint16
+        assert narrow_uint(70000) == np.uint32
+
+    @pytest.mark.parametrize("compression,mmap", [("none", True), ("none", False), ("zlib", True)])
+    def test_round_trip_predicts_identically(self, engine, data, tmp_path, compression, mmap):
+        """Test a loaded artifact gives the same labels and probabilities"""
+        X, _ = data
+        path = tmp_path / "model.bin"
+        save_binary(path, engine, LABELS, FEATURES, "RandomForestClassifier", compression=compression)
+
+        loaded, header = load_binary(path, mmap=mmap)
+        labels, proba = loaded.predict(X)
+        expected_labels, expected_proba = engine.predict(X)
+
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_array_equal(proba, expected_proba)
+        assert header['classes'] == LABELS
+        assert header['feature_columns'] == FEATURES
+        assert isinstance(loaded.value, np.memmap) == (mmap and compression == "none")
+
+    def test_boosted_round_trip(self, data, tmp_path):
+        """Test boosted ensembles keep float64 thresholds and their baseline scores"""
+        X, y = data
+        boosted = HistGradientBoostingClassifier(max_iter=15, random_state=42).fit(X, y)
+        engine = CompiledForest.from_estimator(boosted)
+        path = tmp_path / "model.bin"
+        save_binary(path, engine, LABELS, FEATURES, "HistGradientBoostingClassifier")
+
+        loaded, header = load_binary(path)
+        _, proba = loaded.predict(X)
+
+        assert header['link'] == "softmax"
+        assert loaded.threshold.dtype == np.float64
+        np.testing.assert_allclose(proba, boosted.predict_proba(X), rtol=1e-12, atol=1e-12)
+
+    def test_arrays_are_narrowed_and_aligned(self, engine, tmp_path):
+        """Test thresholds are float32, indices narrow and arrays 64-byte aligned"""
+        path = tmp_path / "model.bin"
+        save_binary(path, engine, LABELS, FEATURES, "RandomForestClassifier")
+        loaded, header = load_binary(path)
+
+        assert loaded.threshold.dtype == np.float32
+        assert loaded.feature.dtype == np.uint8
+        assert loaded.left.itemsize < engine.left.itemsize
+        assert all(spec['offset'] % 64 == 0 for spec in header['arrays'].values())
+        assert loaded.nbytes < engine.nbytes
+
+    def test_compression_shrinks_file(self, engine, tmp_path):
+        """Test zlib-compressed artifacts are smaller than uncompressed ones"""
+        plain, compressed = tmp_path / "plain.bin", tmp_path / "compressed.bin"
+        save_binary(plain, engine, LABELS, FEATURES, "RandomForestClassifier")
+        save_binary(compressed, engine, LABELS, FEATURES, "RandomForestClassifier", compression="zlib")
+
+        assert compressed.stat().st_size < plain.stat().st_size
+        assert read_header(compressed)['compression'] == "zlib"
+
+    def test_rejects_other_files(self, engine, tmp_path):
+        """Test files without the magic number or with a newer version are refused"""
+        path = tmp_path / "model.bin"
+        path.write_bytes(b"not a model at all")
+        with pytest.raises(ValueError):
+            load_binary(path)
+
+        save_binary(path, engine, LABELS, FEATURES, "RandomForestClassifier")
+        data = bytearray(path.read_bytes())
+        data[8] = 99
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError, match="version"):
+            load_binary(path)
+
+        with pytest.raises(ValueError):
+            save_binary(path, engine, LABELS, FEATURES, "RandomForestClassifier", compression="lzma")
@@ -0,0 +1,126 @@
+import pytest
+import asyncio
+import threading
+import time
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.persistence import PredictionWriter
+
+class FakeDatabase:
+    """Records insert_many batches instead of talking to MongoDB"""
+    
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+    
+    def save_predictions(self, records):
+        self.release.wait()
+        if self.fail:
+            return []
+        self.batches.append(list(records))
+        return list(range(len(records)))
+
+class FakeRollups:
+    """Records the size of each batch passed to the rollups"""
+    
+    def __init__(self):
+        self.batch_sizes = []
+    
+    def record(self, records):
+        self.batch_sizes.append(len(records))
+
+def make_record(i):
+    return {"input_data": {"N": i}, "prediction": "rice", "confidence": 0.9}
+
+class TestPredictionWriter:
+    """Test cases for the background prediction writer"""
+    
+    def test_flushes_in_batches_and_drains_on_stop(self):
+        """Test records are written with bulk inserts and nothing is lost on shutdown"""
+        db = FakeDatabase()
+        writer = PredictionWriter(db, batch_size=10, flush_interval=5.0)
+        
+        for i in range(25):
+            assert writer.submit(make_record(i)) is True
+        writer.stop()
+        
+        assert sum(len(batch) for batch in db.batches) == 25
+        assert max(len(batch) for batch in db.batches) <= 10
+        assert writer.stats()['written'] == 25
+        assert all("timestamp" in record for batch in db.batches for record in batch)
+    
+    def test_flushes_after_interval(self):
+        """Test a partial batch is written once the flush interval passes"""
+        db = FakeDatabase()
+        writer = PredictionWriter(db, batch_size=100, flush_interval=0.05)
+        
+        writer.submit(make_record(1))
+        deadline = time.monotonic() + 2
+        while not db.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert len(db.batches) == 1
+        assert db.batches[0][0]["input_data"] == {"N": 1}
+        writer.stop()
+    
+    def test_drops_when_full(self):
+        """Test records are dropped and counted when the queue is full"""
+        db = FakeDatabase()
+        db.release.clear()
+        writer = PredictionWriter(db, max_queue=2, batch_size=1, flush_interval=0.01)
+        
+        results = [writer.submit(make_record(i)) for i in range(10)]
+        assert results.count(False) == writer.stats()['dropped']
+        assert writer.stats()['dropped'] > 0
+        
+        db.release.set()
+        writer.stop()
+    
+    def test_block_overflow_applies_backpressure(self):
+        """Test the async submit waits for space instead of dropping"""
+        db = FakeDatabase()
+        writer = PredictionWriter(db, max_queue=1, batch_size=1, flush_interval=0.01,
+                                  overflow="block", block_timeout=2.0)
+        
+        async def run():
+            return await writer.submit_many_async([make_record(i) for i in range(20)])
+        
+        assert asyncio.run(run()) == 20
+        writer.stop()
+        assert writer.stats()['dropped'] == 0
+        assert sum(len(batch) for batch in db.batches) == 20
+    
+    def test_counts_failed_writes(self):
+        """Test failed inserts are counted"""
+        db = FakeDatabase(fail=True)
+        writer = PredictionWriter(db, batch_size=5, flush_interval=5.0)
+        for i in range(5):
+            writer.submit(make_record(i))
+        writer.stop()
+        
+        assert writer.stats()['failed'] == 5
+        assert writer.stats()['written'] == 0
+    
+    def test_saved_batches_update_rollups(self):
+        """Test rollups see saved batches but not failed ones"""
+        rollups = FakeRollups()
+        
+        writer = PredictionWriter(FakeDatabase(), batch_size=5, flush_interval=5.0, rollups=rollups)
+        for i in range(7):
+            writer.submit(make_record(i))
+        writer.stop()
+        
+        failing = PredictionWriter(FakeDatabase(fail=True), batch_size=5, flush_interval=5.0, rollups=rollups)
+        failing.submit(make_record(0))
+        failing.stop()
+        
+        assert rollups.batch_sizes == [5, 2]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.database import CircuitBreaker
+from src.prediction_store import PredictionStore, encode_cursor, decode_cursor
+
+class FakeCollection:
+    """In-memory stand-in for the handful of collection methods the store uses"""
+    
+    def __init__(self, options=None):
+        self.documents = []
+        self.indexes = {}
+        self._options = options or {}
+    
+    def options(self):
+        return self._options
+    
+    def create_index(self, keys, name, **kwargs):
+        self.indexes[name] = (keys, kwargs)
+    
+    def insert_one(self, document):
+        if any(doc['_id'] == document['_id'] or doc.get('label') == document.get('label')
+               for doc in self.documents):
+            raise DuplicateKeyError("duplicate key")
+        self.documents.append(document)
+    
+    def insert_many(self, documents, ordered=False):
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+        self.documents.extend(documents)
+        return type("InsertManyResult", (), {"inserted_ids": list(range(len(documents)))})()
+    
+    def find(self, query=None, projection=None):
+        query = query or {}
+        return FakeCursor([
+            doc for doc in self.documents
+            if all(doc['m'][key.split('.')[1]] == value if key.startswith('m.') else doc[key] == value
+                   for key, value in query.items())
+        ])
+
+class FakeCursor(list):
+    def sort(self, keys):
+        # Only descending sorts are used by the store
+        return FakeCursor(sorted(self, key=lambda doc: tuple(doc[key] for key, _ in keys), reverse=True))
+    
+    def limit(self, n):
+        return FakeCursor(self[:n])
+    
+    def batch_size(self, n):
+        return self
+
+class FakeDatabase:
+    def __init__(self, timeseries_supported=True):
+        self.collections = {}
+        self.timeseries_supported = timeseries_supported
+        self.created_with = {}
+    
+    def list_collection_names(self):
+        return list(self.collections)
+    
+    def create_collection(self, name, **options):
+        self.created_with[name] = options
+        self.collections[name] = FakeCollection(options)
+    
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+class FakeManager:
+    def __init__(self):
+        self.database = FakeDatabase()
+        self.breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+
+@pytest.fixture
+def store():
+    return PredictionStore(FakeManager(), collection_name="history", ttl_days=7)
+
+def make_record(crop, n, minutes_ago=0):
+    return {
+        "input_data": {"N": n, "P": 42, "K": 43, "temperature": 20.9, "humidity": 82.0,
+                       "ph": 6.5, "rainfall": 202.9},
+        "prediction": crop,
+        "confidence": 0.9,
+        "model_version": "v1",
+        "timestamp": datetime.now() - timedelta(minutes=minutes_ago)
+    }
+
+class TestPredictionStore:
+    """Test cases for the compact prediction store"""
+    
+    def test_creates_timeseries_collection_with_ttl_and_indexes(self, store):
+        """Test initialization creates the time-series layout, TTL and indexes"""
+        store.initialize()
+        database = store.db_manager.database
+        
+        options = database.created_with["history"]
+        assert options['timeseries']['timeField'] == 'ts'
+        assert options['timeseries']['metaField'] == 'm'
+        assert options['expireAfterSeconds'] == 7 * 86400
+        assert {"crop_ts_id", "ts_id"} <= set(database["history"].indexes)
+        assert "label" in database["crop_labels"].indexes
+        assert store.stats()['timeseries'] is True
+    
+    def test_documents_are_compact_and_round_trip(self, store):
+        """Test records are stored as arrays with crop codes and decode back"""
+        records = [make_record("rice", 90), make_record("maize", 80), make_record("rice", 70)]
+        assert len(store.save_predictions(records)) == 3
+        
+        documents = store.db_manager.database["history"].documents
+        assert documents[0]['m']['c'] == documents[2]['m']['c'] != documents[1]['m']['c']
+        assert documents[0]['x'][:3] == [90, 42, 43]
+        assert documents[0]['x'][-1] is None
+        assert len(store.db_manager.database["crop_labels"].documents) == 2
+        
+        decoded = store.decode(documents[1])
+        assert decoded['prediction'] == "maize"
+        assert decoded['input_data'] == records[1]['input_data']
+        assert decoded['model_version'] == "v1"
+    
+    def test_recent_returns_newest_first_and_filters_by_crop(self, store):
+        """Test recent history is sorted by time and filtered on the crop code"""
+        store.save_predictions([
+            make_record("rice", 1, minutes_ago=10),
+            make_record("maize", 2, minutes_ago=5),
+            make_record("rice", 3, minutes_ago=1)
+        ])
+        
+        assert [row['input_data']['N'] for row in store.recent(limit=2)] == [3, 2]
+        assert [row['input_data']['N'] for row in store.recent(crop="rice")] == [3, 1]
+        assert store.recent(crop="banana") == []
+    
+    def test_label_codes_survive_restart(self, store):
+        """Test a new store instance reuses the persisted code table"""
+        store.save_predictions([make_record("rice", 1), make_record("maize", 2)])
+        
+        restarted = PredictionStore(store.db_manager, collection_name="history", ttl_days=7)
+        restarted.initialize()
+        
+        assert restarted.label_code("maize") == store.label_code("maize")
+        assert restarted.label_code("banana") == 2
+    
+    def test_failures_feed_circuit_breaker(self, store):
+        """Test write failures open the shared circuit breaker"""
+        store.db_manager.database = None
+        
+        for _ in range(3):
+            assert store.save_predictions([make_record("rice", 1)]) == []
+        
+        assert store.db_manager.breaker.state == CircuitBreaker.OPEN
+
+class TestHistoryQueries:
+    """Test cases for keyset-paginated history queries"""
+    
+    def test_cursor_round_trip(self):
+        """Test a page token decodes to the position it was built from"""
+        record = {"timestamp": datetime(2026, 5, 1, 12, 30, 15, 250000), "id": str(ObjectId())}
+        
+        ts, _id = decode_cursor(encode_cursor(record))
+        
+        assert ts == record["timestamp"]
+        assert str(_id) == record["id"]
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+    
+    def test_filter_combines_conditions_with_keyset(self, store):
+        """Test filters and the cursor position become one indexed query"""
+        store.save_predictions([make_record("rice", 1)])
+        ts = datetime(2026, 5, 1)
+        _id = ObjectId()
+        
+        query = store.history_filter(
+            crop="rice", min_confidence=0.5, start=ts - timedelta(days=1), after=(ts, _id)
+        )
+        
+        assert query == {'$and': [
+            {'m.c': store.label_code("rice")},
+            {'p': {'$gte': 0.5}},
+            {'ts': {'$gte': ts - timedelta(days=1)}},
+            {'$or': [{'ts': {'$lt': ts}}, {'ts': ts, '_id': {'$lt': _id}}]}
+        ]}
+        assert store.history_filter() == {}
+        assert store.history_filter(crop="banana") is None
+    
+    def test_projection_keeps_sort_keys(self, store):
+        """Test projected pages still carry the fields needed for the next cursor"""
+        assert store.projection(["confidence"]) == {'ts': 1, '_id': 1, 'p': 1}
+        assert store.projection(None) is None
+        with pytest.raises(ValueError):
+            store.projection(["password"])
+    
+    def test_iter_history_projects_fields(self, store):
+        """Test only the requested fields are returned"""
+        store.save_predictions([make_record("rice", 1)])
+        store.db_manager.database["history"].find = lambda query, projection: FakeCursor([
+            {key: value for key, value in doc.items() if key in projection}
+            for doc in store.db_manager.database["history"].documents
+        ])
+        
+        rows = list(store.iter_history(10, fields=["prediction"]))
+        
+        assert set(rows[0]) == {"id", "timestamp", "prediction"}
+        assert rows[0]["prediction"] == "rice"
@@ -0,0 +1,121 @@
+import pytest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.database import CircuitBreaker
+from src.rollups import PredictionRollups, bucket_start
+
+class FakeRollupCollection:
+    """Applies $inc upserts to in-memory documents"""
+    
+    def __init__(self):
+        self.documents = {}
+        self.bulk_writes = 0
+    
+    def create_index(self, keys, name, **kwargs):
+        pass
+    
+    def bulk_write(self, operations, ordered=False):
+        self.bulk_writes += 1
+        for operation in operations:
+            key = tuple(operation._filter[field] for field in ('g', 't', 'c'))
+            doc = self.documents.setdefault(key, dict(operation._filter))
+            for path, amount in operation._doc['$inc'].items():
+                target = doc
+                *parents, leaf = path.split('.')
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = target.get(leaf, 0) + amount
+    
+    def find(self, query, projection=None):
+        return FakeCursor(
+            doc for doc in self.documents.values()
+            if doc['g'] == query['g']
+            and query['t']['$gte'] <= doc['t'] < query['t']['$lt']
+            and ('c' not in query or doc['c'] == query['c'])
+        )
+
+class FakeCursor(list):
+    def sort(self, keys):
+        return FakeCursor(sorted(self, key=lambda doc: tuple(doc[key] for key, _ in keys)))
+
+class FakeManager:
+    def __init__(self):
+        self.collection = FakeRollupCollection()
+        self.database = {"rollups": self.collection}
+        self.breaker = CircuitBreaker(failure_threshold=5, cooldown=60)
+
+def make_record(crop, n, confidence, timestamp):
+    return {
+        "input_data": {"N": n, "P": 40, "K": 40, "temperature": 25, "humidity": 80, "ph": 6.5, "rainfall": 200},
+        "prediction": crop,
+        "confidence": confidence,
+        "timestamp": timestamp
+    }
+
+@pytest.fixture
+def rollups():
+    return PredictionRollups(FakeManager(), collection_name="rollups")
+
+class TestPredictionRollups:
+    """Test cases for incrementally maintained prediction rollups"""
+    
+    def test_bucket_start(self):
+        """Test timestamps truncate to their hour, day and month"""
+        ts = datetime(2026, 5, 17, 13, 45, 12, 500)
+        assert bucket_start(ts, "hour") == datetime(2026, 5, 17, 13)
+        assert bucket_start(ts, "day") == datetime(2026, 5, 17)
+        assert bucket_start(ts, "month") == datetime(2026, 5, 1)
+        with pytest.raises(ValueError):
+            bucket_start(ts, "week")
+    
+    def test_batch_folds_into_one_upsert_per_bucket(self, rollups):
+        """Test a batch produces one $inc per granularity, bucket and crop"""
+        ts = datetime(2026, 5, 17, 13, 0)
+        records = [
+            make_record("rice", 80, 0.9, ts),
+            make_record("rice", 100, 0.7, ts.replace(minute=30)),
+            make_record("maize", 60, 0.8, ts.replace(hour=14))
+        ]
+        
+        increments = rollups.aggregate(records)
+        
+        # rice: 1 hour + 1 day + 1 month bucket; maize: the same
+        assert len(increments) == 6
+        rice_hour = increments[("hour", datetime(2026, 5, 17, 13), "rice")]
+        assert rice_hour["n"] == 2
+        assert rice_hour["sums.N"] == 180
+        assert "sums.ndvi" not in rice_hour
+        
+        assert rollups.record(records) == 6
+        assert rollups.db_manager.collection.bulk_writes == 1
+    
+    def test_query_reads_buckets_and_summarizes_per_crop(self, rollups):
+        """Test stats are computed from rollup documents only"""
+        ts = datetime(2026, 5, 17, 13, 0)
+        rollups.record([make_record("rice", 80, 0.9, ts), make_record("maize", 60, 0.8, ts)])
+        rollups.record([make_record("rice", 100, 0.7, ts.replace(day=18))])
+        
+        stats = rollups.query("day", start=datetime(2026, 5, 1), end=datetime(2026, 6, 1))
+        
+        assert stats["total_predictions"] == 3
+        assert [(bucket["bucket"], bucket["crop"]) for bucket in stats["buckets"]] == [
+            ("2026-05-17T00:00:00", "maize"), ("2026-05-17T00:00:00", "rice"), ("2026-05-18T00:00:00", "rice")
+        ]
+        rice = stats["crops"][0]
+        assert rice["crop"] == "rice"
+        assert rice["count"] == 2
+        assert rice["mean_confidence"] == pytest.approx(0.8)
+        assert rice["feature_means"]["N"] == pytest.approx(90)
+        
+        only_maize = rollups.query("month", start=datetime(2026, 5, 1), end=datetime(2026, 6, 1), crop="maize")
+        assert only_maize["total_predictions"] == 1
+    
+    def test_rejects_unknown_granularity(self, rollups):
+        """Test the granularity is validated"""
+        with pytest.raises(ValueError):
+            rollups.query("week")
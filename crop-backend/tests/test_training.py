@@ -0,0 +1,62 @@
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+from sklearn.datasets import make_classification
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.training import StageTimer, build_forest, cross_validate, resolve_n_jobs
+from src.model import CropModel
+
+@pytest.fixture
+def dataset():
+    X, y = make_classification(n_samples=300, n_features=7, n_informative=5, n_classes=3, random_state=0)
+    return X, y
+
+class TestParallelTraining:
+    """Test cases for parallel training and evaluation"""
+    
+    def test_parallel_folds_match_sequential(self, dataset):
+        """Test folds scored in worker processes over shared X/y give the same scores"""
+        X, y = dataset
+        params = {'n_estimators': 10}
+        
+        sequential = cross_validate(X, y, folds=3, workers=1, params=params)
+        parallel = cross_validate(X, y, folds=3, workers=2, params=params)
+        
+        assert len(parallel) == 3
+        np.testing.assert_allclose(parallel, sequential)
+    
+    def test_build_forest_uses_all_cores(self):
+        """Test the production forest builds trees in parallel by default"""
+        forest = build_forest(random_state=1)
+        assert forest.n_jobs == -1
+        assert forest.n_estimators == 100
+        assert resolve_n_jobs(-1) >= 1
+    
+    def test_stage_timer(self):
+        """Test each stage and the total are timed"""
+        timer = StageTimer()
+        with timer.stage('fit'):
+            pass
+        
+        timings = timer.summary()
+        assert set(timings) == {'fit', 'total'}
+        assert timings['total'] >= timings['fit'] >= 0
+    
+    def test_oob_replaces_cross_validation(self):
+        """Test OOB evaluation reports an out-of-bag score and skips CV"""
+        results = CropModel().train(test_size=0.3, random_state=42, evaluation="oob")
+        
+        assert results['evaluation'] == "oob"
+        assert 0 <= results['oob_score'] <= 1
+        assert 'cv_mean' not in results
+        assert 'cross_validation' not in results['timings']
+        assert {'load_data', 'fit', 'score', 'save', 'total'} <= set(results['timings'])
+    
+    def test_rejects_unknown_evaluation(self):
+        """Test an unknown evaluation mode is refused before training"""
+        with pytest.raises(ValueError):
+            CropModel().train(evaluation="bootstrap")
@@ -0,0 +1,102 @@
+import pytest
+import sys
+import time
+from pathlib import Path
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from src.tuning import choose, pareto_front, sample_candidates, successive_halving
+from src.training import save_forest_config
+from src.model import CropModel
+
+class SlowOnFullSplit(RandomForestClassifier):
+    """Forest whose fit on more than 200 rows outlasts any test budget"""
+    
+    def fit(self, X, y):
+        if len(X) > 200:
+            time.sleep(60)
+        return super().fit(X, y)
+
+def slow_build(random_state=42, n_jobs=1, **params):
+    return SlowOnFullSplit(random_state=random_state, n_jobs=n_jobs, **params)
+
+def candidate(name, accuracy, latency_ms, nbytes):
+    return {'params': {'name': name}, 'accuracy': accuracy, 'latency_ms': latency_ms, 'nbytes': nbytes}
+
+class TestTuning:
+    """Test cases for the hyperparameter search"""
+    
+    def test_pareto_front_drops_dominated_candidates(self):
+        """Test only candidates without a strictly better alternative remain"""
+        results = [
+            candidate("accurate", 0.99, 2.0, 4000),
+            candidate("fast", 0.95, 0.5, 1000),
+            candidate("dominated", 0.94, 1.0, 2000),
+            candidate("balanced", 0.97, 1.0, 2000)
+        ]
+        
+        front = pareto_front(results)
+        
+        assert [c['params']['name'] for c in front] == ["fast", "balanced", "accurate"]
+    
+    def test_choose_fastest_meeting_floor(self):
+        """Test the fastest candidate above the floor wins, else the most accurate"""
+        results = [candidate("accurate", 0.99, 2.0, 4000), candidate("fast", 0.95, 0.5, 1000),
+                   candidate("balanced", 0.97, 1.0, 2000)]
+        
+        assert choose(results, 0.96)['params']['name'] == "balanced"
+        assert choose(results, 0.999)['params']['name'] == "accurate"
+    
+    def test_sample_candidates(self):
+        """Test sampling is reproducible and capped by the grid size"""
+        space = {'n_estimators': [10, 20], 'max_depth': [4, None]}
+        
+        assert len(sample_candidates(space, 10)) == 4
+        assert sample_candidates(space, 2, random_state=1) == sample_candidates(space, 2, random_state=1)
+    
+    def test_successive_halving(self):
+        """Test rounds shrink the field, grow the sample and measure finalists"""
+        X, y = make_classification(n_samples=400, n_features=7, n_informative=5, n_classes=3, random_state=0)
+        candidates = sample_candidates({'n_estimators': [5, 10, 20], 'max_depth': [3, None], 'max_features': ['sqrt']}, 6)
+        
+        results, history = successive_halving(X, y, candidates, budget_seconds=120, workers=2)
+        
+        assert history[0]['candidates'] == 6
+        assert history[-1]['resource'] == 300
+        assert history[-1]['candidates'] < 6
+        # Candidates eliminated early keep their measured latency and size
+        assert len(results) == 6
+        assert all(r['latency_ms'] > 0 and r['nbytes'] > 0 for r in results)
+        assert sum(r['round'] == len(history) - 1 for r in results) == history[-1]['completed']
+    
+    def test_exhausted_budget_keeps_last_complete_round(self):
+        """Test a round cut short by the budget is discarded and its fits are stopped"""
+        X, y = make_classification(n_samples=400, n_features=7, n_informative=5, n_classes=3, random_state=0)
+        candidates = sample_candidates({'n_estimators': [5, 10, 20], 'max_depth': [3, None], 'max_features': ['sqrt']}, 6)
+        
+        started = time.monotonic()
+        results, history = successive_halving(X, y, candidates, budget_seconds=15, workers=2, build=slow_build)
+        
+        assert time.monotonic() - started < 30
+        assert [round_info['complete'] for round_info in history] == [True, False]
+        assert len(results) == 6 and all(r['round'] == 0 for r in results)
+    
+    def test_budget_too_small(self):
+        """Test an exhausted budget with nothing finished is reported"""
+        X, y = make_classification(n_samples=200, n_features=7, n_informative=5, random_state=0)
+        
+        with pytest.raises(RuntimeError):
+            successive_halving(X, y, [{'n_estimators': 200}], budget_seconds=0, workers=1)
+    
+    def test_train_uses_tuned_config(self):
+        """Test train() picks up the parameters written by tuning"""
+        model = CropModel()
+        save_forest_config(model.forest_config_path, {'n_estimators': 7, 'max_depth': 5})
+        
+        results = model.train(test_size=0.3, random_state=42, evaluation="none")
+        
+        assert model.model.n_estimators == 7
+        assert results['forest_params']['max_depth'] == 5